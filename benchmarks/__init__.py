@@ -0,0 +1,9 @@
+# benchmarks/__init__.py
+"""
+Бенчмарки сервисного слоя. Запускаются как модули, на отдельной временной базе:
+    python -m benchmarks.budget_progress
+    python -m benchmarks.service_suite --scales 1k,100k --output results.json
+    python -m benchmarks.concurrency_scaling --concurrency 1,4,16,64
+    python -m benchmarks.routing --repeat 2000
+    python -m benchmarks.debt_simulation --debts 50
+"""
@@ -0,0 +1,75 @@
+# benchmarks/budget_progress.py - ЗАДЕРЖКА ПРОГРЕССА БЮДЖЕТОВ ОТ ЧИСЛА БЮДЖЕТОВ
+"""
+Показывает, что get_budget_progress выполняет один запрос
+и его задержка почти не растет с числом бюджетов пользователя.
+
+    python -m benchmarks.budget_progress [--repeat 200] [--budgets 1,5,10,20,50,100]
+"""
+import argparse
+import time
+
+from . import scratch
+from .stats import latency_summary
+
+from database.connection import db_connection
+from database.rollups import rebuild_rollups
+from services.budget_planner import budget_planner
+
+EXPENSES_PER_CATEGORY = 30
+
+def seed_user(user_id: int, budget_count: int):
+    """Создает пользователю budget_count бюджетов и расходы текущего месяца по каждому"""
+    with db_connection.transaction() as conn:
+        for index in range(budget_count):
+            category = f"Категория {index}"
+            conn.execute(
+                "INSERT INTO budgets (user_id, category, amount, period) VALUES (?, ?, ?, 'monthly')",
+                (user_id, category, 1000000)
+            )
+            conn.executemany(
+                "INSERT INTO transactions (user_id, type, amount, category, date) "
+                "VALUES (?, 'expense', ?, ?, datetime('now', 'start of month', ?))",
+                [(user_id, 1000 + day, category, f'+{day % 28} days') for day in range(EXPENSES_PER_CATEGORY)]
+            )
+        rebuild_rollups(conn, user_id)
+
+def measure(user_id: int, repeat: int) -> dict:
+    """Замеряет задержку get_budget_progress и число SQL-операторов на вызов"""
+    statements = []
+    timings = []
+    
+    # Вложенные get_connection() в этом потоке получают то же соединение
+    with db_connection.get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                result = budget_planner.get_budget_progress(user_id)
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            conn.set_trace_callback(None)
+    
+    assert result['success'], result
+    return {'statements_per_call': len(statements) / repeat, **latency_summary(timings)}
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.budget_progress',
+                                     description="Задержка прогресса бюджетов от числа бюджетов")
+    parser.add_argument('--repeat', type=int, default=200, help="Вызовов на каждый размер")
+    parser.add_argument('--budgets', default='1,5,10,20,50,100', help="Числа бюджетов через запятую")
+    args = parser.parse_args()
+    
+    print(f"База: {db_connection.db_path}")
+    print(f"{'бюджетов':>9} {'запросов':>9} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    
+    try:
+        for user_id, budget_count in enumerate(int(value) for value in args.budgets.split(',')):
+            seed_user(user_id + 1, budget_count)
+            stats = measure(user_id + 1, args.repeat)
+            print(f"{budget_count:>9} {stats['statements_per_call']:>9.0f} "
+                  f"{stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+    finally:
+        scratch.cleanup()
+
+if __name__ == '__main__':
+    main()
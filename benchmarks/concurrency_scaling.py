@@ -0,0 +1,75 @@
+# benchmarks/concurrency_scaling.py - МАСШТАБИРОВАНИЕ ПО ЧИСЛУ ОДНОВРЕМЕННЫХ ОБНОВЛЕНИЙ
+"""
+Один и тот же поток обновлений (benchmarks.telegram_load) прогоняется при разных
+значениях MAX_CONCURRENT_UPDATES: видно, как пропускная способность растет
+с параллелизмом и где упирается в пул потоков БД и поток-писатель.
+
+Задержка Bot API по умолчанию 50 мс - при нулевой задержке обработчики почти
+не ждут сети, и параллельная обработка мало что дает.
+
+    python -m benchmarks.concurrency_scaling --concurrency 1,4,16,64 --output scaling.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+
+from . import scratch
+from .telegram_load import run_load
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.concurrency_scaling',
+                                     description="Пропускная способность при разном числе одновременных обновлений")
+    parser.add_argument('--concurrency', default='1,4,16,64', help="Значения через запятую")
+    parser.add_argument('--users', type=int, default=100, help="Одновременных пользователей")
+    parser.add_argument('--flows', type=int, default=3, help="Сценариев на пользователя")
+    parser.add_argument('--api-latency-ms', type=float, default=50.0, help="Имитация задержки Bot API")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Файл результатов JSON")
+    args = parser.parse_args()
+    
+    levels = [int(value) for value in args.concurrency.split(',')]
+    runs = []
+    try:
+        for concurrency in levels:
+            # Обновления подаются без ограничения частоты: меряем предельную пропускную способность
+            report = asyncio.run(run_load(args.users, args.flows, 0, args.api_latency_ms / 1000, args.seed,
+                                          concurrency))
+            runs.append({
+                'concurrency': concurrency,
+                'updates': report['updates'],
+                'elapsed_s': report['elapsed_s'],
+                'throughput_per_s': report['throughput_per_s'],
+                'update_latency': report['update_latency'],
+                'loop_lag_p99_ms': report['loop_lag']['p99_ms'],
+                'throttled': report['lanes']['throttled'],
+                'errors': report['errors'],
+            })
+    finally:
+        scratch.cleanup()
+    
+    baseline = runs[0]['throughput_per_s'] or 1.0
+    print(f"📨 {args.users} пользователей, задержка Bot API {args.api_latency_ms:.0f} мс")
+    print(f"{'параллельно':>12} {'обн./с':>10} {'ускорение':>10} {'p95, мс':>10} {'придержано':>11} {'ошибок':>7}")
+    for run in runs:
+        print(f"{run['concurrency']:>12} {run['throughput_per_s']:>10.1f} "
+              f"{run['throughput_per_s'] / baseline:>9.1f}x {run['update_latency']['p95_ms']:>10.1f} "
+              f"{run['throttled']:>11} {run['errors']:>7}")
+    
+    if args.output:
+        result = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'users': args.users,
+            'flows_per_user': args.flows,
+            'api_latency_ms': args.api_latency_ms,
+            'runs': runs,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"✅ Результаты сохранены в {args.output}")
+    
+    return 0 if not any(run['errors'] for run in runs) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
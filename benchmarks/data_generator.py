@@ -0,0 +1,171 @@
+# benchmarks/data_generator.py - ГЕНЕРАТОР СИНТЕТИЧЕСКИХ ДАННЫХ
+"""
+Детерминированный (по seed) набор данных для бенчмарков: пользователи с разной
+активностью, транзакции с реалистичным распределением категорий, сумм и дат,
+долги, бюджеты, настройки и согласованные с историей балансы кошельков.
+
+    python -m benchmarks.data_generator --db bench.db --users 500 --transactions 100000
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+from database.rollups import rebuild_rollups
+from utils.categorizers import clean_category_name
+from utils.constants import EXPENSE_CATEGORIES, INCOME_CATEGORIES
+
+# Категория -> (доля транзакций, медианная сумма в рублях)
+EXPENSE_PROFILE = dict(zip(
+    [clean_category_name(category) for category in EXPENSE_CATEGORIES],
+    [(0.35, 600), (0.20, 300), (0.12, 1500), (0.05, 6000),
+     (0.07, 3000), (0.06, 2000), (0.04, 5000), (0.11, 800)]
+))
+INCOME_PROFILE = dict(zip(
+    [clean_category_name(category) for category in INCOME_CATEGORIES],
+    [(0.70, 60000), (0.15, 15000), (0.07, 5000), (0.05, 3000), (0.03, 2000)]
+))
+
+INCOME_SHARE = 0.08         # Доля доходов среди транзакций
+AMOUNT_SIGMA = 0.6          # Разброс сумм вокруг медианы (логнормальное распределение)
+ACTIVITY_ALPHA = 1.2        # Хвост распределения активности пользователей (Парето)
+SAVINGS_RATES = [5, 10, 10, 10, 15, 20]
+CREDITORS = ['Сбербанк', 'Тинькофф', 'ВТБ', 'Альфа-Банк', 'Друг', 'Родители']
+
+def _weighted(profile: Dict) -> tuple:
+    """Категории и накопленные веса для random.choices"""
+    categories = list(profile)
+    cum_weights = []
+    total = 0.0
+    for category in categories:
+        total += profile[category][0]
+        cum_weights.append(total)
+    return categories, cum_weights
+
+def _amount_kopecks(rng: random.Random, median: float) -> int:
+    """Сумма в копейках из логнормального распределения вокруг медианы"""
+    return max(100, int(median * math.exp(rng.gauss(0, AMOUNT_SIGMA)) * 100))
+
+def generate_dataset(conn, users: int, transactions: int, seed: int = 42,
+                     days: int = 365, chunk_size: int = 50000) -> Dict:
+    """
+    Заполняет пустую базу. Вызывается внутри единицы работы (одна фиксация).
+    Возвращает число созданных строк по таблицам.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    user_ids = list(range(1, users + 1))
+    
+    # Несколько активных пользователей дают большую часть транзакций
+    activity_weights = []
+    total = 0.0
+    for _ in user_ids:
+        total += rng.paretovariate(ACTIVITY_ALPHA)
+        activity_weights.append(total)
+    
+    savings_rates = {user_id: rng.choice(SAVINGS_RATES) for user_id in user_ids}
+    conn.executemany(
+        'INSERT INTO user_settings (user_id, savings_rate, auto_savings) VALUES (?, ?, 1)',
+        savings_rates.items()
+    )
+    
+    expense_categories, expense_weights = _weighted(EXPENSE_PROFILE)
+    income_categories, income_weights = _weighted(INCOME_PROFILE)
+    
+    for start in range(0, transactions, chunk_size):
+        count = min(chunk_size, transactions - start)
+        rows = []
+        for user_id in rng.choices(user_ids, cum_weights=activity_weights, k=count):
+            # Свежие даты встречаются чаще старых
+            date = now - timedelta(days=days * rng.random() ** 1.5, seconds=rng.randrange(86400))
+            if rng.random() < INCOME_SHARE:
+                category = rng.choices(income_categories, cum_weights=income_weights)[0]
+                amount = _amount_kopecks(rng, INCOME_PROFILE[category][1])
+                gold_amount = round(amount * savings_rates[user_id] / 100)
+                rows.append((user_id, 'income', amount, category, '', date.strftime('%Y-%m-%d %H:%M:%S'), gold_amount))
+            else:
+                category = rng.choices(expense_categories, cum_weights=expense_weights)[0]
+                amount = _amount_kopecks(rng, EXPENSE_PROFILE[category][1])
+                rows.append((user_id, 'expense', amount, category, '', date.strftime('%Y-%m-%d %H:%M:%S'), 0))
+        
+        conn.executemany('''
+            INSERT INTO transactions (user_id, type, amount, category, description, date, gold_amount)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    
+    # Балансы кошельков согласованы с историей транзакций
+    conn.execute('''
+        INSERT INTO wallets (user_id, wallet_type, balance)
+        SELECT user_id, 'gold_reserve', SUM(gold_amount) FROM transactions GROUP BY user_id
+    ''')
+    conn.execute('''
+        INSERT INTO wallets (user_id, wallet_type, balance)
+        SELECT user_id, 'living_budget',
+               SUM(CASE WHEN type = 'income' THEN amount - gold_amount ELSE -amount END)
+        FROM transactions GROUP BY user_id
+    ''')
+    conn.executemany(
+        'INSERT OR IGNORE INTO wallets (user_id, wallet_type, balance) VALUES (?, ?, 0)',
+        [(user_id, wallet_type) for user_id in user_ids
+         for wallet_type in ('gold_reserve', 'living_budget', 'debt_repayment')]
+    )
+    
+    debts = []
+    budgets = []
+    for user_id in user_ids:
+        for _ in range(rng.choices([0, 1, 2, 3], weights=[0.4, 0.3, 0.2, 0.1])[0]):
+            initial = _amount_kopecks(rng, 50000)
+            current = int(initial * rng.uniform(0.2, 1.0))
+            debts.append((user_id, rng.choice(CREDITORS), initial, current,
+                          rng.choice([0.0, 0.0, 9.9, 14.5, 24.9])))
+        for category in rng.sample(expense_categories, rng.randint(3, 6)):
+            budgets.append((user_id, category, _amount_kopecks(rng, EXPENSE_PROFILE[category][1] * 15)))
+    
+    conn.executemany('''
+        INSERT INTO debts (user_id, creditor, initial_amount, current_amount, interest_rate, status)
+        VALUES (?, ?, ?, ?, ?, 'active')
+    ''', debts)
+    conn.executemany(
+        "INSERT INTO budgets (user_id, category, amount, period) VALUES (?, ?, ?, 'monthly')",
+        budgets
+    )
+    
+    rebuild_rollups(conn)
+    
+    return {
+        'users': users,
+        'transactions': transactions,
+        'debts': len(debts),
+        'budgets': len(budgets),
+    }
+
+def clear_dataset(conn):
+    """Очищает пользовательские таблицы перед новым набором данных"""
+    for table in ('transactions', 'wallets', 'debt_payments', 'debts', 'budgets',
+                  'user_settings', 'babylon_rules', 'rollup_daily', 'rollup_monthly'):
+        conn.execute(f'DELETE FROM {table}')
+
+def main():
+    from database.connection import DatabaseConnection
+    
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.data_generator',
+                                     description="Синтетические данные для бенчмарков")
+    parser.add_argument('--db', default='bench.db', help="Путь к базе данных")
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    db = DatabaseConnection(args.db)
+    started = time.monotonic()
+    with db.transaction() as conn:
+        clear_dataset(conn)
+        counts = generate_dataset(conn, args.users, args.transactions, args.seed)
+    db.close_all()
+    
+    print(f"✅ Данные созданы за {time.monotonic() - started:.1f} с: {counts}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/debt_simulation.py - СКОРОСТЬ СИМУЛЯЦИИ ПОГАШЕНИЯ ДОЛГОВ
+"""
+Время одной симуляции (снежный ком и лавина вместе) на случайных долгах
+без базы данных. Медленный случай - только минимальные платежи: месяцев
+до погашения больше всего (не больше 30-летнего горизонта).
+
+    python -m benchmarks.debt_simulation [--debts 50] [--repeat 200]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from .stats import latency_summary
+
+from services.debt_simulator import MAX_MONTHS, payoff_order, simulate
+
+def measure(debts: int, repeat: int, budget_factor: float, seed: int) -> dict:
+    """Задержка симуляции в мс при бюджете budget_factor * сумма минимальных платежей"""
+    rng = np.random.default_rng(seed)
+    balances = rng.uniform(1000, 1000000, debts)
+    rates = rng.uniform(0, 40, debts)
+    minimums = np.maximum(1000, balances * 0.02)
+    orders = [payoff_order(name, balances, rates) for name in ('snowball', 'avalanche')]
+    
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = simulate(balances, rates, minimums, minimums.sum() * budget_factor, orders)
+        timings.append((time.perf_counter() - started) * 1000)
+    
+    summary = latency_summary(timings)
+    summary['months'] = result['months'].tolist()
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.debt_simulation',
+                                     description="Время симуляции погашения долгов")
+    parser.add_argument('--debts', type=int, default=50, help="Долгов у пользователя")
+    parser.add_argument('--repeat', type=int, default=200, help="Повторов каждого сценария")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    
+    print(f"📜 {args.debts} долгов, горизонт {MAX_MONTHS} мес.")
+    for label, factor in (('бюджет x1.5', 1.5), ('минимальные платежи', 1.0)):
+        result = measure(args.debts, args.repeat, factor, args.seed)
+        months = ', '.join('не погашены' if months < 0 else f"{months} мес." for months in result['months'])
+        print(f"  {label:<22} p50 {result['p50_ms']:>7.2f} мс  p99 {result['p99_ms']:>7.2f} мс  ({months})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/fake_bot_api.py - ЛОКАЛЬНАЯ ЗАГЛУШКА BOT API
+"""
+HTTP-клиент python-telegram-bot, который не ходит в Telegram:
+отвечает на методы Bot API правдоподобными объектами, считает вызовы
+и (по желанию) добавляет задержку сети.
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {
+    'id': 100000,
+    'is_bot': True,
+    'first_name': 'Вавилонский бот',
+    'username': 'babylon_load_test_bot',
+    'can_join_groups': False,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False,
+}
+
+# Методы, которые возвращают отправленное/измененное сообщение
+_MESSAGE_METHODS = {
+    'sendMessage', 'sendPhoto', 'sendDocument', 'editMessageText',
+    'editMessageReplyMarkup', 'editMessageCaption',
+}
+
+class FakeBotRequest(BaseRequest):
+    """Заглушка Bot API для нагрузочного стенда"""
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self._message_ids = itertools.count(1)
+    
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
+    
+    async def do_request(self, url: str, method: str, request_data: RequestData = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        endpoint = url.rsplit('/', 1)[-1]
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        
+        parameters = request_data.parameters if request_data else {}
+        payload = {'ok': True, 'result': self._result(endpoint, parameters)}
+        return 200, json.dumps(payload).encode('utf-8')
+    
+    def _result(self, endpoint: str, parameters: dict):
+        """Ответ на метод Bot API"""
+        if endpoint == 'getMe':
+            return BOT_USER
+        if endpoint == 'getUpdates':
+            return []
+        if endpoint in _MESSAGE_METHODS:
+            message = {
+                'message_id': parameters.get('message_id') or next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': parameters.get('chat_id', 0), 'type': 'private'},
+                'from': BOT_USER,
+            }
+            if 'text' in parameters:
+                message['text'] = parameters['text']
+            return message
+        return True
+    
+    def get_stats(self) -> dict:
+        """Число вызовов по методам Bot API"""
+        return dict(self.calls)
@@ -0,0 +1,74 @@
+# benchmarks/routing.py - СТОИМОСТЬ МАРШРУТИЗАЦИИ ТЕКСТОВОГО ОБНОВЛЕНИЯ
+"""
+Сколько стоит выбор обработчика для текстового сообщения без самой обработки:
+проверка check_update обработчиков приложения по порядку (как делает
+Application.process_update) плюс выбор маршрута внутри обработчика меню.
+
+Набор сообщений: кнопки всех меню, быстрый ввод и быстрый ввод долга.
+
+    python -m benchmarks.routing [--repeat 2000]
+"""
+import argparse
+import time
+
+from . import scratch
+from .stats import latency_summary
+from .telegram_load import LOAD_TEST_TOKEN, make_update
+from .fake_bot_api import FakeBotRequest
+
+from bot.bot import setup_bot
+from bot.router import TextRouter
+
+SAMPLE_TEXTS = [
+    '💼 Транзакции', '💰 Бюджеты', '🏦 Мои кошельки', '📊 Аналитика', '⚙️ Настройки', '📜 Долги',
+    '🏛️ Правила Вавилона', 'ℹ️ Помощь', '📋 История операций', '💰 Мои бюджеты', '💡 Рекомендации',
+    '📊 Текущие настройки', '📋 Список транзакций', '📊 Финансовый обзор', '📉 Графики и отчеты',
+    '📜 Мои долги', '📋 План погашения', '🎯 Вехи освобождения', '🏠 Главное меню',
+    '1500 еда обед', '-50000 зарплата', 'долг Банк 50000',
+]
+
+def select_callback(handlers: list, update):
+    """Колбэк, который выполнило бы приложение для обновления"""
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is not None and check is not False:
+            callback = handler.callback
+            router = getattr(callback, '__self__', None)
+            if isinstance(router, TextRouter):
+                return router.resolve(update.message.text)
+            return callback
+    return None
+
+def measure(application, repeat: int) -> dict:
+    """Задержка выбора обработчика на одно обновление, мкс"""
+    handlers = application.handlers[0]
+    updates = [make_update(index, 1001, text, application.bot) for index, text in enumerate(SAMPLE_TEXTS, 1)]
+    
+    timings = []
+    for _ in range(repeat):
+        for update in updates:
+            started = time.perf_counter()
+            select_callback(handlers, update)
+            timings.append((time.perf_counter() - started) * 1000)
+    
+    summary = latency_summary(timings)
+    return {key: value * 1000 if key.endswith('_ms') else value for key, value in summary.items()}
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.routing',
+                                     description="Стоимость выбора обработчика текстового сообщения")
+    parser.add_argument('--repeat', type=int, default=2000, help="Проходов по набору сообщений")
+    args = parser.parse_args()
+    
+    try:
+        application = setup_bot(token=LOAD_TEST_TOKEN, request=FakeBotRequest())
+        result = measure(application, args.repeat)
+    finally:
+        scratch.cleanup()
+    
+    print(f"🧭 Обработчиков в группе: {len(application.handlers[0])}, сообщений: {result['count']}")
+    print(f"⏱️ Выбор обработчика: среднее {result['mean_ms']:.2f} мкс, p50 {result['p50_ms']:.2f} мкс, "
+          f"p99 {result['p99_ms']:.2f} мкс")
+
+if __name__ == '__main__':
+    main()
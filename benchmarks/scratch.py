@@ -0,0 +1,27 @@
+# benchmarks/scratch.py - ВРЕМЕННАЯ БАЗА ДЛЯ БЕНЧМАРКОВ
+"""
+Импортируется до сервисов: глобальное соединение создается при импорте
+database.connection и берет путь из DB_PATH. Если DB_PATH не задан,
+бенчмарк работает во временном каталоге, который удаляет cleanup().
+"""
+import os
+import shutil
+import tempfile
+
+_tmp_dir = None
+
+if not os.getenv('DB_PATH'):
+    _tmp_dir = tempfile.mkdtemp(prefix='finance-bench-')
+    os.environ['DB_PATH'] = os.path.join(_tmp_dir, 'bench.db')
+
+DB_PATH = os.environ['DB_PATH']
+
+def cleanup():
+    """Закрывает соединения и удаляет временную базу (заданную через DB_PATH не трогает)"""
+    from database.connection import db_connection
+    from database.writer import db_writer
+    
+    db_writer.stop()
+    db_connection.close_all()
+    if _tmp_dir:
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
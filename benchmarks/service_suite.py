@@ -0,0 +1,201 @@
+# benchmarks/service_suite.py - БЕНЧМАРК СЕРВИСНОГО СЛОЯ
+"""
+Пропускная способность и задержки p50/p95/p99 основных операций сервисов
+на синтетических данных разного объема. Результат пишется в JSON,
+чтобы сравнивать прогоны между коммитами.
+
+    python -m benchmarks.service_suite --scales 1k,100k --output results.json
+    python -m benchmarks.service_suite --scales 1k --compare results.json
+    python -m benchmarks.service_suite --scales 100k --profile-sql
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from . import scratch
+from .data_generator import clear_dataset, generate_dataset
+from .stats import latency_summary
+
+from database.connection import db_connection
+from database.profiler import query_profiler
+from database.writer import db_writer
+from services.advanced_analytics import advanced_analytics
+from services.budget_planner import budget_planner
+from services.debt_service import debt_service
+from services.financial_analytics import financial_analytics
+from services.transaction_service import transaction_service
+from services.wallet_service import wallet_service
+
+# Объем -> (пользователей, транзакций)
+SCALES = {
+    '1k': (20, 1000),
+    '100k': (500, 100000),
+    '10m': (20000, 10000000),
+}
+
+def _operations(rng: random.Random, users: int, debts: list) -> dict:
+    """Операция -> функция без аргументов со случайным пользователем"""
+    def user():
+        return rng.randint(1, users)
+    
+    def payment():
+        user_id, debt_id = rng.choice(debts) if debts else (user(), 0)
+        return debt_service.make_payment(user_id, debt_id, 100)
+    
+    return {
+        'add_income': lambda: transaction_service.add_income(user(), rng.randint(1000, 50000), 'Зарплата'),
+        'add_expense': lambda: transaction_service.add_expense(user(), rng.randint(100, 2000), 'Еда'),
+        'make_payment': payment,
+        'get_budget_progress': lambda: budget_planner.get_budget_progress(user()),
+        'calculate_financial_health_score': lambda: advanced_analytics.calculate_financial_health_score(user()),
+        'get_spending_analysis': lambda: financial_analytics.get_spending_analysis(user()),
+    }
+
+def _timed(func) -> tuple:
+    """Выполняет вызов и возвращает (задержка в мс, успех)"""
+    started = time.perf_counter()
+    result = func()
+    elapsed = (time.perf_counter() - started) * 1000
+    success = not isinstance(result, dict) or result.get('success', True) is not False
+    return elapsed, success
+
+def run_operation(func, calls: int, threads: int) -> dict:
+    """Выполняет calls вызовов из threads потоков"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='bench') as pool:
+        results = list(pool.map(lambda _: _timed(func), range(calls)))
+    elapsed = time.perf_counter() - started
+    
+    summary = latency_summary([latency for latency, _ in results], elapsed)
+    summary['success_rate'] = round(sum(1 for _, ok in results if ok) / len(results), 4) if results else 0.0
+    return summary
+
+def run_scale(scale: str, calls: int, threads: int, seed: int) -> dict:
+    """Создает данные заданного объема и замеряет все операции"""
+    users, transactions = SCALES[scale]
+    
+    started = time.monotonic()
+    with db_connection.transaction() as conn:
+        clear_dataset(conn)
+        counts = generate_dataset(conn, users, transactions, seed)
+    seed_time = time.monotonic() - started
+    wallet_service.invalidate_cache()
+    
+    with db_connection.get_connection() as conn:
+        debts = conn.execute("SELECT user_id, id FROM debts WHERE status = 'active'").fetchall()
+    
+    query_profiler.reset()
+    rng = random.Random(seed)
+    operations = {}
+    for name, func in _operations(rng, users, debts).items():
+        operations[name] = run_operation(func, calls, threads)
+        print(f"  {name:<34} p50 {operations[name]['p50_ms']:>9.3f} мс  "
+              f"p99 {operations[name]['p99_ms']:>9.3f} мс  "
+              f"{operations[name]['throughput_per_s']:>9.1f} оп/с")
+    
+    # Ночной пересчет индекса здоровья всех пользователей одним пакетом
+    started = time.perf_counter()
+    scores = advanced_analytics.calculate_all_health_scores()
+    health_batch = {'users': len(scores), 'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)}
+    print(f"  {'calculate_all_health_scores':<34} {health_batch['elapsed_ms']:>12.1f} мс  "
+          f"{health_batch['users']} польз.")
+    
+    result = {
+        'scale': scale,
+        'rows': counts,
+        'seed_seconds': round(seed_time, 2),
+        'operations': operations,
+        'health_batch': health_batch,
+        'writer': db_writer.get_stats(),
+        'pool': db_connection.get_pool_stats(),
+        'wallet_cache': wallet_service.get_cache_stats(),
+    }
+    
+    if query_profiler.enabled:
+        result['queries'] = query_profiler.get_top(10)
+        print("  Запросы по суммарному времени:")
+        for query in result['queries'][:5]:
+            print(f"    {query['total_ms']:>10.1f} мс  {query['count']:>7} выз.  {query['statement'][:90]}")
+    return result
+
+def _git_commit() -> str:
+    """Текущий коммит (если запуск из git-репозитория)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: dict, previous: dict):
+    """Печатает изменение p95 относительно предыдущего прогона"""
+    previous_scales = {entry['scale']: entry for entry in previous.get('scales', [])}
+    print(f"\nСравнение с {previous.get('commit') or 'предыдущим прогоном'} (p95):")
+    for entry in current['scales']:
+        old = previous_scales.get(entry['scale'])
+        if not old:
+            continue
+        for name, stats in entry['operations'].items():
+            old_stats = old['operations'].get(name)
+            if not old_stats or not old_stats['p95_ms']:
+                continue
+            change = (stats['p95_ms'] / old_stats['p95_ms'] - 1) * 100
+            print(f"  [{entry['scale']}] {name:<34} {old_stats['p95_ms']:>9.3f} -> {stats['p95_ms']:>9.3f} мс ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.service_suite',
+                                     description="Бенчмарк сервисного слоя")
+    parser.add_argument('--scales', default='1k,100k', help=f"Объемы через запятую: {', '.join(SCALES)}")
+    parser.add_argument('--calls', type=int, default=500, help="Вызовов каждой операции")
+    parser.add_argument('--threads', type=int, default=8, help="Параллельных вызывающих потоков")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark-results.json', help="Файл результатов JSON")
+    parser.add_argument('--compare', default=None, help="JSON предыдущего прогона для сравнения")
+    parser.add_argument('--profile-sql', action='store_true', help="Собрать самые дорогие SQL-запросы")
+    args = parser.parse_args()
+    
+    if args.profile_sql:
+        query_profiler.enable()
+    
+    scales = [scale.strip() for scale in args.scales.split(',')]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"Неизвестный объем: {', '.join(unknown)}")
+    
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'calls': args.calls,
+        'threads': args.threads,
+        'seed': args.seed,
+        'scales': [],
+    }
+    
+    try:
+        for scale in scales:
+            print(f"📊 Объем {scale}: {SCALES[scale][0]} пользователей, {SCALES[scale][1]} транзакций")
+            report['scales'].append(run_scale(scale, args.calls, args.threads, args.seed))
+    finally:
+        scratch.cleanup()
+    
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Результаты сохранены в {args.output}")
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,27 @@
+# benchmarks/stats.py - ПЕРЦЕНТИЛИ И ПРОПУСКНАЯ СПОСОБНОСТЬ
+import statistics
+from typing import Dict, List
+
+def percentile(values: List[float], percent: float) -> float:
+    """Перцентиль с линейной интерполяцией (для одного значения - оно само)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def latency_summary(timings_ms: List[float], elapsed_s: float = None) -> Dict:
+    """Сводка задержек в миллисекундах и, если известно время прогона, пропускной способности"""
+    summary = {
+        'count': len(timings_ms),
+        'mean_ms': round(statistics.fmean(timings_ms), 3) if timings_ms else 0.0,
+        'p50_ms': round(percentile(timings_ms, 50), 3),
+        'p95_ms': round(percentile(timings_ms, 95), 3),
+        'p99_ms': round(percentile(timings_ms, 99), 3),
+        'max_ms': round(max(timings_ms), 3) if timings_ms else 0.0,
+    }
+    if elapsed_s is not None:
+        summary['throughput_per_s'] = round(len(timings_ms) / elapsed_s, 1) if elapsed_s > 0 else 0.0
+    return summary
@@ -0,0 +1,244 @@
+# benchmarks/telegram_load.py - НАГРУЗОЧНЫЙ СТЕНД ОБРАБОТЧИКОВ TELEGRAM
+"""
+Прогоняет синтетические обновления Telegram через настоящий граф обработчиков
+из bot.bot.setup_bot() без сети: ответы Bot API дает FakeBotRequest,
+обновления кладутся прямо в update_queue приложения.
+
+Сценарии пользователей: /start, диалоги дохода и расхода, быстрый ввод
+(«1500 еда обед»), кнопки меню и аналитики. Каждый пользователь проходит
+свой сценарий по порядку, сценарии разных пользователей перемешаны.
+
+Замеряются: задержка каждого обработчика, задержка обновления от постановки
+в очередь до завершения, пропускная способность и отставание цикла событий.
+
+    python -m benchmarks.telegram_load --users 200 --rate 500 --output load.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from . import scratch
+from .fake_bot_api import FakeBotRequest
+from .stats import latency_summary
+
+from telegram import Update
+from telegram.ext import ConversationHandler
+
+from bot.bot import MAX_CONCURRENT_UPDATES, setup_bot
+from bot.router import TextRouter
+
+LOAD_TEST_TOKEN = '123456:LOAD-TEST-TOKEN'
+
+# Сценарии: последовательности сообщений одного пользователя
+FLOWS = {
+    'income_dialog': ['💳 Добавить доход', '50000', '💰 Зарплата', 'аванс'],
+    'expense_dialog': ['💸 Добавить расход', '700', '🍎 Еда', '/skip'],
+    'quick_input': ['1500 еда обед'],
+    'quick_income': ['-30000 зарплата'],
+    'wallets': ['🏦 Мои кошельки'],
+    'analytics': ['📊 Аналитика', '📊 Финансовый обзор', '📈 Анализ расходов', '🏠 Главное меню'],
+    'budgets': ['💰 Бюджеты', '💰 Мои бюджеты', '🏠 Главное меню'],
+    'history': ['💼 Транзакции', '📋 История операций', '🏠 Главное меню'],
+    'rules': ['🏛️ Правила Вавилона'],
+}
+
+def build_scripts(users: int, flows_per_user: int, rng: random.Random) -> dict:
+    """user_id -> список сообщений: /start, первый доход и случайные сценарии"""
+    names = list(FLOWS)
+    scripts = {}
+    for user_id in range(1, users + 1):
+        script = ['/start'] + FLOWS['income_dialog']
+        for name in rng.choices(names, k=flows_per_user):
+            script.extend(FLOWS[name])
+        scripts[1000 + user_id] = script
+    return scripts
+
+def interleave(scripts: dict, rng: random.Random) -> list:
+    """Перемешивает сообщения пользователей, сохраняя порядок внутри каждого"""
+    remaining = {user_id: list(reversed(script)) for user_id, script in scripts.items()}
+    order = [user_id for user_id, script in scripts.items() for _ in script]
+    rng.shuffle(order)
+    return [(user_id, remaining[user_id].pop()) for user_id in order]
+
+def make_update(update_id: int, user_id: int, text: str, bot) -> Update:
+    """Обновление с текстовым сообщением пользователя (команды - с сущностью bot_command)"""
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}'},
+        'text': text,
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+    return Update.de_json({'update_id': update_id, 'message': message}, bot)
+
+class HandlerTimings:
+    """Оборачивает колбэки обработчиков приложения и собирает их задержки"""
+    
+    def __init__(self):
+        self.timings = defaultdict(list)
+    
+    def instrument(self, application):
+        """Подменяет колбэки всех обработчиков (включая состояния диалогов)"""
+        for handlers in application.handlers.values():
+            for handler in handlers:
+                self._instrument_handler(handler)
+    
+    def _instrument_handler(self, handler):
+        if isinstance(handler, ConversationHandler):
+            for nested in handler.entry_points + handler.fallbacks:
+                self._instrument_handler(nested)
+            for state_handlers in handler.states.values():
+                for nested in state_handlers:
+                    self._instrument_handler(nested)
+            return
+        # Маршрутизатор меню: задержки по обработчикам кнопок
+        router = getattr(handler.callback, '__self__', None)
+        if isinstance(router, TextRouter):
+            router.routes = {text: self._timed(callback) for text, callback in router.routes.items()}
+            router.fallback = self._timed(router.fallback)
+            return
+        handler.callback = self._timed(handler.callback)
+    
+    def _timed(self, callback):
+        name = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+        
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            started = time.perf_counter()
+            try:
+                return await callback(update, context)
+            finally:
+                self.timings[name].append((time.perf_counter() - started) * 1000)
+        return wrapper
+    
+    def summary(self) -> dict:
+        return {name: latency_summary(values) for name, values in sorted(self.timings.items())}
+
+async def monitor_loop_lag(samples: list, interval: float = 0.01):
+    """Отставание цикла событий: насколько позже запланированного просыпается sleep"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, (loop.time() - started - interval) * 1000))
+
+async def run_load(users: int, flows_per_user: int, rate: float, api_latency: float, seed: int,
+                   concurrency: int = MAX_CONCURRENT_UPDATES) -> dict:
+    """Поднимает приложение, прогоняет обновления и возвращает метрики"""
+    rng = random.Random(seed)
+    request = FakeBotRequest(latency=api_latency)
+    application = setup_bot(token=LOAD_TEST_TOKEN, request=request, max_concurrent_updates=concurrency)
+    
+    handler_timings = HandlerTimings()
+    handler_timings.instrument(application)
+    
+    errors = []
+    
+    async def count_error(update, context):
+        errors.append(repr(context.error))
+    application.add_error_handler(count_error)
+    
+    # Задержка обновления: от постановки в очередь до конца обработки
+    enqueued_at = {}
+    update_latencies = []
+    process_update = application.process_update
+    
+    async def timed_process_update(update):
+        try:
+            await process_update(update)
+        finally:
+            update_latencies.append((time.perf_counter() - enqueued_at.pop(update.update_id)) * 1000)
+    application.process_update = timed_process_update
+    
+    messages = interleave(build_scripts(users, flows_per_user, rng), rng)
+    updates = [make_update(update_id, user_id, text, application.bot)
+               for update_id, (user_id, text) in enumerate(messages, start=1)]
+    
+    loop_lag = []
+    await application.initialize()
+    await application.start()
+    lag_task = asyncio.create_task(monitor_loop_lag(loop_lag))
+    
+    started = time.perf_counter()
+    try:
+        for index, update in enumerate(updates):
+            # Равномерная подача с заданной частотой (0 - без ограничения)
+            if rate:
+                delay = started + index / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            enqueued_at[update.update_id] = time.perf_counter()
+            await application.update_queue.put(update)
+        
+        await application.update_queue.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        lag_task.cancel()
+        await application.stop()
+        await application.shutdown()
+    
+    return {
+        'users': users,
+        'updates': len(updates),
+        'target_rate_per_s': rate,
+        'concurrency': concurrency,
+        'api_latency_ms': api_latency * 1000,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_s': round(len(updates) / elapsed, 1) if elapsed > 0 else 0.0,
+        'update_latency': latency_summary(update_latencies),
+        'loop_lag': latency_summary(loop_lag),
+        'handlers': handler_timings.summary(),
+        'errors': len(errors),
+        'error_samples': errors[:5],
+        'bot_api_calls': request.get_stats(),
+        'lanes': application.update_processor.get_stats(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.telegram_load',
+                                     description="Нагрузочный прогон обработчиков Telegram")
+    parser.add_argument('--users', type=int, default=200, help="Одновременных пользователей")
+    parser.add_argument('--flows', type=int, default=5, help="Сценариев на пользователя")
+    parser.add_argument('--rate', type=float, default=500, help="Обновлений в секунду (0 - без ограничения)")
+    parser.add_argument('--api-latency-ms', type=float, default=0.0, help="Имитация задержки Bot API")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENT_UPDATES,
+                        help="Одновременно обрабатываемых обновлений")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help="Файл результатов JSON")
+    args = parser.parse_args()
+    
+    try:
+        report = asyncio.run(run_load(args.users, args.flows, args.rate, args.api_latency_ms / 1000, args.seed,
+                                      args.concurrency))
+    finally:
+        scratch.cleanup()
+    report['timestamp'] = datetime.now().isoformat(timespec='seconds')
+    
+    print(f"📨 Обновлений: {report['updates']} за {report['elapsed_s']} с "
+          f"({report['throughput_per_s']} в секунду), ошибок: {report['errors']}")
+    latency = report['update_latency']
+    print(f"⏱️ Задержка обновления: p50 {latency['p50_ms']} мс, p95 {latency['p95_ms']} мс, "
+          f"p99 {latency['p99_ms']} мс")
+    print(f"🔁 Отставание цикла событий: p99 {report['loop_lag']['p99_ms']} мс, "
+          f"max {report['loop_lag']['max_ms']} мс")
+    print("🧩 Обработчики (p95, мс):")
+    for name, stats in sorted(report['handlers'].items(), key=lambda item: -item[1]['p95_ms']):
+        print(f"  {name:<48} {stats['count']:>6} вызовов  p95 {stats['p95_ms']:>9.3f}")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ Результаты сохранены в {args.output}")
+    
+    return 0 if not report['errors'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
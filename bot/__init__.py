@@ -11,25 +11,26 @@ from .handlers import (
     show_wallets,
     show_babylon_rules,
     show_help,
-    handle_menu_commands,
     show_debts_main_menu
 )
 
+# Маршрутизация кнопок меню и быстрого ввода
+from .router import TextRouter, create_menu_router, handle_free_text
+
 # Обработчики транзакций
 from .transactions_handlers import (
     show_transactions_menu,
-    show_transaction_history,
-    handle_transactions_menu_commands
+    show_transaction_history
 )
 
 # Обработчики аналитики
 from .analytics_handlers import (
     show_analytics_menu,
-    handle_analytics_commands,
     show_financial_overview,
     show_spending_analysis,
     show_income_analysis,
-    show_financial_charts
+    show_financial_charts,
+    show_savings_goal
 )
 
 # Обработчики бюджетирования
@@ -37,7 +38,6 @@ from .budget_handlers import (
     show_budgets_menu,
     show_my_budgets,
     show_budget_recommendations,
-    handle_budget_menu_commands,
     create_budget_conversation_handler
 )
 
@@ -45,14 +45,12 @@ from .budget_handlers import (
 from .settings_handlers import (
     show_settings_menu,
     show_current_settings,
-    handle_settings_menu_commands,
     create_settings_conversation_handler
 )
 
 # Обработчики редактирования транзакций
 from .transaction_editor_handlers import (
     show_edit_menu,
-    handle_edit_menu_commands,
     create_edit_conversation_handler
 )
 
@@ -76,7 +74,6 @@ from .debt_handlers import (
 )
 
 from .debt_conversations import create_debt_conversation_handler
-from .debt_menu_handlers import handle_debt_menu_commands  # ← ПРАВИЛЬНЫЙ ИМПОРТ
 
 # Conversation handlers для долгов
 from .debt_handlers import create_debt_payment_conversation_handler
@@ -91,38 +88,38 @@ __all__ = [
     'show_wallets', 
     'show_babylon_rules',
     'show_help',
-    'handle_menu_commands',
     'show_debts_main_menu',
     
+    # Router
+    'TextRouter',
+    'create_menu_router',
+    'handle_free_text',
+    
     # Transactions handlers
     'show_transactions_menu',
     'show_transaction_history',
-    'handle_transactions_menu_commands',
     
     # Analytics handlers
     'show_analytics_menu',
-    'handle_analytics_commands',
     'show_financial_overview',
     'show_spending_analysis',
     'show_income_analysis',
     'show_financial_charts',
+    'show_savings_goal',
     
     # Budget handlers
     'show_budgets_menu',
     'show_my_budgets',
     'show_budget_recommendations',
-    'handle_budget_menu_commands',
     'create_budget_conversation_handler',
     
     # Settings handlers
     'show_settings_menu',
     'show_current_settings',
-    'handle_settings_menu_commands',
     'create_settings_conversation_handler',
     
     # Transaction editor handlers
     'show_edit_menu',
-    'handle_edit_menu_commands',
     'create_edit_conversation_handler',
     
     # Transaction handlers
@@ -142,6 +139,5 @@ __all__ = [
     'show_debts_menu',
     'show_snowball_plan',
     'show_debt_freedom_progress',
-    'show_debt_milestones',
-    'handle_debt_menu_commands'  # ← ДОБАВЛЯЕМ СЮДА
+    'show_debt_milestones'
 ]
\ No newline at end of file
@@ -0,0 +1,63 @@
+# bot/admin_handlers.py - АДМИНИСТРАТИВНЫЕ КОМАНДЫ
+import logging
+import os
+import time
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from database.profiler import query_profiler
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Telegram ID администраторов через запятую: ADMIN_IDS=123,456
+ADMIN_IDS = {int(value) for value in os.getenv('ADMIN_IDS', '').replace(' ', '').split(',') if value}
+
+STATS_TOP = 10
+
+def is_admin(user_id: int) -> bool:
+    return user_id in ADMIN_IDS
+
+def _format_calls(title: str, calls: dict) -> str:
+    """Самые медленные вызовы по p95"""
+    if not calls:
+        return f"*{title}:* нет вызовов\n"
+    
+    text = f"*{title}* (p95 / среднее, мс):\n"
+    slowest = sorted(calls.items(), key=lambda item: -item[1]['p95_ms'])[:STATS_TOP]
+    for name, stats in slowest:
+        errors = f", ошибок {stats['errors']}" if stats['errors'] else ""
+        text += f"• `{name}`: {stats['p95_ms']:.1f} / {stats['avg_ms']:.1f} ({stats['calls']} выз.{errors})\n"
+    return text
+
+async def show_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Метрики обработчиков, сервисов и базы данных (только для администраторов)"""
+    user_id = update.message.from_user.id
+    if not is_admin(user_id):
+        logger.info(f"Команда /stats от пользователя {user_id} без прав администратора")
+        return
+    
+    try:
+        uptime = int(time.time() - metrics.started_at)
+        gauges = metrics.get_gauges()
+        
+        text = f"📈 *Метрики бота* (сбор {uptime // 3600} ч {uptime % 3600 // 60} мин)\n\n"
+        text += _format_calls("Обработчики", metrics.get_calls('bot_handler')) + "\n"
+        text += _format_calls("Сервисы", metrics.get_calls('service')) + "\n"
+        
+        text += "*Состояние:*\n"
+        for name, value in sorted(gauges.items()):
+            text += f"• `{name}`: {value}\n"
+        
+        # Профилировщик SQL включается переменной SQL_PROFILE=1
+        if query_profiler.enabled:
+            text += "\n*SQL по суммарному времени* (всего / макс, мс):\n"
+            for query in query_profiler.get_top(5):
+                text += f"• {query['total_ms']:.0f} / {query['max_ms']:.1f} ({query['count']} выз.): `{query['statement'][:80]}`\n"
+        
+        await update.message.reply_text(text, parse_mode='Markdown')
+    
+    except Exception as e:
+        logger.error(f"❌ Ошибка вывода метрик: {e}")
+        await update.message.reply_text("❌ Ошибка при получении метрик.")
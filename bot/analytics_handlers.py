@@ -4,9 +4,11 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from services.async_services import async_financial_analytics, async_savings_projection
 from services.financial_analytics import financial_analytics
 from utils.financial_charts import financial_charts
 from keyboards.analytics_menu import get_analytics_menu_keyboard
+from utils.validators import validate_amount
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,7 @@ async def show_analytics_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
 📈 *Анализ расходов* - детализация по категориям  
 💰 *Динамика доходов* - тренды и структура доходов
 📉 *Графики и отчеты* - визуализация данных
+🎯 /goal 300000 - прогноз цели Золотого запаса
 
 💡 *Все данные актуальны за последние 30 дней*
 """
@@ -36,7 +39,9 @@ async def show_financial_overview(update: Update, context: ContextTypes.DEFAULT_
     user_id = update.message.from_user.id
     
     try:
-        overview = financial_analytics.get_financial_overview(user_id)
+        # Один запрос-сводка, обзор собирается из нее без обращений к базе
+        snapshot = await async_financial_analytics.get_user_snapshot(user_id)
+        overview = financial_analytics.build_overview(snapshot)
         
         if not overview['success']:
             await update.message.reply_text(
@@ -57,6 +62,8 @@ async def show_financial_overview(update: Update, context: ContextTypes.DEFAULT_
         # Ключевые показатели
         overview_text += f"📈 *Накопления:* {overview['savings_rate']:.1f}% от доходов\n"
         overview_text += f"📉 *Расходы:* {overview['expense_ratio']:.1f}% от доходов\n"
+        if overview['active_debt'] > 0:
+            overview_text += f"🏛️ *Активные долги:* {overview['active_debt']:,.0f} руб.\n"
         
         # Финансовый поток
         net_flow = overview['net_flow']
@@ -101,7 +108,7 @@ async def show_spending_analysis(update: Update, context: ContextTypes.DEFAULT_T
     user_id = update.message.from_user.id
     
     try:
-        analysis = financial_analytics.get_spending_analysis(user_id)
+        analysis = await async_financial_analytics.get_spending_analysis(user_id)
         
         if not analysis['success'] or analysis['total_expenses'] == 0:
             await update.message.reply_text(
@@ -150,7 +157,7 @@ async def show_income_analysis(update: Update, context: ContextTypes.DEFAULT_TYP
     user_id = update.message.from_user.id
     
     try:
-        analysis = financial_analytics.get_income_analysis(user_id)
+        analysis = await async_financial_analytics.get_income_analysis(user_id)
         
         if not analysis['success'] or analysis['total_income'] == 0:
             await update.message.reply_text(
@@ -200,36 +207,39 @@ async def show_financial_charts(update: Update, context: ContextTypes.DEFAULT_TY
     user_id = update.message.from_user.id
     
     try:
-        # Получаем данные для графиков
-        overview = financial_analytics.get_financial_overview(user_id)
-        spending_analysis = financial_analytics.get_spending_analysis(user_id)
-        income_analysis = financial_analytics.get_income_analysis(user_id)
+        # Данные графиков кэшируются до изменения сводок пользователя,
+        # готовый текст графиков - по содержимому данных
+        data = await async_financial_analytics.get_chart_data(user_id)
+        if not data['success']:
+            raise RuntimeError(data['error'])
+        overview, spending, income_analysis = data['overview'], data['spending'], data['income']
         
-        charts_text = "📉 *ГРАФИКИ И ОТЧЕТЫ*\n\n"
+        charts = ["📉 *ГРАФИКИ И ОТЧЕТЫ*"]
         
         # График доходы vs расходы
         if overview['success'] and overview['monthly_income'] > 0:
-            income_vs_expenses = financial_charts.create_income_vs_expenses(
+            charts.append(financial_charts.create_income_vs_expenses(
                 overview['monthly_income'], 
                 overview['monthly_expenses']
-            )
-            charts_text += income_vs_expenses + "\n\n"
+            ))
+        
+        # Расходы по категориям
+        if spending['success'] and spending['categories']:
+            charts.append(financial_charts.create_spending_by_category(spending['categories']))
         
         # График прогресса накоплений
         if overview['success']:
-            savings_chart = financial_charts.create_savings_progress(
+            charts.append(financial_charts.create_savings_progress(
                 overview['gold_reserve'],
                 overview['monthly_income']
-            )
-            charts_text += savings_chart + "\n\n"
+            ))
         
         # Динамика по месяцам
         if income_analysis['success'] and income_analysis['monthly_income']:
-            trend_chart = financial_charts.create_monthly_trend(income_analysis['monthly_income'])
-            charts_text += trend_chart
+            charts.append(financial_charts.create_monthly_trend(income_analysis['monthly_income']))
         
         await update.message.reply_text(
-            charts_text,
+            "\n\n".join(chart.rstrip() for chart in charts),
             parse_mode='Markdown',
             reply_markup=get_analytics_menu_keyboard()
         )
@@ -241,23 +251,34 @@ async def show_financial_charts(update: Update, context: ContextTypes.DEFAULT_TY
             reply_markup=get_analytics_menu_keyboard()
         )
 
-async def handle_analytics_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обрабатывает команды меню аналитики"""
-    text = update.message.text
+async def show_savings_goal(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /goal <сумма>: когда Золотой запас дорастет до цели"""
+    user_id = update.message.from_user.id
+    
+    if not context.args:
+        await update.message.reply_text(
+            "🎯 Укажите цель накоплений: `/goal 300000`",
+            parse_mode='Markdown'
+        )
+        return
+    
+    is_valid, target = validate_amount(context.args[0].replace(',', '.'))
+    if not is_valid:
+        await update.message.reply_text(target)
+        return
     
-    if text == '📊 Финансовый обзор':
-        await show_financial_overview(update, context)
-    elif text == '📈 Анализ расходов':
-        await show_spending_analysis(update, context)
-    elif text == '💰 Динамика доходов':
-        await show_income_analysis(update, context)
-    elif text == '📉 Графики и отчеты':
-        await show_financial_charts(update, context)
-    elif text == '🏠 Главное меню':
-        from .common import show_main_menu
-        await show_main_menu(update, context)
-    else:
+    try:
+        # Расчет ограничен по времени, поэтому выполняется прямо в обработчике
+        projection = await async_savings_projection.project_goal(user_id, target)
+        await update.message.reply_text(
+            financial_charts.create_savings_projection(projection),
+            parse_mode='Markdown',
+            reply_markup=get_analytics_menu_keyboard()
+        )
+    
+    except Exception as e:
+        logger.error(f"Savings goal error: {e}")
         await update.message.reply_text(
-            "❌ Команда не распознана",
+            "❌ Ошибка при расчете прогноза",
             reply_markup=get_analytics_menu_keyboard()
-        )
\ No newline at end of file
+        )
@@ -1,34 +1,81 @@
 # bot/bot.py - ФИНАЛЬНАЯ ВЕРСИЯ
 import os
 import logging
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, MessageHandler, filters
+from telegram.request import BaseRequest
 
-from .handlers import start, handle_menu_commands
-from .analytics_handlers import handle_analytics_commands
+from .handlers import start
 from .conversations import create_transaction_conversation_handler
 from .debt_conversations import create_debt_conversation_handler
 from .debt_handlers import create_debt_payment_conversation_handler
-from .debt_menu_handlers import handle_debt_menu_commands
-from .budget_handlers import create_budget_conversation_handler, handle_budget_menu_commands
-from .settings_handlers import create_settings_conversation_handler, handle_settings_menu_commands
-from .transaction_editor_handlers import create_edit_conversation_handler, handle_edit_menu_commands
-from .transactions_handlers import handle_transactions_menu_commands
+from .budget_handlers import create_budget_conversation_handler
+from .settings_handlers import create_settings_conversation_handler
+from .transaction_editor_handlers import create_edit_conversation_handler
+from .transactions_handlers import handle_history_page, export_transactions
+from .admin_handlers import show_stats
+from .analytics_handlers import show_savings_goal
+from .import_handlers import show_import_help, handle_import_document
+from .instrumentation import instrument_application
+from .jobs import schedule_jobs
+from .lanes import UserLaneProcessor
+from .router import create_menu_router
+from services.async_services import db_executor
+from services.advanced_analytics import advanced_analytics
+from services.babylon_service import babylon_service
+from database.writer import db_writer
+from database.idempotency import idempotency_store
+from utils.metrics import start_metrics_server
 
 logger = logging.getLogger(__name__)
 
-def setup_bot():
-    """Настраивает бота с полным функционалом"""
-    BOT_TOKEN = os.getenv('BOT_TOKEN')
+# Порт локального эндпоинта метрик Prometheus (не задан - эндпоинт выключен)
+METRICS_PORT = os.getenv('METRICS_PORT')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Одновременно обрабатываемые обновления разных пользователей (1 - строго по очереди)
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', 64))
+
+# Обновления одного пользователя в очереди его полосы (сверх - отбрасываются)
+LANE_MAX_PENDING = int(os.getenv('LANE_MAX_PENDING', 20))
+
+async def shutdown_db_executor(application: Application):
+    """Останавливает пул потоков и поток-писатель БД после остановки бота"""
+    db_executor.shutdown()
+    db_writer.stop()
+
+def setup_bot(token: str = None, request: BaseRequest = None,
+              max_concurrent_updates: int = MAX_CONCURRENT_UPDATES):
+    """
+    Настраивает бота с полным функционалом.
+    request подменяет HTTP-клиент Bot API (нагрузочный стенд без Telegram)
+    """
+    BOT_TOKEN = token or os.getenv('BOT_TOKEN')
     
     if not BOT_TOKEN:
         raise ValueError("BOT_TOKEN не найден в переменных окружения")
     
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Обновления разных пользователей - параллельно, одного пользователя - по очереди;
+    # при переполненной очереди записи БД новые обновления придерживаются
+    update_processor = UserLaneProcessor(max_concurrent_updates, backpressure=db_writer.is_backlogged,
+                                         max_lane_pending=LANE_MAX_PENDING)
+    builder = (Application.builder()
+               .token(BOT_TOKEN)
+               .concurrent_updates(update_processor)
+               .post_shutdown(shutdown_db_executor))
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
     
     # 📍 ВАЖНО: Порядок обработчиков от специфичных к общим
     
     # 1. Команда /start (самая специфичная)
     application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("stats", show_stats))
+    application.add_handler(CommandHandler("import", show_import_help))
+    application.add_handler(CommandHandler("goal", show_savings_goal))
+    
+    # Файлы выписок для импорта (CSV, OFX, QFX)
+    application.add_handler(MessageHandler(filters.Document.ALL, handle_import_document))
     
     # 2. Conversation Handlers (очень специфичные)
     application.add_handler(create_transaction_conversation_handler())
@@ -38,56 +85,16 @@ def setup_bot():
     application.add_handler(create_settings_conversation_handler())
     application.add_handler(create_edit_conversation_handler())
     
-    # 3. Обработчик меню транзакций
-    transactions_commands_pattern = r'^(💳 Добавить доход|💸 Добавить расход|📋 История операций|✏️ Редактировать|🏠 Главное меню)$'
-    application.add_handler(MessageHandler(
-        filters.Regex(transactions_commands_pattern), 
-        handle_transactions_menu_commands
-    ))
-    
-    # 4. Обработчик меню бюджетирования
-    budget_commands_pattern = r'^(💰 Мои бюджеты|🎯 Установить бюджет|💡 Рекомендации|🏠 Главное меню)$'
-    application.add_handler(MessageHandler(
-        filters.Regex(budget_commands_pattern), 
-        handle_budget_menu_commands
-    ))
-    
-    # 5. Обработчик меню настроек
-    settings_commands_pattern = r'^(⚙️ Настройки накоплений|📊 Текущие настройки|🏠 Главное меню)$'
-    application.add_handler(MessageHandler(
-        filters.Regex(settings_commands_pattern), 
-        handle_settings_menu_commands
-    ))
-    
-    # 6. Обработчик меню редактирования
-    edit_commands_pattern = r'^(✏️ Выбрать транзакцию|🗑️ Удалить транзакцию|📋 Список транзакций|🏠 Главное меню)$'
-    application.add_handler(MessageHandler(
-        filters.Regex(edit_commands_pattern), 
-        handle_edit_menu_commands
-    ))
-    
-    # 7. Обработчик меню аналитики
-    analytics_commands_pattern = r'^(📊 Финансовый обзор|📈 Анализ расходов|💰 Динамика доходов|📉 Графики и отчеты|🏠 Главное меню)$'
-    application.add_handler(MessageHandler(
-        filters.Regex(analytics_commands_pattern), 
-        handle_analytics_commands
-    ))
-    
-    # 8. Обработчик меню долгов
-    debt_commands_pattern = r'^(📜 Мои долги|➕ Добавить долг|💳 Погасить долг|📋 План погашения|📈 Прогресс свободы|🎯 Вехи освобождения|🏠 Главное меню)$'
-    application.add_handler(MessageHandler(
-        filters.Regex(debt_commands_pattern), 
-        handle_debt_menu_commands
-    ))
+    # Inline-кнопки истории операций: листание и выгрузка
+    application.add_handler(CallbackQueryHandler(handle_history_page, pattern=r'^hist:'))
+    application.add_handler(CallbackQueryHandler(export_transactions, pattern=r'^export:(csv|json)$'))
     
-    # 9. Обработчик быстрого ввода долгов
-    application.add_handler(MessageHandler(
-        filters.Regex(r'^долг .*'), 
-        handle_debt_menu_commands
-    ))
+    # 3. Кнопки всех меню и быстрый ввод (самый общий - ПОСЛЕДНИЙ):
+    #    один обработчик с таблицей маршрутов вместо цепочки Regex-фильтров
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, create_menu_router().route))
     
-    # 10. Обработчик главного меню (самый общий - ПОСЛЕДНИЙ)
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_menu_commands))
+    # Счетчики, ошибки и задержки всех обработчиков, активные диалоги
+    instrument_application(application)
     
     logger.info("✅ Бот настроен с полным функционалом")
     return application
@@ -96,6 +103,13 @@ def run_bot():
     """Запускает бота с полным функционалом"""
     try:
         application = setup_bot()
+        # Пересчеты и очистка ключей идемпотентности идут ночью; без очереди задач - один раз при запуске
+        if not schedule_jobs(application):
+            babylon_service.recompute_all_progress()
+            advanced_analytics.recompute_all_health_scores()
+            idempotency_store.prune()
+        if METRICS_PORT:
+            start_metrics_server(int(METRICS_PORT), METRICS_HOST)
         print("🏛️ Вавилонский финансовый бот запущен")
         print("🎉 НОВЫЙ ФУНКЦИОНАЛ АКТИВИРОВАН:")
         print("   • 💼 Упрощенное меню транзакций")
@@ -3,8 +3,7 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CommandHandler, filters
 
-from services.budget_planner import budget_planner
-from services.simple_budget_service import simple_budget_service
+from services.async_services import async_budget_planner
 from keyboards.budget_menu import get_budget_management_keyboard, get_budget_categories_keyboard, get_budget_confirmation_keyboard
 from keyboards.main_menu import get_main_menu_keyboard, remove_keyboard
 from .common import show_main_menu
@@ -38,7 +37,7 @@ async def show_my_budgets(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
     
     try:
-        progress = budget_planner.get_budget_progress(user_id)
+        progress = await async_budget_planner.get_budget_progress(user_id)
         
         if not progress['success']:
             await update.message.reply_text(
@@ -116,7 +115,7 @@ async def handle_budget_category(update: Update, context: ContextTypes.DEFAULT_T
     
     # Проверяем существующий бюджет
     user_id = update.message.from_user.id
-    existing_budget = budget_planner.check_existing_budget(user_id, category)
+    existing_budget = await async_budget_planner.check_existing_budget(user_id, category)
     
     if existing_budget is not None:
         context.user_data['existing_budget'] = existing_budget
@@ -178,7 +177,7 @@ async def handle_budget_amount(update: Update, context: ContextTypes.DEFAULT_TYP
         user_id = update.message.from_user.id
         category = context.user_data['budget_category']
         
-        result = budget_planner.set_monthly_budget(user_id, category, amount)
+        result = await async_budget_planner.set_monthly_budget(user_id, category, amount)
         
         if result['success']:
             await update.message.reply_text(
@@ -204,7 +203,7 @@ async def show_budget_recommendations(update: Update, context: ContextTypes.DEFA
     user_id = update.message.from_user.id
     
     try:
-        suggestions = budget_planner.suggest_budgets(user_id)
+        suggestions = await async_budget_planner.suggest_budgets(user_id)
         
         if not suggestions['success']:
             await update.message.reply_text(
@@ -245,24 +244,6 @@ async def show_budget_recommendations(update: Update, context: ContextTypes.DEFA
             reply_markup=get_budget_management_keyboard()
         )
 
-async def handle_budget_menu_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обрабатывает команды меню бюджетирования"""
-    text = update.message.text
-    
-    if text == '💰 Мои бюджеты':
-        await show_my_budgets(update, context)
-    elif text == '🎯 Установить бюджет':
-        return await start_set_budget(update, context)
-    elif text == '💡 Рекомендации':
-        await show_budget_recommendations(update, context)
-    elif text == '🏠 Главное меню':
-        await show_main_menu(update, context)
-    else:
-        await update.message.reply_text(
-            "❌ Команда не распознана",
-            reply_markup=get_budget_management_keyboard()
-        )
-
 async def cancel_budget_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Отменяет диалог установки бюджета"""
     await update.message.reply_text(
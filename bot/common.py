@@ -3,6 +3,14 @@
 from keyboards.main_menu import get_main_menu_keyboard
 from services.babylon_service import babylon_service
 
+def update_key(update) -> str:
+    """
+    Ключ идемпотентности операции записи: id обновления Telegram.
+    При перезапуске опроса Telegram повторно доставляет то же обновление
+    с тем же update_id, и сервис не применит операцию второй раз
+    """
+    return f"update:{update.update_id}"
+
 async def show_main_menu(update, context):
     """Показывает главное меню с вавилонской мудростью"""
     quote = babylon_service.get_daily_quote()
@@ -8,14 +8,11 @@ from utils.constants import AMOUNT, CATEGORY, DESCRIPTION
 from utils.validators import validate_amount
 from utils.categorizers import clean_category_name, categorize_expense, categorize_income
 
-from services.transaction_service import transaction_service
-from services.simple_budget_service import simple_budget_service
-from services.babylon_service import babylon_service
-from services.wallet_service import wallet_service  # ✅ ДОБАВИЛИ ИМПОРТ
+from services.async_services import async_wallet_service, async_transaction_service, async_simple_budget_service
 
 from keyboards.main_menu import get_main_menu_keyboard, get_category_keyboard, remove_keyboard
 
-from .common import show_main_menu
+from .common import show_main_menu, update_key
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +23,7 @@ logger = logging.getLogger(__name__)
 async def add_income(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Чистое вавилонское добавление дохода."""
     user_id = update.message.from_user.id
-    wallets = wallet_service.get_all_wallets(user_id)
+    wallets = await async_wallet_service.get_all_wallets(user_id)
     
     # Динамическая подсказка на основе текущего состояния
     if wallets['gold_reserve'] == 0:
@@ -44,7 +41,7 @@ async def add_income(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def add_expense(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Чистое вавилонское добавление расхода."""
     user_id = update.message.from_user.id
-    living_budget = wallet_service.get_wallet_balance(user_id, 'living_budget')  # ✅ ИСПРАВИЛИ
+    living_budget = await async_wallet_service.get_wallet_balance(user_id, 'living_budget')  # ✅ ИСПРАВИЛИ
     
     await update.message.reply_text(
         f"💸 *Добавление расхода*\n\n"
@@ -70,7 +67,7 @@ async def amount_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # ВАВИЛОНСКАЯ ПРОВЕРКА: расходы только из 90%
     if context.user_data['type'] == 'expense':
-        affordability = wallet_service.can_afford_expense(user_id, amount)  # ✅ ИСПРАВИЛИ
+        affordability = await async_wallet_service.can_afford_expense(user_id, amount)  # ✅ ИСПРАВИЛИ
         
         if not affordability['can_afford']:
             await update.message.reply_text(
@@ -125,24 +122,22 @@ async def save_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE, d
     try:
         if transaction_type == 'income':
             # ЧИСТОЕ ВАВИЛОНСКОЕ РАСПРЕДЕЛЕНИЕ
-            result = transaction_service.add_income(user_id, amount, category, description)
+            result = await async_transaction_service.add_income(
+                user_id, amount, category, description, idempotency_key=update_key(update)
+            )
             
             if result['success']:
-                # Обновляем прогресс правила 10%
-                babylon_service.update_rule_progress(user_id, '10_percent_rule', 100.0)
-                
                 await update.message.reply_text(result['message'], parse_mode='Markdown')
             else:
                 await update.message.reply_text(f"❌ {result['error']}")
                 
         else:  # expense
             # ЧИСТАЯ ВАВИЛОНСКАЯ ПРОВЕРКА
-            result = transaction_service.add_expense(user_id, amount, category, description)
+            result = await async_transaction_service.add_expense(
+                user_id, amount, category, description, idempotency_key=update_key(update)
+            )
             
             if result['success']:
-                # Обновляем прогресс контроля расходов
-                await update_expense_progress(user_id)
-                
                 # Проверка бюджетного лимита
                 await check_budget_limit(update, user_id, category, amount)
                 
@@ -159,23 +154,9 @@ async def save_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE, d
     context.user_data.clear()
     return ConversationHandler.END
 
-async def update_expense_progress(user_id: int):
-    """Обновляет прогресс контроля расходов"""
-    living_budget = wallet_service.get_wallet_balance(user_id, 'living_budget')  # ✅ ИСПРАВИЛИ
-    gold_reserve = wallet_service.get_wallet_balance(user_id, 'gold_reserve')    # ✅ ИСПРАВИЛИ
-    total_balance = living_budget + gold_reserve
-    
-    if total_balance > 0:
-        # Идеал: living_budget составляет 90% от общего баланса
-        ideal_ratio = 90.0
-        current_ratio = (living_budget / total_balance * 100) if total_balance > 0 else 0
-        progress = min(100.0, (current_ratio / ideal_ratio * 100))
-        
-        babylon_service.update_rule_progress(user_id, 'control_expenses', progress)
-
 async def check_budget_limit(update: Update, user_id: int, category: str, amount: float):
     """Проверяет лимит категории с вавилонским акцентом"""
-    budget_check = simple_budget_service.check_spending(user_id, category, amount)
+    budget_check = await async_simple_budget_service.check_spending(user_id, category, amount)
     
     if budget_check.get('has_limit') and budget_check['exceeded']:
         await update.message.reply_text(
@@ -217,10 +198,11 @@ async def quick_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if amount < 0:  # Отрицательная сумма = доход
             amount = abs(amount)
             category = categorize_income(category_word)
-            result = transaction_service.add_income(user_id, amount, category, description)
+            result = await async_transaction_service.add_income(
+                user_id, amount, category, description, idempotency_key=update_key(update)
+            )
             
             if result['success']:
-                babylon_service.update_rule_progress(user_id, '10_percent_rule', 100.0)
                 message = result['message']
             else:
                 message = f"❌ {result['error']}"
@@ -229,7 +211,7 @@ async def quick_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
             category = categorize_expense(category_word)
             
             # ✅ ДОБАВИЛИ ПРОВЕРКУ ДОСТУПНОСТИ СРЕДСТВ
-            affordability = wallet_service.can_afford_expense(user_id, amount)
+            affordability = await async_wallet_service.can_afford_expense(user_id, amount)
             if not affordability['can_afford']:
                 await update.message.reply_text(
                     f"🚫 *Недостаточно средств в Бюджете на жизнь!*\n"
@@ -239,11 +221,12 @@ async def quick_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
                 return
             
-            result = transaction_service.add_expense(user_id, amount, category, description)
+            result = await async_transaction_service.add_expense(
+                user_id, amount, category, description, idempotency_key=update_key(update)
+            )
             
             if result['success']:
-                await update_expense_progress(user_id)
-                budget_check = simple_budget_service.check_spending(user_id, category, amount)
+                budget_check = await async_simple_budget_service.check_spending(user_id, category, amount)
                 
                 if budget_check.get('has_limit') and budget_check['exceeded']:
                     message = f"{result['message']}\n\n⚠️ *Превышен бюджет категории!*"
@@ -6,8 +6,7 @@ from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CommandHandler, filters
 
-from services.debt_service import debt_service
-from services.wallet_service import wallet_service
+from services.async_services import async_debt_service
 from keyboards.main_menu import get_main_menu_keyboard, remove_keyboard
 from .common import show_main_menu
 
@@ -119,7 +118,7 @@ async def save_debt(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
     
     try:
-        result = debt_service.add_debt(
+        result = await async_debt_service.add_debt(
             user_id=user_id,
             creditor=user_data['creditor'],
             amount=user_data['amount'],
@@ -129,10 +128,6 @@ async def save_debt(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         if result['success']:
             await update.message.reply_text(result['message'], parse_mode='Markdown')
-            
-            # Обновляем прогресс правила "Свобода от долгов"
-            await update_debt_rule_progress(user_id)
-            
         else:
             await update.message.reply_text(f"❌ {result['error']}")
     
@@ -145,22 +140,6 @@ async def save_debt(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data.clear()
     return ConversationHandler.END
 
-async def update_debt_rule_progress(user_id: int):
-    """Обновляет прогресс правила 'Свобода от долгов'"""
-    debts = debt_service.get_active_debts(user_id)
-    
-    if not debts:
-        # Нет долгов - правило выполнено на 100%
-        from services.babylon_service import babylon_service
-        babylon_service.update_rule_progress(user_id, 'debt_free', 100.0)
-    else:
-        # Прогресс основан на уменьшении общей суммы долгов
-        total_debt = sum(debt.current_amount for debt in debts)
-        # Чем меньше долг, тем выше прогресс (упрощенная логика)
-        progress = max(0.0, min(100.0, (1 - (total_debt / (total_debt + 10000))) * 100))
-        from services.babylon_service import babylon_service
-        babylon_service.update_rule_progress(user_id, 'debt_free', progress)
-
 # ============================================================================
 # БЫСТРЫЙ ВВОД ДОЛГОВ
 # ============================================================================
@@ -192,11 +171,10 @@ async def quick_debt_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
         due_date = datetime.strptime(due_date_text, '%d.%m.%Y') if due_date_text else None
         
         user_id = update.message.from_user.id
-        result = debt_service.add_debt(user_id, creditor, amount, interest_rate, due_date)
+        result = await async_debt_service.add_debt(user_id, creditor, amount, interest_rate, due_date)
         
         if result['success']:
             await update.message.reply_text(result['message'], parse_mode='Markdown')
-            await update_debt_rule_progress(user_id)
         else:
             await update.message.reply_text(f"❌ {result['error']}")
             
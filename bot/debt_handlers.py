@@ -5,11 +5,10 @@ from datetime import datetime, timedelta
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CommandHandler, filters
 
-from services.debt_service import debt_service
-from services.wallet_service import wallet_service
+from services.async_services import async_wallet_service, async_debt_service
 from keyboards.main_menu import get_main_menu_keyboard, remove_keyboard
 from keyboards.debt_menu import get_debt_management_keyboard, get_debt_selection_keyboard
-from .common import show_main_menu
+from .common import show_main_menu, update_key
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +24,7 @@ async def show_debts_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
     
     try:
-        debts = debt_service.get_active_debts(user_id)
+        debts = await async_debt_service.get_active_debts(user_id)
         
         if not debts:
             await update.message.reply_text(
@@ -63,7 +62,7 @@ async def show_snowball_plan(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = update.message.from_user.id
     
     try:
-        plan = debt_service.calculate_snowball_plan(user_id)
+        plan = await async_debt_service.calculate_snowball_plan(user_id)
         
         if not plan['has_debts']:
             await update.message.reply_text(
@@ -80,7 +79,12 @@ async def show_snowball_plan(update: Update, context: ContextTypes.DEFAULT_TYPE)
         for item in plan['plan']:
             plan_text += f"🥇 *{item['priority']}. {item['creditor']}*\n"
             plan_text += f"   💰 Сумма: {item['amount']:,.0f} руб.\n"
-            plan_text += f"   💳 Рекомендуемый платеж: {item['recommended_payment']:,.0f} руб.\n\n"
+            plan_text += f"   💳 Рекомендуемый платеж: {item['recommended_payment']:,.0f} руб.\n"
+            if item['payoff_month']:
+                plan_text += f"   🗓️ Погашен через: {item['payoff_month']} мес.\n"
+            plan_text += "\n"
+        
+        plan_text += format_strategy_comparison(plan['simulation'])
         
         plan_text += "💡 *Совет Вавилона:* «Начинайте с малых долгов — каждая победа придает сил для больших сражений!»"
         
@@ -94,12 +98,29 @@ async def show_snowball_plan(update: Update, context: ContextTypes.DEFAULT_TYPE)
         logger.error(f"Snowball plan error: {e}")
         await update.message.reply_text("❌ Ошибка при расчете плана погашения.")
 
+def format_strategy_comparison(simulation: dict) -> str:
+    """Сравнение стратегий погашения: срок, проценты, просроченные долги"""
+    text = f"📊 *Сравнение стратегий* (платеж {simulation['monthly_payment']:,.0f} руб./мес.):\n"
+    for key, strategy in simulation['strategies'].items():
+        marker = '✅' if key == simulation['recommended'] else '▫️'
+        if strategy['months'] is None:
+            term = "не погашается за 30 лет"
+        else:
+            term = f"{strategy['months']} мес. (до {strategy['debt_free_date']})"
+        text += f"{marker} *{strategy['name']}:* {term}, проценты {strategy['total_interest']:,.0f} руб.\n"
+        if strategy['late']:
+            text += f"   ⚠️ После срока: {', '.join(strategy['late'])}\n"
+    
+    if simulation['interest_saved'] > 0:
+        text += f"\n💰 Лавина сэкономит на процентах {simulation['interest_saved']:,.0f} руб.\n"
+    return text + "\n"
+
 async def show_debt_freedom_progress(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает прогресс освобождения от долгов"""
     user_id = update.message.from_user.id
     
     try:
-        debts = debt_service.get_active_debts(user_id)
+        debts = await async_debt_service.get_active_debts(user_id)
         total_debt = sum(debt.current_amount for debt in debts)
         
         if total_debt == 0:
@@ -140,7 +161,7 @@ async def show_debt_milestones(update: Update, context: ContextTypes.DEFAULT_TYP
     user_id = update.message.from_user.id
     
     try:
-        debts = debt_service.get_active_debts(user_id)
+        debts = await async_debt_service.get_active_debts(user_id)
         total_debt = sum(debt.current_amount for debt in debts)
         initial_debt = sum(debt.initial_amount for debt in debts)
         
@@ -184,7 +205,7 @@ async def show_debt_statistics(update: Update, context: ContextTypes.DEFAULT_TYP
     user_id = update.message.from_user.id
     
     try:
-        stats = debt_service.get_debt_statistics(user_id)
+        stats = await async_debt_service.get_debt_statistics(user_id)
         
         stats_text = "📊 *Статистика долгов*\n\n"
         
@@ -217,7 +238,7 @@ async def show_debt_statistics(update: Update, context: ContextTypes.DEFAULT_TYP
 async def start_payment_flow(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начинает процесс погашения долга"""
     user_id = update.message.from_user.id
-    debts = debt_service.get_active_debts(user_id)
+    debts = await async_debt_service.get_active_debts(user_id)
     
     if not debts:
         await update.message.reply_text(
@@ -226,7 +247,7 @@ async def start_payment_flow(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return ConversationHandler.END
     
-    budget_balance = wallet_service.get_wallet_balance(user_id, 'living_budget')
+    budget_balance = await async_wallet_service.get_wallet_balance(user_id, 'living_budget')
     
     if budget_balance <= 0:
         await update.message.reply_text(
@@ -326,7 +347,9 @@ async def handle_payment_amount(update: Update, context: ContextTypes.DEFAULT_TY
             context.user_data['suggested_full_payment'] = True
             return ENTER_PAYMENT_AMOUNT
         
-        result = debt_service.make_payment(user_id, selected_debt.id, payment_amount)
+        result = await async_debt_service.make_payment(
+            user_id, selected_debt.id, payment_amount, idempotency_key=update_key(update)
+        )
         
         if result['success']:
             await update.message.reply_text(result['message'], parse_mode='Markdown')
@@ -350,7 +373,9 @@ async def handle_payment_confirmation(update: Update, context: ContextTypes.DEFA
         selected_debt = context.user_data['selected_debt']
         payment_amount = selected_debt.current_amount
         
-        result = debt_service.make_payment(user_id, selected_debt.id, payment_amount)
+        result = await async_debt_service.make_payment(
+            user_id, selected_debt.id, payment_amount, idempotency_key=update_key(update)
+        )
         
         if result['success']:
             await update.message.reply_text(result['message'], parse_mode='Markdown')
@@ -380,7 +405,7 @@ async def cancel_debt_payment(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def show_debts_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает главное меню управления долгами"""
     user_id = update.message.from_user.id
-    debts = debt_service.get_active_debts(user_id)
+    debts = await async_debt_service.get_active_debts(user_id)
     
     menu_text = "🏛️ *Управление Долгами*\n\n"
     
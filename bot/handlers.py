@@ -6,14 +6,9 @@ from telegram.ext import ContextTypes
 
 from services.wallet_service import wallet_service
 from services.babylon_service import babylon_service
-from services.transaction_service import transaction_service
-from services.debt_service import debt_service
+from services.async_services import async_wallet_service, async_babylon_service, async_debt_service
 
 from keyboards.main_menu import get_main_menu_keyboard
-from keyboards.analytics_menu import get_analytics_menu_keyboard
-from .common import show_main_menu
-from .analytics_handlers import show_analytics_menu, handle_analytics_commands
-from .conversations import add_income, add_expense, quick_input
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +16,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Чистое вавилонское приветствие"""
     user = update.message.from_user
     
-    wallet_service.init_user_wallets(user.id)
-    babylon_service.init_user_rules(user.id)
+    await async_wallet_service.init_user_wallets(user.id)
+    await async_babylon_service.init_user_rules(user.id)
     
     welcome_text = babylon_service.get_welcome_message()
     
@@ -37,7 +32,7 @@ async def show_wallets(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.message.from_user.id
     
     try:
-        wallets = wallet_service.get_all_wallets(user_id)
+        wallets = await async_wallet_service.get_all_wallets(user_id)
         
         wallets_text = "🏦 *Ваши Вавилонские Кошельки*\n\n"
         
@@ -61,7 +56,7 @@ async def show_babylon_rules(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = update.message.from_user.id
     
     try:
-        progress = babylon_service.get_user_progress(user_id)
+        progress = await async_babylon_service.get_user_progress(user_id)
         rules_info = babylon_service.rules
         
         rules_text = "🏛️ *7 Правил Богатства из Вавилона*\n\n"
@@ -107,6 +102,8 @@ async def show_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
 • `1500 еда обед` - добавить расход
 • `-50000 аванс` - доход (отрицательная сумма)
 • `долг Банк 50000` - добавить долг
+• /import - загрузить историю из выписки (CSV, OFX)
+• /goal 300000 - когда Золотой запас дорастет до цели
 
 *💎 Помни:* \"Сначала заплати себе - это основа финансовой свободы\"
 """
@@ -115,7 +112,7 @@ async def show_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def show_debts_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает меню управления долгами при нажатии на кнопку 'Долги'"""
     user_id = update.message.from_user.id
-    debts = debt_service.get_active_debts(user_id)
+    debts = await async_debt_service.get_active_debts(user_id)
     
     menu_text = "🏛️ *Управление Долгами*\n\n"
     
@@ -135,43 +132,6 @@ async def show_debts_main_menu(update: Update, context: ContextTypes.DEFAULT_TYP
         reply_markup=get_debt_management_keyboard()
     )
 
-async def handle_menu_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обрабатывает команды главного меню"""
-    text = update.message.text
-    
-    if text == '💼 Транзакции':
-        from .transactions_handlers import show_transactions_menu
-        await show_transactions_menu(update, context)
-    elif text == '💰 Бюджеты':
-        from .budget_handlers import show_budgets_menu
-        await show_budgets_menu(update, context)
-    elif text == '⚙️ Настройки':  # ← НОВАЯ КНОПКА
-        from .settings_handlers import show_settings_menu
-        await show_settings_menu(update, context)
-    elif text == '💳 Добавить доход':
-        return await add_income(update, context)
-    elif text == '💸 Добавить расход':
-        return await add_expense(update, context)
-    elif text == '🏦 Мои кошельки':
-        await show_wallets(update, context)
-    elif text == '📊 Аналитика':
-        await show_analytics_menu(update, context)
-    elif text == '🏛️ Правила Вавилона':
-        await show_babylon_rules(update, context)
-    elif text == '📜 Долги':
-        await show_debts_main_menu(update, context)
-    elif text == 'ℹ️ Помощь':
-        await show_help(update, context)
-    else:
-        # Пробуем быстрый ввод ТОЛЬКО если это не команда меню
-        if not text.startswith(('📜', '➕', '💳', '📋', '📈', '🎯', '📊', '🏠', '🏛️', '🔮', '💰', '📉', '💼', '✏️', '⚙️', '🗑️')):
-            await quick_input(update, context)
-        else:
-            await update.message.reply_text(
-                "❌ Команда не распознана. Используйте кнопки меню.",
-                reply_markup=get_main_menu_keyboard()
-            )
-
 def _create_progress_bar(progress: float) -> str:
     """Создает текстовый прогресс-бар"""
     filled = '█' * int(progress / 10)
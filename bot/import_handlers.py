@@ -0,0 +1,120 @@
+# bot/import_handlers.py - ИМПОРТ ИСТОРИИ ИЗ ФАЙЛОВ ВЫПИСОК
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+
+from services.async_services import async_import_service
+from services.import_service import PARSERS
+
+logger = logging.getLogger(__name__)
+
+# Bot API отдает боту файлы не больше 20 МБ
+MAX_IMPORT_FILE_SIZE = 20 * 1024 * 1024
+
+# Не чаще одного изменения сообщения о прогрессе в секунду (ограничения Telegram)
+PROGRESS_INTERVAL = 1.0
+
+IMPORT_HELP = """
+📥 *Импорт истории операций*
+
+Отправьте файл выписки документом:
+• *CSV* с заголовком: колонки `дата` и `сумма` обязательны,
+  `тип`, `категория`, `описание` - по желанию
+• *OFX/QFX* - выписка из интернет-банка
+
+💡 Без колонки типа отрицательная сумма - расход, положительная - доход.
+Категории определяются по словам категории и описания.
+Выгрузка из 📋 Истории операций импортируется как есть.
+"""
+
+async def show_import_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /import: формат файлов для импорта"""
+    await update.message.reply_text(IMPORT_HELP, parse_mode='Markdown')
+
+def _progress_reporter(message, loop: asyncio.AbstractEventLoop):
+    """
+    Колбэк прогресса для потока-писателя: раз в PROGRESS_INTERVAL секунд
+    планирует изменение сообщения в цикле событий бота
+    """
+    last_update = [0.0]
+    
+    def report(imported: int):
+        now = time.monotonic()
+        if now - last_update[0] < PROGRESS_INTERVAL:
+            return
+        last_update[0] = now
+        asyncio.run_coroutine_threadsafe(
+            message.edit_text(f"⏳ Импортировано операций: {imported:,}"), loop
+        )
+    return report
+
+def format_import_result(result: dict, markdown: bool = True) -> str:
+    """Итоговое сообщение импорта (markdown=False - без разметки Telegram)"""
+    # Строки ошибок содержат значения из файла: в разметке они экранируются
+    escape = (lambda value: escape_markdown(value, version=1)) if markdown else str
+    title = "*Импорт завершен*" if markdown else "Импорт завершен"
+    text = (
+        f"✅ {title}\n\n"
+        f"📥 Операций: {result['imported']:,}\n"
+    )
+    if result['date_from']:
+        text += f"📅 Период: {result['date_from'][:10]} — {result['date_to'][:10]}\n"
+    text += (
+        f"💳 Доходы: {result['income']:,.0f} руб. (в Золотой запас: {result['gold_reserve']:,.0f} руб.)\n"
+        f"💸 Расходы: {result['expenses']:,.0f} руб.\n"
+    )
+    if result['skipped']:
+        text += f"\n⚠️ Пропущено строк с ошибками: {result['skipped']:,}\n"
+        text += ''.join(f"• {escape(error)}\n" for error in result['errors'])
+    return text
+
+async def handle_import_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Принимает файл выписки и импортирует его одной транзакцией"""
+    document = update.message.document
+    user_id = update.message.from_user.id
+    file_format = os.path.splitext(document.file_name or '')[1].lstrip('.').lower()
+    
+    if file_format not in PARSERS:
+        await update.message.reply_text("❌ Поддерживаются файлы CSV, OFX и QFX. Подробнее: /import")
+        return
+    if document.file_size and document.file_size > MAX_IMPORT_FILE_SIZE:
+        await update.message.reply_text("❌ Файл больше 20 МБ: разделите выписку на части")
+        return
+    
+    status = await update.message.reply_text("⏳ Загружаем файл...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"import.{file_format}")
+            telegram_file = await document.get_file()
+            await telegram_file.download_to_drive(path)
+            
+            progress = _progress_reporter(status, asyncio.get_running_loop())
+            result = await async_import_service.import_file(user_id, path, file_format, progress=progress)
+    
+    except Exception as e:
+        logger.error(f"Import error for user {user_id}: {e}")
+        await status.edit_text("❌ Ошибка при импорте файла")
+        return
+    
+    if not result['success']:
+        await status.edit_text(f"❌ {result['error']}")
+        return
+    
+    # Импорт уже зафиксирован: ошибка отправки итога не должна выглядеть
+    # как ошибка импорта, иначе повторная загрузка задвоит операции
+    try:
+        await status.edit_text(format_import_result(result), parse_mode='Markdown')
+    except TelegramError as e:
+        logger.error(f"Import result message error for user {user_id}: {e}")
+        try:
+            await update.message.reply_text(format_import_result(result, markdown=False))
+        except TelegramError as e:
+            logger.error(f"Import result plain message error for user {user_id}: {e}")
@@ -0,0 +1,101 @@
+# bot/instrumentation.py - МЕТРИКИ ОБРАБОТЧИКОВ TELEGRAM
+import functools
+import time
+
+from telegram.ext import Application, BaseHandler, ConversationHandler
+
+from utils.metrics import metrics
+from .lanes import UserLaneProcessor
+from .router import TextRouter
+
+metrics.describe('bot_active_conversations', 'gauge', 'Незавершенные диалоги по ConversationHandler')
+metrics.describe('bot_active_lanes', 'gauge', 'Пользователи с обновлениями в обработке')
+metrics.describe('bot_waiting_updates', 'gauge', 'Обновления, ждущие своей очереди в полосе пользователя')
+metrics.describe('bot_throttled_updates_total', 'counter', 'Обновления, придержанные из-за очереди записи БД')
+metrics.describe('bot_dropped_updates_total', 'counter', 'Обновления, отброшенные из-за переполненной полосы пользователя')
+
+def handler_name(callback) -> str:
+    """Метка обработчика: модуль.функция"""
+    return f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+
+def conversation_name(handler: ConversationHandler) -> str:
+    """Имя диалога: заданное name или обработчик первой точки входа"""
+    if handler.name:
+        return handler.name
+    return handler_name(handler.entry_points[0].callback) if handler.entry_points else 'conversation'
+
+def instrument_application(application: Application, registry=None):
+    """
+    Оборачивает колбэки всех обработчиков приложения (включая точки входа,
+    состояния и fallbacks диалогов) сбором метрик и регистрирует счетчик
+    активных диалогов каждого ConversationHandler и полос пользователей
+    """
+    registry = registry or metrics
+    conversations = []
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            _instrument_handler(handler, registry, conversations)
+    
+    def active_conversations():
+        # Завершенные диалоги удаляются из словаря состояний обработчика
+        return [('bot_active_conversations', {'conversation': conversation_name(handler)},
+                 len(getattr(handler, '_conversations', {})))
+                for handler in conversations]
+    
+    registry.register_collector(active_conversations)
+    
+    processor = application.update_processor
+    if isinstance(processor, UserLaneProcessor):
+        def lanes():
+            stats = processor.get_stats()
+            return [('bot_active_lanes', {}, stats['active_lanes']),
+                    ('bot_waiting_updates', {}, stats['waiting']),
+                    ('bot_throttled_updates_total', {}, stats['throttled']),
+                    ('bot_dropped_updates_total', {}, stats['dropped'])]
+        
+        registry.register_collector(lanes)
+
+def _instrument_handler(handler: BaseHandler, registry, conversations: list):
+    if isinstance(handler, ConversationHandler):
+        conversations.append(handler)
+        for nested in handler.entry_points + handler.fallbacks:
+            _instrument_handler(nested, registry, conversations)
+        for state_handlers in handler.states.values():
+            for nested in state_handlers:
+                _instrument_handler(nested, registry, conversations)
+        return
+    # Маршрутизатор меню: метрики по обработчикам маршрутов, а не по одному route
+    router = getattr(handler.callback, '__self__', None)
+    if isinstance(router, TextRouter):
+        _instrument_router(router, registry)
+        return
+    if not getattr(handler.callback, '__metrics_wrapped__', False):
+        handler.callback = _timed_callback(handler.callback, registry)
+
+def _instrument_router(router: TextRouter, registry):
+    wrapped = {}
+    for text, callback in router.routes.items():
+        # Один обработчик на несколько кнопок оборачивается один раз
+        if callback not in wrapped:
+            wrapped[callback] = (callback if getattr(callback, '__metrics_wrapped__', False)
+                                 else _timed_callback(callback, registry))
+        router.routes[text] = wrapped[callback]
+    if not getattr(router.fallback, '__metrics_wrapped__', False):
+        router.fallback = _timed_callback(router.fallback, registry)
+
+def _timed_callback(callback, registry):
+    labels = (('handler', handler_name(callback)),)
+    
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await callback(update, context)
+            failed = False
+            return result
+        finally:
+            registry.observe_call('bot_handler', labels, time.perf_counter() - started, failed)
+    
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
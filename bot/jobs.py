@@ -0,0 +1,60 @@
+# bot/jobs.py - ЗАДАЧИ ПО РАСПИСАНИЮ
+import os
+import logging
+from datetime import time, timezone
+
+from telegram.ext import Application, ContextTypes
+
+from services.async_services import async_advanced_analytics, async_babylon_service, async_idempotency_store
+
+logger = logging.getLogger(__name__)
+
+# Время ночных задач (UTC), ЧЧ:ММ
+NIGHTLY_JOB_TIME = os.getenv('NIGHTLY_JOB_TIME', '03:00')
+
+async def recompute_rule_progress(context: ContextTypes.DEFAULT_TYPE):
+    """Пересчитывает прогресс правил Вавилона всех пользователей"""
+    result = await async_babylon_service.recompute_all_progress()
+    
+    if result['success']:
+        logger.info(f"✅ Прогресс правил пересчитан: {result['users']} пользователей, {result['updated']} записей")
+    else:
+        logger.error(f"❌ Ночной пересчет прогресса правил не выполнен: {result['error']}")
+
+async def recompute_health_scores(context: ContextTypes.DEFAULT_TYPE):
+    """Пересчитывает и сохраняет индекс финансового здоровья всех пользователей"""
+    result = await async_advanced_analytics.recompute_all_health_scores()
+    
+    if result['success']:
+        logger.info(f"✅ Индекс финансового здоровья пересчитан: {result['users']} пользователей")
+    else:
+        logger.error(f"❌ Ночной пересчет индекса здоровья не выполнен: {result['error']}")
+
+async def prune_idempotency_keys(context: ContextTypes.DEFAULT_TYPE):
+    """Удаляет ключи идемпотентности старше срока хранения обновлений Telegram"""
+    try:
+        deleted = await async_idempotency_store.prune()
+        logger.info(f"✅ Удалено устаревших ключей идемпотентности: {deleted}")
+    except Exception as e:
+        logger.error(f"❌ Ночная очистка ключей идемпотентности не выполнена: {e}")
+
+# Ночные задачи (имя в очереди задач - имя функции)
+NIGHTLY_JOBS = (recompute_rule_progress, recompute_health_scores, prune_idempotency_keys)
+
+def schedule_jobs(application: Application) -> bool:
+    """
+    Ставит ночные задачи в очередь задач приложения и по одному запуску каждой сразу
+    после старта бота. Очереди задач нужен APScheduler (python-telegram-bot[job-queue]);
+    без него возвращает False
+    """
+    if application.job_queue is None:
+        logger.warning("⚠️ Очередь задач недоступна (нужен APScheduler) - ночные задачи не запланированы")
+        return False
+    
+    hour, minute = (int(part) for part in NIGHTLY_JOB_TIME.split(':'))
+    for job in NIGHTLY_JOBS:
+        application.job_queue.run_daily(job, time(hour, minute, tzinfo=timezone.utc), name=job.__name__)
+        application.job_queue.run_once(job, 0, name=f'{job.__name__}_startup')
+    
+    logger.info(f"🌙 Ночные задачи ({len(NIGHTLY_JOBS)}) запланированы на {NIGHTLY_JOB_TIME} UTC")
+    return True
@@ -0,0 +1,155 @@
+# bot/lanes.py - ПОСЛЕДОВАТЕЛЬНАЯ ОБРАБОТКА ОБНОВЛЕНИЙ ОДНОГО ПОЛЬЗОВАТЕЛЯ
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Сколько обновлений разных пользователей обрабатывается одновременно
+DEFAULT_MAX_CONCURRENT_UPDATES = 64
+
+# Сколько обновлений одного пользователя может ждать в очереди полосы
+DEFAULT_MAX_LANE_PENDING = 20
+
+# Как часто перепроверять перегрузку, пока обновления придержаны
+BACKPRESSURE_POLL_INTERVAL = 0.05
+
+def lane_key(update: object) -> Optional[int]:
+    """Полоса обновления: пользователь, иначе чат; служебные обновления - без полосы"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+class _Lane:
+    """Очередь полосы: обновления пользователя, ждущие выполняющееся"""
+    
+    __slots__ = ('queue',)
+    
+    def __init__(self):
+        self.queue = deque()
+
+class UserLaneProcessor(BaseUpdateProcessor):
+    """
+    Обработчик обновлений с полосами по пользователям.
+    Обновления одного пользователя выполняются строго по очереди в порядке
+    поступления, обновления разных пользователей - параллельно в пределах
+    max_concurrent_updates.
+    
+    У полосы один потребитель - первое обновление пользователя: оно выполняет
+    свою корутину, а затем корутины из очереди полосы. Следующие обновления
+    только встают в очередь и сразу освобождают место max_concurrent_updates,
+    поэтому пользователь занимает не больше одного места и поток его обновлений
+    не задерживает остальных. Полоса удаляется, когда очередь опустела.
+    В очереди полосы не больше max_lane_pending обновлений: сверх этого
+    обновления пользователя отбрасываются и считаются в статистике dropped.
+    
+    backpressure - проверка перегрузки (например, переполненной очереди записи БД):
+    пока она истинна, новые обновления ждут до постановки в полосу, и занятые ими
+    места max_concurrent_updates не дают приложению брать следующие. Ожидающие
+    проходят строго в порядке поступления, поэтому порядок обновлений пользователя
+    сохраняется.
+    """
+    
+    def __init__(self, max_concurrent_updates: int = DEFAULT_MAX_CONCURRENT_UPDATES,
+                 backpressure: Optional[Callable[[], bool]] = None,
+                 max_lane_pending: int = DEFAULT_MAX_LANE_PENDING):
+        super().__init__(max_concurrent_updates)
+        self._backpressure = backpressure
+        self.max_lane_pending = max_lane_pending
+        self._lanes: Dict[int, _Lane] = {}
+        # Очередь ожидающих перегрузку (asyncio.Lock пропускает по порядку)
+        self._gate = asyncio.Lock()
+        self._waiting = 0
+        self._stats = {'processed': 0, 'queued': 0, 'dropped': 0, 'max_lane_depth': 0,
+                       'throttled': 0, 'throttled_seconds': 0.0}
+    
+    async def _wait_for_capacity(self):
+        """Ждет, пока перегрузка не спадет, пропуская ожидающих по порядку"""
+        if self._backpressure is None:
+            return
+        # Пока кто-то ждет, новые обновления встают за ним, даже если перегрузка спала
+        if not self._waiting and not self._backpressure():
+            return
+        
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._stats['throttled'] += 1
+        self._waiting += 1
+        try:
+            async with self._gate:
+                while self._backpressure():
+                    await asyncio.sleep(BACKPRESSURE_POLL_INTERVAL)
+        finally:
+            self._waiting -= 1
+        self._stats['throttled_seconds'] += loop.time() - started
+    
+    async def do_process_update(self, update: object, coroutine) -> None:
+        # Ожидание - до выбора полосы: и новые, и встающие в очередь обновления
+        # придерживаются, пока перегрузка не спадет
+        try:
+            await self._wait_for_capacity()
+        except BaseException:
+            coroutine.close()
+            raise
+        
+        key = lane_key(update)
+        if key is None:
+            await coroutine
+            return
+        
+        lane = self._lanes.get(key)
+        if lane is not None:
+            if len(lane.queue) >= self.max_lane_pending:
+                coroutine.close()
+                self._stats['dropped'] += 1
+                logger.warning(f"⚠️ Очередь обновлений пользователя {key} переполнена - обновление отброшено")
+                return
+            
+            # Полоса занята: обновление выполнит ее потребитель, место освобождается
+            lane.queue.append(coroutine)
+            self._stats['queued'] += 1
+            self._stats['max_lane_depth'] = max(self._stats['max_lane_depth'], len(lane.queue) + 1)
+            return
+        
+        lane = self._lanes[key] = _Lane()
+        try:
+            while True:
+                try:
+                    await coroutine
+                except Exception as e:
+                    # Ошибка одного обновления не останавливает очередь полосы
+                    logger.error(f"❌ Ошибка обработки обновления пользователя {key}: {e}")
+                finally:
+                    self._stats['processed'] += 1
+                
+                if not lane.queue:
+                    break
+                coroutine = lane.queue.popleft()
+        finally:
+            # При отмене (остановка приложения) невыполненные обновления закрываются
+            for pending in lane.queue:
+                pending.close()
+            del self._lanes[key]
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+    
+    def get_stats(self) -> dict:
+        """Метрики полос: активные полосы, обновления в ожидании своей очереди, отброшенные"""
+        return {
+            **self._stats,
+            'active_lanes': len(self._lanes),
+            'waiting': sum(len(lane.queue) for lane in self._lanes.values()),
+            'max_concurrent_updates': self.max_concurrent_updates,
+        }
@@ -0,0 +1,122 @@
+# bot/router.py - МАРШРУТИЗАЦИЯ ТЕКСТОВЫХ СООБЩЕНИЙ ПО ТАБЛИЦЕ
+import logging
+from typing import Awaitable, Callable, Dict
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from keyboards.main_menu import get_main_menu_keyboard
+from .common import show_main_menu
+from .handlers import show_wallets, show_babylon_rules, show_help, show_debts_main_menu
+from .conversations import add_income, add_expense, quick_input
+from .transactions_handlers import show_transactions_menu, show_transaction_history
+from .transaction_editor_handlers import (
+    show_edit_menu, start_edit_transaction, start_delete_transaction, show_transactions_list
+)
+from .budget_handlers import show_budgets_menu, show_my_budgets, start_set_budget, show_budget_recommendations
+from .settings_handlers import show_settings_menu, start_savings_settings, show_current_settings
+from .analytics_handlers import (
+    show_analytics_menu, show_financial_overview, show_spending_analysis,
+    show_income_analysis, show_financial_charts
+)
+from .debt_handlers import (
+    show_debts_menu, show_snowball_plan, show_debt_freedom_progress,
+    show_debt_milestones, show_debt_statistics, start_payment_flow
+)
+from .debt_conversations import start_add_debt_flow, quick_debt_input
+
+logger = logging.getLogger(__name__)
+
+Route = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable]
+
+# Первые символы кнопок меню: такой текст не разбирается как быстрый ввод
+MENU_PREFIXES = ('📜', '➕', '💳', '📋', '📈', '🎯', '📊', '🏠', '🏛️', '🔮', '💰', '📉', '💼', '✏️', '⚙️', '🗑️')
+
+def build_menu_routes() -> Dict[str, Route]:
+    """Точный текст кнопки -> обработчик (кнопки всех меню из keyboards)"""
+    return {
+        # Главное меню
+        '💼 Транзакции': show_transactions_menu,
+        '💰 Бюджеты': show_budgets_menu,
+        '🏦 Мои кошельки': show_wallets,
+        '📊 Аналитика': show_analytics_menu,
+        '⚙️ Настройки': show_settings_menu,
+        '📜 Долги': show_debts_main_menu,
+        '🏛️ Правила Вавилона': show_babylon_rules,
+        'ℹ️ Помощь': show_help,
+        '🏠 Главное меню': show_main_menu,
+        
+        # Транзакции (доход и расход обычно перехватывает диалог транзакции)
+        '💳 Добавить доход': add_income,
+        '💸 Добавить расход': add_expense,
+        '📋 История операций': show_transaction_history,
+        '✏️ Редактировать': show_edit_menu,
+        
+        # Редактирование
+        '✏️ Выбрать транзакцию': start_edit_transaction,
+        '🗑️ Удалить транзакцию': start_delete_transaction,
+        '📋 Список транзакций': show_transactions_list,
+        
+        # Бюджеты
+        '💰 Мои бюджеты': show_my_budgets,
+        '🎯 Установить бюджет': start_set_budget,
+        '💡 Рекомендации': show_budget_recommendations,
+        
+        # Настройки
+        '⚙️ Настройки накоплений': start_savings_settings,
+        '📊 Текущие настройки': show_current_settings,
+        
+        # Аналитика
+        '📊 Финансовый обзор': show_financial_overview,
+        '📈 Анализ расходов': show_spending_analysis,
+        '💰 Динамика доходов': show_income_analysis,
+        '📉 Графики и отчеты': show_financial_charts,
+        
+        # Долги
+        '📜 Мои долги': show_debts_menu,
+        '➕ Добавить долг': start_add_debt_flow,
+        '💳 Погасить долг': start_payment_flow,
+        '📋 План погашения': show_snowball_plan,
+        '📈 Прогресс свободы': show_debt_freedom_progress,
+        '🎯 Вехи освобождения': show_debt_milestones,
+        '📊 Статистика долгов': show_debt_statistics,
+    }
+
+async def handle_free_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Текст не кнопки: быстрый ввод долга, быстрый ввод операции или подсказка"""
+    text = update.message.text
+    
+    if text.startswith('долг '):
+        return await quick_debt_input(update, context)
+    
+    # Незнакомая кнопка (например, со старой клавиатуры) - не сумма
+    if text.startswith(MENU_PREFIXES):
+        await update.message.reply_text(
+            "❌ Команда не распознана. Используйте кнопки меню.",
+            reply_markup=get_main_menu_keyboard()
+        )
+        return
+    
+    return await quick_input(update, context)
+
+class TextRouter:
+    """
+    Один обработчик текстовых сообщений вместо цепочки Regex-фильтров:
+    кнопка находится одним поиском в словаре, остальное уходит в fallback.
+    """
+    
+    def __init__(self, routes: Dict[str, Route], fallback: Route):
+        self.routes = routes
+        self.fallback = fallback
+    
+    def resolve(self, text: str) -> Route:
+        """Обработчик для текста сообщения"""
+        return self.routes.get(text, self.fallback)
+    
+    async def route(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Колбэк MessageHandler: выполняет обработчик маршрута"""
+        return await self.resolve(update.message.text)(update, context)
+
+def create_menu_router() -> TextRouter:
+    """Маршрутизатор меню бота (свой для каждого приложения)"""
+    return TextRouter(build_menu_routes(), handle_free_text)
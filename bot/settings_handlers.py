@@ -3,8 +3,7 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CommandHandler, filters
 
-from services.user_settings_service import user_settings_service
-from services.wallet_service import wallet_service
+from services.async_services import async_user_settings_service
 from keyboards.settings_menu import get_settings_menu_keyboard, get_savings_options_keyboard
 from keyboards.main_menu import get_main_menu_keyboard, remove_keyboard
 from .common import show_main_menu
@@ -17,11 +16,11 @@ SETTINGS_OPTION, SAVINGS_PERCENT = range(20, 22)
 async def show_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает меню настроек"""
     user_id = update.message.from_user.id
-    settings = user_settings_service.get_user_settings(user_id)
+    settings = await async_user_settings_service.get_user_settings(user_id)
     
     if not settings:
-        user_settings_service.init_user_settings(user_id)
-        settings = user_settings_service.get_user_settings(user_id)
+        await async_user_settings_service.init_user_settings(user_id)
+        settings = await async_user_settings_service.get_user_settings(user_id)
     
     current_status = "включены" if settings.auto_savings else "выключены"
     current_percent = settings.savings_rate
@@ -48,11 +47,11 @@ async def show_settings_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def show_current_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает текущие настройки пользователя"""
     user_id = update.message.from_user.id
-    settings = user_settings_service.get_user_settings(user_id)
+    settings = await async_user_settings_service.get_user_settings(user_id)
     
     if not settings:
-        user_settings_service.init_user_settings(user_id)
-        settings = user_settings_service.get_user_settings(user_id)
+        await async_user_settings_service.init_user_settings(user_id)
+        settings = await async_user_settings_service.get_user_settings(user_id)
     
     auto_savings_emoji = "✅" if settings.auto_savings else "❌"
     auto_savings_text = "включены" if settings.auto_savings else "выключены"
@@ -99,8 +98,8 @@ async def handle_savings_option(update: Update, context: ContextTypes.DEFAULT_TY
         return ConversationHandler.END
     
     if option == '💰 Классические 10%':
-        success = user_settings_service.update_savings_rate(user_id, 10.0)
-        success &= user_settings_service.toggle_auto_savings(user_id, True)
+        success = await async_user_settings_service.update_savings_rate(user_id, 10.0)
+        success &= await async_user_settings_service.toggle_auto_savings(user_id, True)
         
         if success:
             await update.message.reply_text(
@@ -120,7 +119,7 @@ async def handle_savings_option(update: Update, context: ContextTypes.DEFAULT_TY
         return ConversationHandler.END
     
     elif option == '💸 Без накоплений':
-        success = user_settings_service.toggle_auto_savings(user_id, False)
+        success = await async_user_settings_service.toggle_auto_savings(user_id, False)
         
         if success:
             await update.message.reply_text(
@@ -169,8 +168,8 @@ async def handle_savings_percent(update: Update, context: ContextTypes.DEFAULT_T
             return SAVINGS_PERCENT
         
         user_id = update.message.from_user.id
-        success = user_settings_service.update_savings_rate(user_id, percent)
-        success &= user_settings_service.toggle_auto_savings(user_id, True)
+        success = await async_user_settings_service.update_savings_rate(user_id, percent)
+        success &= await async_user_settings_service.toggle_auto_savings(user_id, True)
         
         if success:
             await update.message.reply_text(
@@ -195,22 +194,6 @@ async def handle_savings_percent(update: Update, context: ContextTypes.DEFAULT_T
         )
         return SAVINGS_PERCENT
 
-async def handle_settings_menu_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обрабатывает команды меню настроек"""
-    text = update.message.text
-    
-    if text == '⚙️ Настройки накоплений':
-        return await start_savings_settings(update, context)
-    elif text == '📊 Текущие настройки':
-        await show_current_settings(update, context)
-    elif text == '🏠 Главное меню':
-        await show_main_menu(update, context)
-    else:
-        await update.message.reply_text(
-            "❌ Команда не распознана",
-            reply_markup=get_settings_menu_keyboard()
-        )
-
 async def cancel_settings_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Отменяет диалог настройки"""
     await update.message.reply_text(
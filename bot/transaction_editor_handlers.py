@@ -4,12 +4,10 @@ from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, CommandHandler, filters
 
-from services.transaction_editor import transaction_editor
-from services.transaction_service import transaction_service
+from services.async_services import async_transaction_service, async_transaction_editor
 from keyboards.settings_menu import get_edit_transactions_keyboard, get_edit_confirmation_keyboard
 from keyboards.main_menu import get_main_menu_keyboard, remove_keyboard
 from keyboards.transactions_menu import get_transactions_menu_keyboard
-from .common import show_main_menu
 
 logger = logging.getLogger(__name__)
 
@@ -65,7 +63,7 @@ async def show_edit_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def start_edit_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начинает процесс редактирования транзакции"""
     user_id = update.message.from_user.id
-    transactions = transaction_editor.get_recent_transactions_for_edit(user_id, limit=5)
+    transactions = await async_transaction_editor.get_recent_transactions_for_edit(user_id, limit=5)
     
     if not transactions:
         await update.message.reply_text(
@@ -286,7 +284,7 @@ async def handle_edit_confirmation(update: Update, context: ContextTypes.DEFAULT
             return ConversationHandler.END
         
         # Применяем изменения
-        result = transaction_editor.edit_transaction(
+        result = await async_transaction_editor.edit_transaction(
             user_id, transaction_id,
             new_amount=changes.get('new_amount'),
             new_category=changes.get('new_category'),
@@ -317,7 +315,7 @@ async def handle_edit_confirmation(update: Update, context: ContextTypes.DEFAULT
 async def start_delete_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начинает процесс удаления транзакции"""
     user_id = update.message.from_user.id
-    transactions = transaction_editor.get_recent_transactions_for_edit(user_id, limit=5)
+    transactions = await async_transaction_editor.get_recent_transactions_for_edit(user_id, limit=5)
     
     if not transactions:
         await update.message.reply_text(
@@ -403,7 +401,7 @@ async def handle_delete_execution(update: Update, context: ContextTypes.DEFAULT_
         user_id = update.message.from_user.id
         transaction_id = context.user_data['delete_transaction_id']
         
-        result = transaction_editor.delete_transaction(user_id, transaction_id)
+        result = await async_transaction_editor.delete_transaction(user_id, transaction_id)
         
         if result['success']:
             await update.message.reply_text(
@@ -429,7 +427,7 @@ async def handle_delete_execution(update: Update, context: ContextTypes.DEFAULT_
 async def show_transactions_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает список транзакций для выбора"""
     user_id = update.message.from_user.id
-    transactions = transaction_service.get_transaction_history(user_id, limit=10)
+    transactions = await async_transaction_service.get_transaction_history(user_id, limit=10)
     
     history_text = "📋 *ПОСЛЕДНИЕ ОПЕРАЦИИ*\n\n"
     
@@ -453,24 +451,6 @@ async def show_transactions_list(update: Update, context: ContextTypes.DEFAULT_T
         reply_markup=get_edit_transactions_keyboard()
     )
 
-async def handle_edit_menu_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обрабатывает команды меню редактирования"""
-    text = update.message.text
-    
-    if text == '✏️ Выбрать транзакцию':
-        return await start_edit_transaction(update, context)
-    elif text == '🗑️ Удалить транзакцию':
-        return await start_delete_transaction(update, context)
-    elif text == '📋 Список транзакций':
-        await show_transactions_list(update, context)
-    elif text == '🏠 Главное меню':
-        await show_main_menu(update, context)
-    else:
-        await update.message.reply_text(
-            "❌ Команда не распознана",
-            reply_markup=get_edit_transactions_keyboard()
-        )
-
 async def cancel_edit_conversation(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Отменяет диалог редактирования"""
     await update.message.reply_text(
@@ -1,38 +1,19 @@
 # bot/transactions_handlers.py
 import logging
+import tempfile
+from datetime import datetime
 from telegram import Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
-from services.transaction_service import transaction_service
-from keyboards.transactions_menu import get_transactions_menu_keyboard
+from services.async_services import async_transaction_service, async_export_service
+from keyboards.transactions_menu import get_transactions_menu_keyboard, get_history_page_keyboard
 from keyboards.main_menu import get_main_menu_keyboard
 
 logger = logging.getLogger(__name__)
 
+HISTORY_PAGE_SIZE = 10
 
-async def handle_transactions_menu_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обрабатывает команды меню транзакций"""
-    text = update.message.text
-    
-    if text == '💳 Добавить доход':
-        from .conversations import add_income
-        return await add_income(update, context)
-    elif text == '💸 Добавить расход':
-        from .conversations import add_expense
-        return await add_expense(update, context)
-    elif text == '📋 История операций':
-        await show_transaction_history(update, context)
-    elif text == '✏️ Редактировать':
-        from .transaction_editor_handlers import show_edit_menu  # ← ИЗМЕНЕНИЕ
-        await show_edit_menu(update, context)
-    elif text == '🏠 Главное меню':
-        from .common import show_main_menu
-        await show_main_menu(update, context)
-    else:
-        await update.message.reply_text(
-            "❌ Команда не распознана",
-            reply_markup=get_transactions_menu_keyboard()
-        )
 
 async def show_transactions_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показывает меню управления транзакциями"""
@@ -53,29 +34,39 @@ async def show_transactions_menu(update: Update, context: ContextTypes.DEFAULT_T
         reply_markup=get_transactions_menu_keyboard()
     )
 
+def format_history_page(page: dict) -> str:
+    """Текст страницы истории операций"""
+    history_text = "📋 *ИСТОРИЯ ОПЕРАЦИЙ*\n\n"
+    
+    if not page['transactions']:
+        history_text += "📭 Операций пока нет\n💡 Добавьте первую транзакцию!"
+        return history_text
+    
+    for trans in page['transactions']:
+        emoji = "💳" if trans[0] == 'income' else "💸"
+        sign = "+" if trans[0] == 'income' else "-"
+        history_text += f"{emoji} {trans[2]}: {sign}{trans[1]:,.0f} руб.\n"
+        history_text += f"   📝 {trans[3]}\n"
+        history_text += f"   📅 {trans[4][:16]}\n\n"
+    return history_text
+
 async def show_transaction_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показывает историю последних транзакций"""
+    """Показывает первую страницу истории с кнопками листания и выгрузки"""
     user_id = update.message.from_user.id
     
     try:
-        transactions = transaction_service.get_transaction_history(user_id, limit=10)
-        
-        history_text = "📋 *ПОСЛЕДНИЕ ОПЕРАЦИИ*\n\n"
+        page = await async_transaction_service.get_history_page(user_id, HISTORY_PAGE_SIZE)
         
-        if not transactions:
-            history_text += "📭 Операций пока нет\n💡 Добавьте первую транзакцию!"
+        # Без операций листать и выгружать нечего - оставляем меню транзакций
+        if page['transactions']:
+            reply_markup = get_history_page_keyboard(page)
         else:
-            for i, trans in enumerate(transactions, 1):
-                emoji = "💳" if trans[0] == 'income' else "💸"
-                sign = "+" if trans[0] == 'income' else "-"
-                history_text += f"{i}. {emoji} {trans[2]}: {sign}{trans[1]:,.0f} руб.\n"
-                history_text += f"   📝 {trans[3]}\n"
-                history_text += f"   📅 {trans[4][:16]}\n\n"
+            reply_markup = get_transactions_menu_keyboard()
         
         await update.message.reply_text(
-            history_text,
+            format_history_page(page),
             parse_mode='Markdown',
-            reply_markup=get_transactions_menu_keyboard()
+            reply_markup=reply_markup
         )
         
     except Exception as e:
@@ -85,6 +76,66 @@ async def show_transaction_history(update: Update, context: ContextTypes.DEFAULT
             reply_markup=get_transactions_menu_keyboard()
         )
 
+async def handle_history_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Листание истории: callback_data hist:<newer|older>:<id>:<date>"""
+    query = update.callback_query
+    await query.answer()
+    
+    try:
+        _, direction, transaction_id, date = query.data.split(':', 3)
+        cursor = (date, int(transaction_id))
+        if direction == 'older':
+            page = await async_transaction_service.get_history_page(query.from_user.id, HISTORY_PAGE_SIZE, before=cursor)
+        else:
+            page = await async_transaction_service.get_history_page(query.from_user.id, HISTORY_PAGE_SIZE, after=cursor)
+        
+        await query.edit_message_text(
+            format_history_page(page),
+            parse_mode='Markdown',
+            reply_markup=get_history_page_keyboard(page)
+        )
+    
+    except BadRequest as e:
+        # Повторное нажатие на ту же страницу: Telegram не меняет сообщение
+        if 'not modified' not in str(e).lower():
+            logger.error(f"History page error: {e}")
+    except Exception as e:
+        logger.error(f"History page error: {e}")
+        await query.message.reply_text("❌ Ошибка при листании истории операций")
+
+async def export_transactions(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Выгрузка всех операций документом: callback_data export:<csv|json>.
+    Файл пишется порциями во временный файл на диске в пуле потоков БД
+    """
+    query = update.callback_query
+    export_format = query.data.split(':', 1)[1]
+    user_id = query.from_user.id
+    await query.answer("⏳ Готовим выгрузку...")
+    
+    try:
+        with tempfile.TemporaryFile() as file:
+            result = await async_export_service.write_export(user_id, export_format, file)
+            
+            if not result['success']:
+                await query.message.reply_text(f"❌ {result['error']}")
+                return
+            if not result['rows']:
+                await query.message.reply_text("📭 Операций для выгрузки нет")
+                return
+            
+            file.seek(0)
+            filename = f"operations_{datetime.now():%Y%m%d}.{export_format}"
+            await query.message.reply_document(
+                document=file,
+                filename=filename,
+                caption=f"📤 Выгружено операций: {result['rows']:,}"
+            )
+    
+    except Exception as e:
+        logger.error(f"Export error for user {user_id}: {e}")
+        await query.message.reply_text("❌ Ошибка при выгрузке операций")
+
 async def start_edit_transaction(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Начинает процесс редактирования транзакции"""
     # Временная заглушка - функция будет реализована в Фазе 3
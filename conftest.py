@@ -0,0 +1,54 @@
+# conftest.py - ОБЩИЕ ФИКСТУРЫ ТЕСТОВ
+import atexit
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Глобальная база тестов - во временном каталоге, а не finance.db в корне проекта
+# (DB_PATH читается при импорте database.connection)
+if 'DB_PATH' not in os.environ:
+    _session_dir = tempfile.mkdtemp(prefix='finance-tests-')
+    atexit.register(shutil.rmtree, _session_dir, ignore_errors=True)
+    os.environ['DB_PATH'] = os.path.join(_session_dir, 'finance.db')
+
+def _reset_caches():
+    """Сбрасывает кэши сервисов: их записи относятся к другой базе"""
+    from database.idempotency import idempotency_store
+    from services.debt_service import debt_service
+    from services.financial_analytics import financial_analytics
+    from services.wallet_service import wallet_service
+    
+    idempotency_store._recent.invalidate()
+    wallet_service._balance_cache.invalidate()
+    debt_service.invalidate_plan_cache()
+    financial_analytics._chart_cache.invalidate()
+
+@pytest.fixture
+def isolated_db(tmp_path, monkeypatch):
+    """
+    Своя база для теста: глобальный db_connection подменяется во всех модулях,
+    в потоке-писателе и в хранилище ключей идемпотентности
+    """
+    from database.connection import DatabaseConnection, db_connection
+    from database.idempotency import idempotency_store
+    from database.writer import db_writer
+    
+    # Все модули сервисов импортируются до подмены
+    importlib.import_module('services')
+    
+    db = DatabaseConnection(str(tmp_path / 'finance.db'))
+    for module in list(sys.modules.values()):
+        if getattr(module, 'db_connection', None) is db_connection:
+            monkeypatch.setattr(module, 'db_connection', db)
+    monkeypatch.setattr(db_writer, 'db', db)
+    monkeypatch.setattr(idempotency_store, 'db', db)
+    _reset_caches()
+    
+    yield db
+    
+    _reset_caches()
+    db.close_all()
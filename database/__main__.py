@@ -0,0 +1,34 @@
+# database/__main__.py - СЛУЖЕБНЫЕ КОМАНДЫ БАЗЫ ДАННЫХ
+"""
+Использование:
+    python -m database rebuild-rollups [--db finance.db] [--user USER_ID]
+"""
+import argparse
+
+from .connection import DatabaseConnection
+from .rollups import ROLLUP_PERIODS, rebuild_rollups
+
+def rebuild_rollups_command(args):
+    """Перестраивает сводки транзакций"""
+    db = DatabaseConnection(args.db)
+    with db.transaction() as conn:
+        rebuild_rollups(conn, args.user)
+        rows = sum(conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in ROLLUP_PERIODS)
+    db.close_all()
+    
+    print(f"✅ Сводки перестроены: {rows} строк")
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m database', description="Служебные команды базы данных")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    rebuild = commands.add_parser('rebuild-rollups', help="Перестроить дневные и месячные сводки")
+    rebuild.add_argument('--db', default='finance.db', help="Путь к базе данных")
+    rebuild.add_argument('--user', type=int, default=None, help="Только для одного пользователя")
+    rebuild.set_defaults(handler=rebuild_rollups_command)
+    
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == '__main__':
+    main()
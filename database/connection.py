@@ -1,15 +1,202 @@
 # database/connection.py - ПОЛНОСТЬЮ ПЕРЕПИСАННАЯ ВЕРСИЯ
+import os
 import sqlite3
 import logging
 import threading
+import time
 from contextlib import contextmanager
 
+from .migrations import run_migrations
+from .profiler import QueryProfiler, query_profiler
+
 logger = logging.getLogger(__name__)
 
+class ConnectionPool:
+    """
+    Ограниченный пул соединений SQLite.
+    PRAGMA настраиваются один раз при создании соединения,
+    простаивающие соединения проверяются перед повторной выдачей.
+    """
+    
+    def __init__(self, db_path: str, max_size: int = 8, timeout: float = 30.0,
+                 health_check_interval: float = 30.0, profiler: QueryProfiler = None):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        # С профилировщиком соединения создаются классом, замеряющим execute
+        self._factory = profiler.connection_factory() if profiler else sqlite3.Connection
+        
+        self._cond = threading.Condition()
+        self._idle = []          # [(conn, generation, last_used)]
+        self._generations = {}   # id(conn) -> поколение пула
+        self._generation = 0
+        self._size = 0
+        
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'acquired': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'total_wait_time': 0.0,
+            'max_wait_time': 0.0,
+        }
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """Создает соединение и один раз настраивает PRAGMA"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=self.timeout,
+            factory=self._factory
+        )
+        # Включаем WAL mode для лучшей параллельной работы
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+    
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Проверяет, что соединение живое"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def _close(self, conn: sqlite3.Connection):
+        """Закрывает соединение (вызывается под блокировкой пула)"""
+        self._generations.pop(id(conn), None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        self._stats['closed'] += 1
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Выдает соединение из пула, при необходимости ожидая освобождения"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, generation, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, generation, last_used = None, self._generation, None
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise sqlite3.OperationalError(
+                        f"Пул соединений исчерпан: {self.max_size} соединений заняты дольше {self.timeout} с"
+                    )
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                self._cond.wait(remaining)
+            
+            wait_time = time.monotonic() - started
+            self._stats['acquired'] += 1
+            self._stats['total_wait_time'] += wait_time
+            self._stats['max_wait_time'] = max(self._stats['max_wait_time'], wait_time)
+        
+        # Проверка давно простаивающего соединения
+        if conn is not None and time.monotonic() - last_used > self.health_check_interval:
+            if not self._is_healthy(conn):
+                logger.warning("Обнаружено нерабочее соединение в пуле, пересоздаем")
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                    self._close(conn)
+                conn = None
+        
+        if conn is None:
+            try:
+                conn = self._create_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats['created'] += 1
+                self._generations[id(conn)] = generation
+        
+        return conn
+    
+    def release(self, conn: sqlite3.Connection, discard: bool = False):
+        """Возвращает соединение в пул (незавершенная транзакция откатывается)"""
+        if not discard and conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                discard = True
+        
+        with self._cond:
+            generation = self._generations.get(id(conn))
+            if discard or generation != self._generation:
+                self._close(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, generation, time.monotonic()))
+            self._cond.notify()
+    
+    def close_all(self):
+        """Закрывает простаивающие соединения; занятые закроются при возврате"""
+        with self._cond:
+            self._generation += 1
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._close(conn)
+                self._size -= 1
+            self._cond.notify_all()
+    
+    def get_stats(self) -> dict:
+        """Возвращает метрики пула"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['max_size'] = self.max_size
+            stats['avg_wait_time'] = (
+                stats['total_wait_time'] / stats['acquired'] if stats['acquired'] else 0.0
+            )
+            return stats
+
+class _UnitOfWorkConnection:
+    """
+    Соединение внутри единицы работы.
+    commit() и rollback() сервисов не завершают транзакцию:
+    фиксация выполняется один раз в DatabaseConnection.transaction().
+    """
+    
+    def __init__(self, conn: sqlite3.Connection, scopes: list):
+        self._conn = conn
+        self._scopes = scopes
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        self._scopes[-1]['failed'] = True
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
 class DatabaseConnection:
-    def __init__(self, db_path='finance.db'):
+    def __init__(self, db_path='finance.db', pool_size: int = 8, profiler: QueryProfiler = None):
         self.db_path = db_path
+        self.profiler = profiler
         self._lock = threading.RLock()
+        self._local = threading.local()
+        self.pool = ConnectionPool(db_path, max_size=pool_size, profiler=profiler)
         self.init_db()
     
     def init_db(self):
@@ -17,16 +204,19 @@ class DatabaseConnection:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Денежные суммы хранятся в целых копейках (utils.money.Money)
+            
             # Таблица транзакций
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS transactions (
                     id INTEGER PRIMARY KEY,
                     user_id INTEGER,
                     type TEXT,
-                    amount REAL,
+                    amount INTEGER,
                     category TEXT,
                     description TEXT,
-                    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    gold_amount INTEGER DEFAULT 0
                 )
             ''')
             
@@ -36,7 +226,7 @@ class DatabaseConnection:
                     id INTEGER PRIMARY KEY,
                     user_id INTEGER,
                     category TEXT,
-                    amount REAL,
+                    amount INTEGER,
                     period TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
@@ -48,7 +238,7 @@ class DatabaseConnection:
                     id INTEGER PRIMARY KEY,
                     user_id INTEGER,
                     wallet_type TEXT,
-                    balance REAL DEFAULT 0.0,
+                    balance INTEGER DEFAULT 0,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     UNIQUE(user_id, wallet_type)
                 )
@@ -73,8 +263,8 @@ class DatabaseConnection:
                     id INTEGER PRIMARY KEY,
                     user_id INTEGER,
                     creditor TEXT,
-                    initial_amount REAL,
-                    current_amount REAL,
+                    initial_amount INTEGER,
+                    current_amount INTEGER,
                     interest_rate REAL DEFAULT 0.0,
                     due_date TIMESTAMP,
                     status TEXT DEFAULT 'active',
@@ -87,7 +277,7 @@ class DatabaseConnection:
                     id INTEGER PRIMARY KEY,
                     user_id INTEGER,
                     debt_id INTEGER,
-                    amount REAL,
+                    amount INTEGER,
                     payment_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY(debt_id) REFERENCES debts(id)
                 )
@@ -106,34 +296,153 @@ class DatabaseConnection:
             ''')
             
             conn.commit()
+            
+            run_migrations(conn)
         
         logging.info("✅ База данных инициализирована успешно")
     
     @contextmanager
     def get_connection(self):
         """Контекстный менеджер для безопасной работы с базой данных"""
-        conn = None
+        local = self._local
+        
+        # Внутри единицы работы отдаем ее соединение: commit() откладывается
+        # до конца транзакции, ошибка помечает транзакцию к откату
+        if getattr(local, 'scopes', None):
+            try:
+                yield local.uow_conn
+            except Exception as e:
+                logger.error(f"Database connection error: {e}")
+                local.scopes[-1]['failed'] = True
+                raise
+            return
+        
+        conn = self._checkout()
+        broken = False
         try:
-            conn = sqlite3.connect(
-                self.db_path, 
-                check_same_thread=False,
-                timeout=30.0
-            )
-            # Включаем WAL mode для лучшей параллельной работы
-            conn.execute('PRAGMA journal_mode=WAL')
-            conn.execute('PRAGMA busy_timeout=5000')
-            conn.execute('PRAGMA foreign_keys=ON')
-            
             yield conn
-            
+        
         except Exception as e:
             logger.error(f"Database connection error: {e}")
-            if conn:
+            try:
                 conn.rollback()
+            except sqlite3.Error:
+                broken = True
             raise
         finally:
-            if conn:
-                conn.close()
+            self._checkin(broken)
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Единица работы: все вызовы get_connection() в этом потоке внутри блока
+        используют одно соединение и фиксируются одним commit в конце.
+        Вложенные transaction() оформляются точками сохранения (SAVEPOINT).
+        """
+        local = self._local
+        scopes = getattr(local, 'scopes', None)
+        
+        if scopes:
+            conn = local.conn
+            savepoint = f"uow_{len(scopes)}"
+            conn.execute(f"SAVEPOINT {savepoint}")
+            frame = {'failed': False, 'on_commit': []}
+            scopes.append(frame)
+            try:
+                yield local.uow_conn
+            except Exception:
+                scopes.pop()
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                raise
+            scopes.pop()
+            if frame['failed']:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                raise sqlite3.OperationalError("Операция отменена: ошибка во вложенном запросе")
+            conn.execute(f"RELEASE {savepoint}")
+            # Изменения точки сохранения теперь зависят от внешней транзакции
+            scopes[-1]['on_commit'].extend(frame['on_commit'])
+            return
+        
+        conn = self._checkout()
+        broken = False
+        frame = {'failed': False, 'on_commit': []}
+        local.scopes = [frame]
+        local.uow_conn = _UnitOfWorkConnection(conn, local.scopes)
+        try:
+            # IMMEDIATE сразу берет блокировку записи: чтение-проверка-запись
+            # внутри блока не пересекается с другими писателями
+            if not conn.in_transaction:
+                conn.execute('BEGIN IMMEDIATE')
+            yield local.uow_conn
+            if frame['failed']:
+                raise sqlite3.OperationalError("Операция отменена: ошибка во вложенном запросе")
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Transaction rolled back: {e}")
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                broken = True
+            raise
+        finally:
+            local.scopes = None
+            local.uow_conn = None
+            self._checkin(broken)
+        
+        self._run_callbacks(frame['on_commit'])
+    
+    def in_unit_of_work(self) -> bool:
+        """Открыта ли в текущем потоке единица работы"""
+        return bool(getattr(self._local, 'scopes', None))
+    
+    def on_commit(self, callback):
+        """
+        Выполняет callback после фиксации текущей единицы работы.
+        При откате (в том числе точки сохранения) callback отбрасывается,
+        вне единицы работы выполняется сразу.
+        """
+        scopes = getattr(self._local, 'scopes', None)
+        if scopes:
+            scopes[-1]['on_commit'].append(callback)
+        else:
+            self._run_callbacks([callback])
+    
+    def _run_callbacks(self, callbacks: list):
+        """Выполняет обработчики фиксации; их ошибки не отменяют записанное"""
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Ошибка обработчика фиксации: {e}")
+    
+    def _checkout(self) -> sqlite3.Connection:
+        """Выдает соединение текущему потоку (вложенные вызовы получают то же)"""
+        local = self._local
+        if getattr(local, 'conn', None) is None:
+            local.conn = self.pool.acquire()
+            local.depth = 0
+        local.depth += 1
+        return local.conn
+    
+    def _checkin(self, broken: bool = False):
+        """Освобождает соединение потока, когда закрыт внешний блок"""
+        local = self._local
+        local.depth -= 1
+        if local.depth == 0:
+            conn = local.conn
+            local.conn = None
+            self.pool.release(conn, discard=broken)
+    
+    def get_pool_stats(self) -> dict:
+        """Возвращает метрики пула соединений"""
+        return self.pool.get_stats()
+    
+    def close_all(self):
+        """Закрывает соединения пула (например, перед восстановлением файлов БД)"""
+        self.pool.close_all()
 
-# Глобальный экземпляр
-db_connection = DatabaseConnection()
\ No newline at end of file
+# Глобальный экземпляр (DB_PATH позволяет бенчмаркам и тестам работать с отдельной базой).
+# Профилировщик подключен всегда и замеряет запросы, когда включен (SQL_PROFILE=1)
+db_connection = DatabaseConnection(os.getenv('DB_PATH', 'finance.db'), profiler=query_profiler)
@@ -0,0 +1,112 @@
+# database/idempotency.py - КЛЮЧИ ИДЕМПОТЕНТНОСТИ ОПЕРАЦИЙ ЗАПИСИ
+import functools
+import json
+import logging
+import os
+from typing import Optional
+
+from utils.cache import MISSING, TTLCache
+from .connection import DatabaseConnection, db_connection
+from .writer import write_operation
+
+logger = logging.getLogger(__name__)
+
+# Telegram хранит неподтвержденные обновления сутки - ключи держим с запасом
+IDEMPOTENCY_TTL_DAYS = int(os.getenv('IDEMPOTENCY_TTL_DAYS', 2))
+
+# Недавние ключи в памяти: повтор обходится без запроса к базе
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000))
+
+class IdempotencyStore:
+    """
+    Обработанные обновления Telegram: (user_id, ключ) -> результат операции.
+    Ключ записывается в той же транзакции, что и сама операция,
+    поэтому повторно доставленное обновление либо видит ключ и получает
+    сохраненный результат, либо (если операция откатилась) выполняется заново.
+    """
+    
+    def __init__(self, db: DatabaseConnection, cache_size: int = IDEMPOTENCY_CACHE_SIZE,
+                 ttl_days: int = IDEMPOTENCY_TTL_DAYS):
+        self.db = db
+        self.ttl_days = ttl_days
+        self._recent = TTLCache(max_size=cache_size, ttl=ttl_days * 86400)
+    
+    def get(self, user_id: int, key: str) -> Optional[dict]:
+        """Результат уже выполненной операции или None"""
+        result = self._recent.get((user_id, key))
+        if result is not MISSING:
+            return result
+        
+        with self.db.get_connection() as conn:
+            row = conn.execute(
+                'SELECT result FROM processed_updates WHERE user_id = ? AND update_key = ?',
+                (user_id, key)
+            ).fetchone()
+        
+        if row is None:
+            return None
+        result = json.loads(row[0])
+        self._recent.put((user_id, key), result)
+        return result
+    
+    def record(self, user_id: int, key: str, operation: str, result: dict):
+        """Запоминает ключ в текущей единице работы (в память - после фиксации)"""
+        with self.db.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO processed_updates (user_id, update_key, operation, result)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, key, operation, json.dumps(result, ensure_ascii=False)))
+            conn.commit()
+        
+        self.db.on_commit(lambda: self._recent.put((user_id, key), result))
+    
+    @write_operation
+    def prune(self) -> int:
+        """Удаляет ключи старше ttl_days; возвращает число удаленных"""
+        with self.db.get_connection() as conn:
+            deleted = conn.execute(
+                "DELETE FROM processed_updates WHERE created_at < datetime('now', ?)",
+                (f'-{int(self.ttl_days)} days',)
+            ).rowcount
+            conn.commit()
+        return deleted
+    
+    def get_cache_stats(self) -> dict:
+        """Возвращает метрики кэша недавних ключей"""
+        return self._recent.get_stats()
+
+def idempotent(operation: str):
+    """
+    Декоратор операции записи сервиса: необязательный аргумент idempotency_key.
+    С ключом проверка, операция и запись ключа идут одной транзакцией;
+    повтор с тем же ключом возвращает сохраненный результат, ничего не меняя.
+    Запоминаются только успешные операции - неудачную можно повторить.
+    Первый аргумент метода после self - user_id.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, user_id, *args, idempotency_key: Optional[str] = None, **kwargs):
+            if idempotency_key is None:
+                return func(self, user_id, *args, **kwargs)
+            
+            try:
+                with db_connection.transaction():
+                    previous = idempotency_store.get(user_id, idempotency_key)
+                    if previous is not None:
+                        logger.info(f"Повтор {operation} пользователя {user_id} ({idempotency_key}) пропущен")
+                        return dict(previous, duplicate=True)
+                    
+                    result = func(self, user_id, *args, **kwargs)
+                    if result.get('success'):
+                        idempotency_store.record(user_id, idempotency_key, operation, result)
+                return result
+            
+            except Exception as e:
+                logger.error(f"❌ Ошибка идемпотентной операции {operation} пользователя {user_id}: {e}")
+                return {'success': False, 'error': 'Ошибка при сохранении операции'}
+        
+        return wrapper
+    return decorator
+
+# Глобальный экземпляр
+idempotency_store = IdempotencyStore(db_connection)
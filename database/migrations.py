@@ -0,0 +1,202 @@
+# database/migrations.py - ВЕРСИОНИРОВАННЫЕ МИГРАЦИИ СХЕМЫ
+import logging
+import re
+import sqlite3
+from typing import Callable, List, Tuple, Union
+
+from .rollups import CREATE_ROLLUP_TABLES, CREATE_ROLLUP_VERSIONS, rebuild_rollup_tables
+
+logger = logging.getLogger(__name__)
+
+# Шаг миграции: SQL-оператор или функция, получающая соединение
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+
+# Денежные колонки, которые хранятся в целых копейках
+MONEY_COLUMNS = {
+    'transactions': ['amount'],
+    'budgets': ['amount'],
+    'wallets': ['balance'],
+    'debts': ['initial_amount', 'current_amount'],
+    'debt_payments': ['amount'],
+}
+
+def _column_types(conn: sqlite3.Connection, table: str) -> dict:
+    """Возвращает {колонка: объявленный тип}"""
+    return {row[1]: row[2].upper() for row in conn.execute(f'PRAGMA table_info({table})')}
+
+def _rebuild_money_table(conn: sqlite3.Connection, table: str, columns: list):
+    """
+    Пересоздает таблицу с INTEGER вместо REAL в денежных колонках
+    и переводит значения в копейки (создать - скопировать - удалить - переименовать).
+    """
+    create_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()[0]
+    index_sqls = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,)
+    )]
+    
+    new_table = f'{table}__new'
+    new_sql = re.sub(rf'^CREATE TABLE\s+"?{table}"?', f'CREATE TABLE {new_table}', create_sql)
+    for column in columns:
+        new_sql = re.sub(rf'\b{column}\s+REAL\s+DEFAULT\s+0(\.0)?', f'{column} INTEGER DEFAULT 0', new_sql)
+        new_sql = re.sub(rf'\b{column}\s+REAL\b', f'{column} INTEGER', new_sql)
+    
+    all_columns = list(_column_types(conn, table))
+    select = ', '.join(
+        f'CAST(ROUND({column} * 100) AS INTEGER)' if column in columns else column
+        for column in all_columns
+    )
+    
+    conn.execute(new_sql)
+    conn.execute(f'INSERT INTO {new_table} ({", ".join(all_columns)}) SELECT {select} FROM {table}')
+    conn.execute(f'DROP TABLE {table}')
+    conn.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+    for index_sql in index_sqls:
+        conn.execute(index_sql)
+
+def _money_to_kopecks(conn: sqlite3.Connection):
+    """Переводит денежные колонки из REAL-рублей в INTEGER-копейки"""
+    for table, columns in MONEY_COLUMNS.items():
+        types = _column_types(conn, table)
+        if any(types.get(column) == 'REAL' for column in columns):
+            _rebuild_money_table(conn, table, columns)
+
+def _add_income_gold_amount(conn: sqlite3.Connection):
+    """
+    Сохраняет в доходе долю, ушедшую в Золотой запас.
+    Удаление и редактирование дохода откатывают именно ее,
+    а не пересчитывают по текущему проценту накоплений.
+    """
+    if 'gold_amount' in _column_types(conn, 'transactions'):
+        return
+    
+    conn.execute('ALTER TABLE transactions ADD COLUMN gold_amount INTEGER DEFAULT 0')
+    
+    # Для старых доходов долю восстанавливаем по текущим настройкам пользователя
+    conn.execute('''
+        UPDATE transactions
+        SET gold_amount = CAST(ROUND(amount * COALESCE((
+            SELECT CASE WHEN s.auto_savings THEN s.savings_rate ELSE 0 END
+            FROM user_settings s WHERE s.user_id = transactions.user_id
+        ), 0) / 100.0) AS INTEGER)
+        WHERE type = 'income'
+    ''')
+
+# Миграции применяются строго по порядку версий.
+# Текущая версия схемы хранится в PRAGMA user_version,
+# каждый шаг идемпотентен (IF NOT EXISTS), поэтому повторный запуск безопасен.
+MIGRATIONS: List[Tuple[int, str, List[MigrationStep]]] = [
+    (1, "Индексы транзакций для аналитики", [
+        '''CREATE INDEX IF NOT EXISTS idx_transactions_user_type_date
+           ON transactions(user_id, type, date, amount)''',
+        '''CREATE INDEX IF NOT EXISTS idx_transactions_user_category_type_date
+           ON transactions(user_id, category, type, date, amount)''',
+        '''CREATE INDEX IF NOT EXISTS idx_transactions_user_date
+           ON transactions(user_id, date)''',
+    ]),
+    (2, "Индексы долгов и бюджетов", [
+        '''CREATE INDEX IF NOT EXISTS idx_debts_user_status
+           ON debts(user_id, status)''',
+        '''CREATE INDEX IF NOT EXISTS idx_debt_payments_debt
+           ON debt_payments(debt_id)''',
+        '''CREATE INDEX IF NOT EXISTS idx_budgets_user_period_category
+           ON budgets(user_id, period, category)''',
+    ]),
+    (3, "Деньги в целых копейках", [
+        _money_to_kopecks,
+        _add_income_gold_amount,
+    ]),
+    (4, "Дневные и месячные сводки транзакций", [
+        *CREATE_ROLLUP_TABLES,
+        rebuild_rollup_tables,
+    ]),
+    (5, "Обработанные обновления Telegram (идемпотентность записи)", [
+        '''CREATE TABLE IF NOT EXISTS processed_updates (
+               user_id INTEGER NOT NULL,
+               update_key TEXT NOT NULL,
+               operation TEXT NOT NULL,
+               result TEXT NOT NULL,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (user_id, update_key)
+           ) WITHOUT ROWID''',
+        '''CREATE INDEX IF NOT EXISTS idx_processed_updates_created
+           ON processed_updates(created_at)''',
+    ]),
+    (6, "Версии сводок пользователей для кэшей аналитики", [
+        CREATE_ROLLUP_VERSIONS,
+    ]),
+    (7, "Индекс финансового здоровья из ночного пересчета", [
+        '''CREATE TABLE IF NOT EXISTS health_scores (
+               user_id INTEGER PRIMARY KEY,
+               total_score REAL NOT NULL,
+               level TEXT NOT NULL,
+               components TEXT NOT NULL,
+               computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )''',
+    ]),
+    (8, "Суммы по окнам в сохраненном индексе здоровья", [
+        "ALTER TABLE health_scores ADD COLUMN windows TEXT NOT NULL DEFAULT '{}'",
+    ]),
+]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Возвращает текущую версию схемы"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def get_latest_version() -> int:
+    """Возвращает версию, до которой доводят все миграции"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Применяет недостающие миграции, каждую в своей транзакции.
+    Возвращает итоговую версию схемы.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    
+    # Пересоздание таблиц требует выключенных внешних ключей (PRAGMA действует
+    # только вне транзакции); целостность проверяется перед фиксацией миграции
+    foreign_keys = conn.execute('PRAGMA foreign_keys').fetchone()[0]
+    conn.execute('PRAGMA foreign_keys = OFF')
+    try:
+        for version, description, steps in MIGRATIONS:
+            if get_schema_version(conn) >= version:
+                continue
+            
+            _apply_migration(conn, version, description, steps)
+    finally:
+        conn.execute(f'PRAGMA foreign_keys = {"ON" if foreign_keys else "OFF"}')
+    
+    return get_schema_version(conn)
+
+def _apply_migration(conn: sqlite3.Connection, version: int, description: str,
+                     steps: List[MigrationStep]):
+    """Применяет одну миграцию в своей транзакции"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Версию перечитываем под блокировкой: другой процесс мог успеть первым
+        if get_schema_version(conn) >= version:
+            conn.rollback()
+            return
+        
+        for step in steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+        
+        violations = conn.execute('PRAGMA foreign_key_check').fetchall()
+        if violations:
+            raise sqlite3.IntegrityError(f"Нарушены внешние ключи: {violations[:5]}")
+        
+        conn.execute(f'PRAGMA user_version = {int(version)}')
+        conn.commit()
+        logger.info(f"✅ Миграция {version} применена: {description}")
+    
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"❌ Ошибка миграции {version} ({description}): {e}")
+        raise
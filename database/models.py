@@ -13,6 +13,7 @@ class Transaction:
     category: str = ""
     description: str = ""
     date: Optional[datetime] = None
+    gold_amount: float = 0.0  # доля дохода, ушедшая в Золотой запас
 
 @dataclass
 class Budget:
@@ -0,0 +1,152 @@
+# database/profiler.py - ПРОФИЛИРОВЩИК SQL-ЗАПРОСОВ
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# SQL_PROFILE=1 включает замеры с запуска; SQL_SLOW_MS - порог журнала медленных запросов
+SQL_PROFILE = os.getenv('SQL_PROFILE', '0') == '1'
+SQL_SLOW_MS = float(os.getenv('SQL_SLOW_MS', 50))
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+# План выполнения имеет смысл только для запросов к данным (не BEGIN/SAVEPOINT/PRAGMA)
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def normalize_sql(sql: str) -> str:
+    """
+    Приводит текст запроса к виду для группировки: литералы заменяются на ?,
+    списки IN (?, ?, ...) сворачиваются, пробелы схлопываются
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+class QueryProfiler:
+    """
+    Замеряет каждый execute соединений пула и агрегирует по нормализованному тексту:
+    число вызовов, суммарное и максимальное время. Запросы дольше slow_ms пишутся
+    в журнал вместе с EXPLAIN QUERY PLAN (план запоминается для каждого запроса).
+    Время execute включает выполнение до первой строки результата: для агрегатов
+    и сортировок это почти вся работа, чтение остальных строк не учитывается.
+    """
+    
+    def __init__(self, slow_ms: float = SQL_SLOW_MS, enabled: bool = False):
+        self.slow_ms = slow_ms
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {}  # нормализованный запрос -> [count, total_ms, max_ms, slow]
+        self._plans = {}  # нормализованный запрос -> список строк плана
+    
+    def enable(self, slow_ms: float = None):
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        self.enabled = True
+    
+    def disable(self):
+        self.enabled = False
+    
+    def reset(self):
+        """Сбрасывает накопленную статистику и планы"""
+        with self._lock:
+            self._stats.clear()
+            self._plans.clear()
+    
+    def record(self, conn: sqlite3.Connection, sql: str, params, elapsed_ms: float):
+        """Учитывает выполненный запрос; медленный пишет в журнал с планом"""
+        statement = normalize_sql(sql)
+        slow = elapsed_ms >= self.slow_ms
+        with self._lock:
+            entry = self._stats.get(statement)
+            if entry is None:
+                entry = self._stats[statement] = [0, 0.0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += elapsed_ms
+            entry[2] = max(entry[2], elapsed_ms)
+            if slow:
+                entry[3] += 1
+            plan = self._plans.get(statement)
+        
+        if not slow:
+            return
+        if plan is None:
+            plan = self._explain(conn, sql, params)
+            with self._lock:
+                self._plans[statement] = plan
+        
+        plan_text = '\n    '.join(plan) if plan else '—'
+        logger.warning(f"🐢 Медленный запрос {elapsed_ms:.1f} мс: {statement}\n    {plan_text}")
+    
+    def _explain(self, conn: sqlite3.Connection, sql: str, params) -> List[str]:
+        """EXPLAIN QUERY PLAN на том же соединении (без повторного замера)"""
+        if params is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return []
+        try:
+            rows = sqlite3.Connection.execute(conn, f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+            return [row[3] for row in rows]
+        except sqlite3.Error as e:
+            return [f"план недоступен: {e}"]
+    
+    def get_top(self, limit: int = 10, order_by: str = 'total_ms') -> List[Dict]:
+        """Самые дорогие запросы: по total_ms, max_ms, avg_ms или count"""
+        with self._lock:
+            rows = [
+                {
+                    'statement': statement,
+                    'count': count,
+                    'total_ms': round(total, 3),
+                    'avg_ms': round(total / count, 3),
+                    'max_ms': round(max_ms, 3),
+                    'slow': slow,
+                }
+                for statement, (count, total, max_ms, slow) in self._stats.items()
+            ]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:limit]
+    
+    def connection_factory(self):
+        """Класс соединения для sqlite3.connect(factory=...), замеряющий запросы этим профилировщиком"""
+        profiler = self
+        
+        class ProfilingCursor(sqlite3.Cursor):
+            def execute(self, sql, parameters=()):
+                if not profiler.enabled:
+                    return super().execute(sql, parameters)
+                started = time.perf_counter()
+                result = super().execute(sql, parameters)
+                profiler.record(self.connection, sql, parameters, (time.perf_counter() - started) * 1000)
+                return result
+            
+            def executemany(self, sql, seq_of_parameters):
+                if not profiler.enabled:
+                    return super().executemany(sql, seq_of_parameters)
+                started = time.perf_counter()
+                result = super().executemany(sql, seq_of_parameters)
+                # План пакетной вставки не строится: параметров много, а запрос один
+                profiler.record(self.connection, sql, None, (time.perf_counter() - started) * 1000)
+                return result
+        
+        class ProfilingConnection(sqlite3.Connection):
+            def cursor(self, factory=ProfilingCursor):
+                return super().cursor(factory)
+            
+            # Connection.execute создает курсор в обход cursor(), поэтому переопределяем явно
+            def execute(self, sql, parameters=()):
+                return self.cursor().execute(sql, parameters)
+            
+            def executemany(self, sql, seq_of_parameters):
+                return self.cursor().executemany(sql, seq_of_parameters)
+        
+        return ProfilingConnection
+
+# Глобальный экземпляр
+query_profiler = QueryProfiler(enabled=SQL_PROFILE)
@@ -0,0 +1,107 @@
+# database/query_plans.py - КОНТРОЛЬ ПЛАНОВ ГОРЯЧИХ ЗАПРОСОВ
+import re
+import sqlite3
+from typing import List, Tuple, Union
+
+# Запросы, которые выполняются на каждое нажатие кнопки.
+# Каждый должен идти по индексу, а не полным сканированием таблицы.
+HOT_QUERIES: List[Tuple[str, str, Union[tuple, dict]]] = [
+    ("wallets", '''
+        SELECT wallet_type, balance FROM wallets WHERE user_id = ?
+    ''', (1,)),
+    ("user_snapshot", '''
+        WITH wallet_totals AS (
+            SELECT SUM(CASE WHEN wallet_type = 'gold_reserve' THEN balance ELSE 0 END) AS gold_reserve
+            FROM wallets WHERE user_id = :user_id
+        ),
+        period_totals AS (
+            SELECT SUM(CASE WHEN type = 'income' THEN total ELSE 0 END) AS income,
+                   SUM(CASE WHEN type = 'expense' THEN total ELSE 0 END) AS expenses
+            FROM rollup_daily
+            WHERE user_id = :user_id AND type IN ('income', 'expense')
+            AND day >= date('now', :since)
+        ),
+        debt_totals AS (
+            SELECT COUNT(*) AS debt_count, SUM(current_amount) AS debt_current
+            FROM debts WHERE user_id = :user_id AND status = 'active'
+        )
+        SELECT w.gold_reserve, p.income, p.expenses, d.debt_count, d.debt_current,
+               s.savings_rate, s.auto_savings
+        FROM wallet_totals w, period_totals p, debt_totals d
+        LEFT JOIN user_settings s ON s.user_id = :user_id
+    ''', {'user_id': 1, 'since': '-30 days'}),
+    ("spending_by_category", '''
+        SELECT category, SUM(total) as total, SUM(count) as count
+        FROM rollup_daily
+        WHERE user_id = ? AND type = 'expense'
+        AND day >= date('now', '-30 days')
+        GROUP BY category
+        ORDER BY total DESC
+    ''', (1,)),
+    ("income_by_month", '''
+        SELECT substr(day, 1, 7) as month, SUM(total) as monthly_income
+        FROM rollup_daily
+        WHERE user_id = ? AND type = 'income'
+        AND day >= date('now', '-6 months')
+        GROUP BY month
+        ORDER BY month DESC
+    ''', (1,)),
+    ("budget_progress", '''
+        SELECT b.category, b.amount, COALESCE(r.total, 0) AS spent
+        FROM budgets b
+        LEFT JOIN rollup_monthly r
+            ON r.user_id = b.user_id AND r.type = 'expense'
+            AND r.month = strftime('%Y-%m', 'now') AND r.category = b.category
+        WHERE b.user_id = ? AND b.period = 'monthly'
+        ORDER BY b.id
+    ''', (1,)),
+    ("monthly_budgets", '''
+        SELECT category, amount FROM budgets
+        WHERE user_id = ? AND period = 'monthly'
+    ''', (1,)),
+    ("transaction_history", '''
+        SELECT type, amount, category, description, date, id
+        FROM transactions
+        WHERE user_id = ?
+        ORDER BY date DESC, id DESC
+        LIMIT ?
+    ''', (1, 10)),
+    ("transaction_history_keyset", '''
+        SELECT type, amount, category, description, date, id
+        FROM transactions
+        WHERE user_id = ? AND (date, id) < (?, ?)
+        ORDER BY date DESC, id DESC
+        LIMIT ?
+    ''', (1, '2025-01-01 00:00:00', 100, 11)),
+    ("active_debts", '''
+        SELECT id, user_id, creditor, initial_amount, current_amount,
+               interest_rate, due_date, status, created_at
+        FROM debts
+        WHERE user_id = ? AND status = 'active'
+        ORDER BY current_amount DESC
+    ''', (1,)),
+]
+
+_FULL_SCAN = re.compile(r'^SCAN (\w+)')
+
+def explain(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[str]:
+    """Возвращает строки EXPLAIN QUERY PLAN для запроса"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+
+def find_full_scans(conn: sqlite3.Connection, queries: List[Tuple[str, str, tuple]] = None) -> List[Tuple[str, str]]:
+    """
+    Находит горячие запросы, план которых содержит полное сканирование таблицы.
+    Возвращает список (имя запроса, строка плана).
+    """
+    tables = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    )}
+    
+    offenders = []
+    for name, sql, params in (queries or HOT_QUERIES):
+        for detail in explain(conn, sql, params):
+            match = _FULL_SCAN.match(detail)
+            if match and match.group(1) in tables:
+                offenders.append((name, detail))
+    
+    return offenders
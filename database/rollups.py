@@ -0,0 +1,136 @@
+# database/rollups.py - ДНЕВНЫЕ И МЕСЯЧНЫЕ СВОДКИ ТРАНЗАКЦИЙ
+"""
+Материализованные сводки (пользователь, период, тип, категория) -> сумма/количество.
+Поддерживаются инкрементально при добавлении, редактировании и удалении транзакций,
+поэтому аналитика читает число дней/месяцев, а не все транзакции.
+Каждое изменение сводок пользователя продвигает его версию в rollup_versions:
+по ней кэши аналитики понимают, что данные устарели.
+
+Полная перестройка (например, после ручной правки transactions):
+    python -m database rebuild-rollups [--db finance.db] [--user USER_ID]
+"""
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Таблица сводки -> выражение периода от transactions.date
+ROLLUP_PERIODS = {
+    'rollup_daily': ('day', "date(date)"),
+    'rollup_monthly': ('month', "strftime('%Y-%m', date)"),
+}
+
+CREATE_ROLLUP_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS rollup_daily (
+           user_id INTEGER NOT NULL,
+           type TEXT NOT NULL,
+           day TEXT NOT NULL,
+           category TEXT NOT NULL,
+           total INTEGER NOT NULL DEFAULT 0,
+           count INTEGER NOT NULL DEFAULT 0,
+           PRIMARY KEY (user_id, type, day, category)
+       ) WITHOUT ROWID''',
+    '''CREATE TABLE IF NOT EXISTS rollup_monthly (
+           user_id INTEGER NOT NULL,
+           type TEXT NOT NULL,
+           month TEXT NOT NULL,
+           category TEXT NOT NULL,
+           total INTEGER NOT NULL DEFAULT 0,
+           count INTEGER NOT NULL DEFAULT 0,
+           PRIMARY KEY (user_id, type, month, category)
+       ) WITHOUT ROWID''',
+]
+
+CREATE_ROLLUP_VERSIONS = '''CREATE TABLE IF NOT EXISTS rollup_versions (
+       user_id INTEGER PRIMARY KEY,
+       version INTEGER NOT NULL DEFAULT 0
+   )'''
+
+def get_rollup_version(conn, user_id: int) -> int:
+    """Версия сводок пользователя (0 - сводки еще не менялись)"""
+    row = conn.execute('SELECT version FROM rollup_versions WHERE user_id = ?', (user_id,)).fetchone()
+    return row[0] if row else 0
+
+def _bump_versions(conn, user_query: str, params: tuple):
+    """Продвигает версии сводок пользователей, выбранных user_query"""
+    conn.execute(f'''
+        INSERT INTO rollup_versions (user_id, version)
+        {user_query}
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1
+    ''', params)
+
+def apply_transaction(conn, transaction_id: int, sign: int = 1):
+    """
+    Добавляет (sign=1) или вычитает (sign=-1) транзакцию из сводок.
+    Вызывается в той же единице работы, что и изменение transactions:
+    вычитание - до UPDATE/DELETE, добавление - после INSERT/UPDATE.
+    """
+    for table, (period, period_expr) in ROLLUP_PERIODS.items():
+        conn.execute(f'''
+            INSERT INTO {table} (user_id, type, {period}, category, total, count)
+            SELECT user_id, type, {period_expr}, COALESCE(category, ''), ? * amount, ?
+            FROM transactions
+            WHERE id = ?
+            ON CONFLICT (user_id, type, {period}, category) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + excluded.count
+        ''', (sign, sign, transaction_id))
+        
+        if sign < 0:
+            conn.execute(f'''
+                DELETE FROM {table}
+                WHERE count <= 0 AND (user_id, type, {period}, category) IN (
+                    SELECT user_id, type, {period_expr}, COALESCE(category, '')
+                    FROM transactions WHERE id = ?
+                )
+            ''', (transaction_id,))
+    
+    _bump_versions(conn, 'SELECT user_id, 1 FROM transactions WHERE id = ?', (transaction_id,))
+
+def apply_transaction_range(conn, first_id: int, last_id: int):
+    """
+    Добавляет в сводки пачку только что вставленных транзакций с id от first_id до last_id:
+    одна группирующая вставка на таблицу сводки вместо обновления на каждую транзакцию
+    """
+    for table, (period, period_expr) in ROLLUP_PERIODS.items():
+        conn.execute(f'''
+            INSERT INTO {table} (user_id, type, {period}, category, total, count)
+            SELECT user_id, type, {period_expr}, COALESCE(category, ''), SUM(amount), COUNT(*)
+            FROM transactions
+            WHERE id BETWEEN ? AND ?
+            GROUP BY user_id, type, {period_expr}, COALESCE(category, '')
+            ON CONFLICT (user_id, type, {period}, category) DO UPDATE SET
+                total = total + excluded.total,
+                count = count + excluded.count
+        ''', (first_id, last_id))
+    
+    _bump_versions(conn, 'SELECT DISTINCT user_id, 1 FROM transactions WHERE id BETWEEN ? AND ?',
+                   (first_id, last_id))
+
+def rebuild_rollups(conn, user_id: Optional[int] = None):
+    """Пересчитывает сводки из transactions (для всех или одного пользователя) и продвигает их версии"""
+    rebuild_rollup_tables(conn, user_id)
+    
+    where = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+    # Версия нужна и пользователям, у которых после пересчета не осталось сводок
+    conn.execute(f'UPDATE rollup_versions SET version = version + 1 {where}', params)
+    conn.execute(f'''
+        INSERT OR IGNORE INTO rollup_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM transactions {where}
+    ''', params)
+
+def rebuild_rollup_tables(conn, user_id: Optional[int] = None):
+    """Пересчитывает только таблицы сводок (миграция 4 выполняется до появления rollup_versions)"""
+    where = 'WHERE user_id = ?' if user_id is not None else ''
+    params = (user_id,) if user_id is not None else ()
+    
+    for table, (period, period_expr) in ROLLUP_PERIODS.items():
+        conn.execute(f'DELETE FROM {table} {where}', params)
+        conn.execute(f'''
+            INSERT INTO {table} (user_id, type, {period}, category, total, count)
+            SELECT user_id, type, {period_expr}, COALESCE(category, ''), SUM(amount), COUNT(*)
+            FROM transactions
+            {where}
+            GROUP BY user_id, type, {period_expr}, COALESCE(category, '')
+        ''', params)
@@ -0,0 +1,226 @@
+# database/writer.py - ЕДИНСТВЕННЫЙ ПИСАТЕЛЬ С ГРУППОВОЙ ФИКСАЦИЕЙ
+import functools
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .connection import DatabaseConnection, db_connection
+
+logger = logging.getLogger(__name__)
+
+# Доля заполнения очереди, с которой бот придерживает новые обновления
+WRITER_BACKLOG_RATIO = float(os.getenv('WRITER_BACKLOG_RATIO', 0.8))
+
+_STOP = object()
+
+class _WriteOp:
+    """Операция записи в очереди писателя"""
+    
+    __slots__ = ('func', 'args', 'kwargs', 'future', 'enqueued_at')
+    
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+class DatabaseWriter:
+    """
+    Выделенный поток-писатель SQLite.
+    Операции записи от всех пользователей попадают в одну очередь,
+    поток забирает их пачками и выполняет одной транзакцией (групповая фиксация).
+    Каждая операция идет в своей точке сохранения: ошибка одной операции
+    откатывает только ее, остальные операции пачки фиксируются.
+    Результаты возвращаются вызывающим через Future.
+    """
+    
+    def __init__(self, db: DatabaseConnection, max_queue: int = 1000, max_batch: int = 64):
+        self.db = db
+        self.max_batch = max_batch
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        
+        # Статистика
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._batches = 0
+        self._batched_ops = 0
+        self._max_batch_size = 0
+        self._commit_failures = 0
+        self._total_commit_time = 0.0
+        self._max_commit_time = 0.0
+        self._total_queue_wait = 0.0
+        self._max_queue_wait = 0.0
+    
+    def _ensure_started(self):
+        """Запускает поток-писатель при первой операции"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+    
+    def on_writer_thread(self) -> bool:
+        """Выполняется ли текущий код в потоке-писателе"""
+        return threading.current_thread() is self._thread
+    
+    def submit(self, func, *args, **kwargs) -> Future:
+        """Ставит операцию записи в очередь и возвращает Future с ее результатом"""
+        self._ensure_started()
+        op = _WriteOp(func, args, kwargs)
+        self._queue.put(op)
+        with self._lock:
+            self._submitted += 1
+        return op.future
+    
+    def execute(self, func, *args, **kwargs):
+        """
+        Выполняет операцию записи и ждет результат.
+        Вложенные операции (уже в потоке-писателе или внутри открытой
+        единицы работы) выполняются сразу, иначе была бы взаимоблокировка.
+        """
+        if self.on_writer_thread() or self.db.in_unit_of_work():
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+    
+    def _run(self):
+        """Основной цикл потока-писателя"""
+        while True:
+            op = self._queue.get()
+            if op is _STOP:
+                return
+            
+            batch = [op]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    op = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if op is _STOP:
+                    stop = True
+                    break
+                batch.append(op)
+            
+            self._commit_batch(batch)
+            
+            if stop:
+                return
+    
+    def _commit_batch(self, batch: list):
+        """Выполняет пачку операций одной транзакцией"""
+        started = time.monotonic()
+        outcomes = []
+        
+        try:
+            with self.db.transaction():
+                for op in batch:
+                    outcomes.append(self._apply(op))
+        except Exception as e:
+            logger.error(f"❌ Ошибка групповой фиксации ({len(batch)} операций): {e}")
+            with self._lock:
+                self._commit_failures += 1
+                self._failed += len(batch)
+            for op in batch:
+                op.future.set_exception(e)
+            return
+        
+        elapsed = time.monotonic() - started
+        
+        with self._lock:
+            self._batches += 1
+            self._batched_ops += len(batch)
+            self._max_batch_size = max(self._max_batch_size, len(batch))
+            self._total_commit_time += elapsed
+            self._max_commit_time = max(self._max_commit_time, elapsed)
+            for op in batch:
+                wait = started - op.enqueued_at
+                self._total_queue_wait += wait
+                self._max_queue_wait = max(self._max_queue_wait, wait)
+        
+        for op, (ok, value) in zip(batch, outcomes):
+            with self._lock:
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            if ok:
+                op.future.set_result(value)
+            else:
+                op.future.set_exception(value)
+    
+    def _apply(self, op: _WriteOp):
+        """Выполняет одну операцию в своей точке сохранения"""
+        returned = False
+        result = None
+        try:
+            with self.db.transaction():
+                result = op.func(*op.args, **op.kwargs)
+                returned = True
+        except Exception as e:
+            # Сервис сам обработал ошибку и вернул результат:
+            # его изменения откачены, результат отдаем как есть
+            if returned:
+                return True, result
+            return False, e
+        return True, result
+    
+    def is_backlogged(self, ratio: float = WRITER_BACKLOG_RATIO) -> bool:
+        """
+        Очередь заполнена на ratio и больше: новые операции будут ждать места
+        в блокирующем put, занимая потоки пула БД
+        """
+        return self._queue.qsize() >= self._queue.maxsize * ratio
+    
+    def stop(self, timeout: float = 10.0):
+        """Дописывает очередь и останавливает поток-писатель"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        logger.info("✅ Поток-писатель БД остановлен")
+    
+    def get_stats(self) -> dict:
+        """Возвращает метрики очереди записи"""
+        with self._lock:
+            batches = self._batches
+            processed = self._batched_ops
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'batches': batches,
+                'commit_failures': self._commit_failures,
+                'avg_batch_size': round(processed / batches, 2) if batches else 0.0,
+                'max_batch_size': self._max_batch_size,
+                'avg_commit_ms': round(self._total_commit_time / batches * 1000, 3) if batches else 0.0,
+                'max_commit_ms': round(self._max_commit_time * 1000, 3),
+                'avg_queue_wait_ms': round(self._total_queue_wait / processed * 1000, 3) if processed else 0.0,
+                'max_queue_wait_ms': round(self._max_queue_wait * 1000, 3),
+            }
+
+def write_operation(func):
+    """
+    Декоратор метода сервиса: вызов выполняется потоком-писателем.
+    Асинхронный фасад по атрибуту __write_operation__ ставит такие вызовы
+    в очередь без ожидания в пуле потоков.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return db_writer.execute(func, *args, **kwargs)
+    
+    wrapper.__write_operation__ = func
+    return wrapper
+
+# Глобальный экземпляр
+db_writer = DatabaseWriter(db_connection)
@@ -1,5 +1,5 @@
 # keyboards/transactions_menu.py
-from telegram import ReplyKeyboardMarkup
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
 
 def get_transactions_menu_keyboard():
     """Клавиатура меню управления транзакциями"""
@@ -8,4 +8,24 @@ def get_transactions_menu_keyboard():
         ['📋 История операций', '✏️ Редактировать'],
         ['🏠 Главное меню']
     ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
\ No newline at end of file
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+
+def get_history_page_keyboard(page: dict):
+    """
+    Inline-кнопки страницы истории: листание по курсору (date, id) и выгрузка.
+    callback_data: hist:<newer|older>:<id>:<date>, export:<csv|json>
+    """
+    navigation = []
+    if page['has_newer']:
+        date, transaction_id = page['newest']
+        navigation.append(InlineKeyboardButton('⬅️ Новее', callback_data=f'hist:newer:{transaction_id}:{date}'))
+    if page['has_older']:
+        date, transaction_id = page['oldest']
+        navigation.append(InlineKeyboardButton('Старее ➡️', callback_data=f'hist:older:{transaction_id}:{date}'))
+    
+    keyboard = [navigation] if navigation else []
+    keyboard.append([
+        InlineKeyboardButton('📤 Выгрузить CSV', callback_data='export:csv'),
+        InlineKeyboardButton('📤 Выгрузить JSON', callback_data='export:json'),
+    ])
+    return InlineKeyboardMarkup(keyboard)
\ No newline at end of file
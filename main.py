@@ -4,6 +4,8 @@ import time
 import sqlite3
 from dotenv import load_dotenv
 from bot.bot import run_bot
+from database.connection import db_connection
+from services.wallet_service import wallet_service
 from utils.database_recovery import recover_database
 
 def main():
@@ -18,8 +20,10 @@ def main():
         return
     
     # Восстанавливаем базу данных при необходимости
+    # (соединения пула закрываем, чтобы не удалять WAL из-под открытых соединений)
     print("🔧 Проверка базы данных...")
-    recover_database()
+    db_connection.close_all()
+    recover_database(db_connection.db_path)
     
     print("🚀 Запуск Вавилонского финансового бота...")
     print("💎 Архитектура: Чистая вавилонская реализация")
@@ -32,7 +36,9 @@ def main():
         if "database is locked" in str(e):
             print("🔒 База данных заблокирована. Перезапуск через 5 секунд...")
             time.sleep(5)
-            recover_database()
+            db_connection.close_all()
+            recover_database(db_connection.db_path)
+            wallet_service.invalidate_cache()
             run_bot()
         else:
             raise e
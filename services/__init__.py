@@ -8,6 +8,10 @@ from .simple_budget_service import simple_budget_service
 from .budget_planner import budget_planner
 from .user_settings_service import user_settings_service
 from .transaction_editor import transaction_editor
+from .export_service import export_service
+from .import_service import import_service
+from .savings_projection import savings_projection
+from . import instrumentation  # оборачивает публичные методы сервисов метриками
 
 __all__ = [
     'wallet_service',
@@ -19,4 +23,7 @@ __all__ = [
     'budget_planner',
     'user_settings_service',
     'transaction_editor',
+    'export_service',
+    'import_service',
+    'savings_projection',
 ]
\ No newline at end of file
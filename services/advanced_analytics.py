@@ -1,8 +1,10 @@
 # services/advanced_analytics.py - ИСПРАВЛЕННАЯ ВЕРСИЯ
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 from database.connection import db_connection
+from database.writer import write_operation
+from .health_score import load_history, score_history
 
 logger = logging.getLogger(__name__)
 
@@ -14,75 +16,19 @@ class AdvancedAnalyticsService:
     
     def calculate_financial_health_score(self, user_id: int) -> Dict:
         """
-        Рассчитывает общий индекс финансового здоровья (0-100)
-        на основе вавилонских принципов
+        Индекс финансового здоровья (0-100) на основе вавилонских принципов:
+        из последнего ночного пересчета, а если его еще не было - по всей
+        истории пользователя сразу
         """
+        saved = self.get_saved_health_score(user_id)
+        if saved is not None:
+            return saved
+        
         try:
-            # Получаем данные из базы
             with db_connection.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Получаем текущие балансы кошельков
-                cursor.execute('SELECT wallet_type, balance FROM wallets WHERE user_id = ?', (user_id,))
-                wallets = {row[0]: row[1] for row in cursor.fetchall()}
-                
-                # Получаем транзакции для анализа
-                cursor.execute('''
-                    SELECT type, amount, category, description, date 
-                    FROM transactions 
-                    WHERE user_id = ? 
-                    ORDER BY date DESC 
-                    LIMIT 100
-                ''', (user_id,))
-                transactions = cursor.fetchall()
-            
-            # Используем существующие сервисы для получения дополнительных данных
-            from services.debt_service import debt_service
-            from services.wallet_service import wallet_service
-            
-            debts = debt_service.get_active_debts(user_id)
-            
-            # 1. Правило 10% (Вес: 30%)
-            rule_10_percent = self._calculate_10_percent_score(wallets, transactions)
-            
-            # 2. Контроль расходов (Вес: 25%)
-            expense_control = self._calculate_expense_control_score(wallets, transactions)
-            
-            # 3. Свобода от долгов (Вес: 20%)
-            debt_freedom = self._calculate_debt_freedom_score(debts)
-            
-            # 4. Стабильность доходов (Вес: 15%)
-            income_stability = self._calculate_income_stability_score(transactions)
+                history = load_history(conn.cursor(), [user_id])
             
-            # 5. Накопительные привычки (Вес: 10%)
-            savings_habit = self._calculate_savings_habit_score(wallets, transactions)
-            
-            # Общий счет (взвешенная сумма)
-            total_score = (
-                rule_10_percent * 0.30 +
-                expense_control * 0.25 +
-                debt_freedom * 0.20 +
-                income_stability * 0.15 +
-                savings_habit * 0.10
-            )
-            
-            # Генерируем рекомендации
-            recommendations = self._generate_recommendations_direct(
-                rule_10_percent, expense_control, debt_freedom, income_stability, savings_habit
-            )
-            
-            return {
-                'total_score': round(total_score, 1),
-                'components': {
-                    'rule_10_percent': round(rule_10_percent, 1),
-                    'expense_control': round(expense_control, 1),
-                    'debt_freedom': round(debt_freedom, 1),
-                    'income_stability': round(income_stability, 1),
-                    'savings_habit': round(savings_habit, 1)
-                },
-                'level': self._get_financial_level(total_score),
-                'recommendations': recommendations
-            }
+            return self._format_health_score(score_history(history)[user_id])
             
         except Exception as e:
             logger.error(f"Financial health calculation error: {e}")
@@ -93,121 +39,96 @@ class AdvancedAnalyticsService:
                 'recommendations': ['Начните с добавления первых транзакций']
             }
     
-    def _calculate_10_percent_score(self, wallets: Dict, transactions: List) -> float:
-        """Оценка соблюдения правила 10%"""
-        gold_reserve = wallets.get('gold_reserve', 0)
-        
-        # Анализ доходов за последние 3 месяца
-        recent_income = self._calculate_recent_income(transactions, days=90)
-        
-        if recent_income == 0:
-            return 0.0
-        
-        actual_percentage = (gold_reserve / recent_income * 100) if recent_income > 0 else 0
-        target_percentage = 10.0
-        
-        # Оценка: чем ближе к 10%, тем выше балл
-        score = max(0, min(100, (actual_percentage / target_percentage * 100)))
-        return score
-    
-    def _calculate_expense_control_score(self, wallets: Dict, transactions: List) -> float:
-        """Оценка контроля расходов"""
-        living_budget = wallets.get('living_budget', 0)
-        
-        # Анализ расходов за последний месяц
-        recent_expenses = self._calculate_recent_expenses(transactions, days=30)
-        
-        if living_budget == 0:
-            return 50.0  # Средний балл если нет данных
-        
-        # Идеал: расходы составляют 80-90% от бюджета жизни
-        expense_ratio = (recent_expenses / living_budget * 100) if living_budget > 0 else 0
-        ideal_min, ideal_max = 70, 90
-        
-        if expense_ratio < ideal_min:
-            # Слишком мало тратим (возможно, не все учитываем)
-            score = (expense_ratio / ideal_min * 100) * 0.8
-        elif expense_ratio <= ideal_max:
-            # Идеальный диапазон
-            score = 100.0
-        else:
-            # Превышаем бюджет
-            overspend = expense_ratio - ideal_max
-            score = max(0, 100 - (overspend * 2))
+    def calculate_all_health_scores(self) -> Dict[int, Dict]:
+        """
+        Индекс финансового здоровья всех пользователей одним пакетом (ночной пересчет).
+        Ошибки не перехватывает: пустой результат выглядел бы как успешный пересчет
+        """
+        with db_connection.get_connection() as conn:
+            history = load_history(conn.cursor())
         
-        return score
+        return {user_id: self._format_health_score(score)
+                for user_id, score in score_history(history).items()}
     
-    def _calculate_debt_freedom_score(self, debts: List) -> float:
-        """Оценка свободы от долгов"""
-        if not debts:
-            return 100.0  # Нет долгов - идеальный счет
-        
-        total_debt = sum(debt.current_amount for debt in debts)
-        total_initial = sum(debt.initial_amount for debt in debts)
-        
-        if total_initial == 0:
-            return 0.0
-        
-        # Прогресс погашения (чем больше погашено, тем выше балл)
-        progress = ((total_initial - total_debt) / total_initial * 100)
-        
-        # Учитываем также размер долговой нагрузки
-        debt_burden_score = max(0, 100 - (total_debt / 10000))  # Упрощенная формула
+    def recompute_all_health_scores(self) -> Dict:
+        """
+        Пересчитывает индекс всех пользователей одним пакетом и сохраняет его
+        в health_scores (ночная задача). Расчет идет в потоке вызывающего,
+        потоку-писателю достается только пачка UPSERT
+        """
+        try:
+            scores = self.calculate_all_health_scores()
+            rows = [(user_id, score['total_score'], score['level'],
+                     json.dumps(score['components']), json.dumps(score['windows']))
+                    for user_id, score in scores.items()]
+            
+            self._save_health_scores(rows)
+            return {'success': True, 'users': len(rows)}
         
-        return (progress + debt_burden_score) / 2
+        except Exception as e:
+            logger.error(f"❌ Ошибка ночного пересчета индекса здоровья: {e}")
+            return {'success': False, 'error': str(e)}
     
-    def _calculate_income_stability_score(self, transactions: List) -> float:
-        """Оценка стабильности доходов"""
-        income_transactions = [t for t in transactions if t[0] == 'income']
-        
-        if len(income_transactions) < 2:
-            return 50.0  # Недостаточно данных
-        
-        # Берем последние 6 доходов (примерно 3 месяца)
-        amounts = [t[1] for t in income_transactions[:6]]
-        avg_income = sum(amounts) / len(amounts)
-        
-        if avg_income == 0:
-            return 0.0
-        
-        # Коэффициент вариации (меньше = стабильнее)
-        variance = sum((x - avg_income) ** 2 for x in amounts) / len(amounts)
-        std_dev = variance ** 0.5
-        cv = (std_dev / avg_income * 100)
-        
-        # Оценка: чем меньше вариация, тем выше балл
-        score = max(0, 100 - min(cv, 100))  # Ограничиваем cv 100%
-        return score
+    @write_operation
+    def _save_health_scores(self, rows: List[tuple]):
+        """Сохраняет рассчитанные индексы одной пачкой UPSERT"""
+        with db_connection.get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO health_scores (user_id, total_score, level, components, windows)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    total_score = excluded.total_score,
+                    level = excluded.level,
+                    components = excluded.components,
+                    windows = excluded.windows,
+                    computed_at = CURRENT_TIMESTAMP
+            ''', rows)
+            conn.commit()
     
-    def _calculate_savings_habit_score(self, wallets: Dict, transactions: List) -> float:
-        """Оценка накопительных привычек"""
-        gold_reserve = wallets.get('gold_reserve', 0)
-        
-        # Анализ регулярности пополнений
-        savings_transactions = [t for t in transactions if t[0] == 'income']
-        
-        if not savings_transactions or gold_reserve == 0:
-            return 0.0
-        
-        # Простая оценка: чем больше золотой запас относительно доходов, тем лучше
-        recent_income = self._calculate_recent_income(transactions, days=90)
-        if recent_income == 0:
-            return 0.0
-        
-        savings_ratio = (gold_reserve / recent_income * 100)
-        score = min(100, savings_ratio * 2)  # 50% соотношение = 100 баллов
+    def get_saved_health_score(self, user_id: int) -> Optional[Dict]:
+        """Индекс из последнего ночного пересчета (None - еще не считался)"""
+        try:
+            with db_connection.get_connection() as conn:
+                row = conn.execute('''
+                    SELECT total_score, level, components, windows, computed_at
+                    FROM health_scores WHERE user_id = ?
+                ''', (user_id,)).fetchone()
+            
+            if row is None:
+                return None
+            total_score, level, components, windows, computed_at = row
+            components = json.loads(components)
+            return {
+                'total_score': total_score,
+                'components': components,
+                'windows': json.loads(windows),
+                'level': level,
+                'recommendations': self._generate_recommendations_direct(
+                    components['rule_10_percent'], components['expense_control'],
+                    components['debt_freedom'], components['income_stability'],
+                    components['savings_habit']
+                ),
+                'computed_at': computed_at,
+            }
         
-        return score
-    
-    def _calculate_recent_income(self, transactions: List, days: int = 30) -> float:
-        """Рассчитывает доходы за указанный период"""
-        # Упрощенная версия - берем все доходы из переданных транзакций
-        return sum(t[1] for t in transactions if t[0] == 'income')
+        except Exception as e:
+            logger.error(f"Saved health score error: {e}")
+            return None
     
-    def _calculate_recent_expenses(self, transactions: List, days: int = 30) -> float:
-        """Рассчитывает расходы за указанный период"""
-        # Упрощенная версия - берем все расходы из переданных транзакций
-        return sum(t[1] for t in transactions if t[0] == 'expense')
+    def _format_health_score(self, score: Dict) -> Dict:
+        """Округляет компоненты и добавляет уровень и рекомендации"""
+        components = {name: round(value, 1) for name, value in score['components'].items()}
+        return {
+            'total_score': round(score['total_score'], 1),
+            'components': components,
+            'windows': score['windows'],
+            'level': self._get_financial_level(score['total_score']),
+            'recommendations': self._generate_recommendations_direct(
+                score['components']['rule_10_percent'], score['components']['expense_control'],
+                score['components']['debt_freedom'], score['components']['income_stability'],
+                score['components']['savings_habit']
+            )
+        }
     
     def _get_financial_level(self, score: float) -> str:
         """Определяет уровень финансового здоровья"""
@@ -0,0 +1,111 @@
+# services/async_services.py - АСИНХРОННЫЙ ФАСАД НАД СЕРВИСАМИ
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from database.connection import db_connection
+from database.idempotency import idempotency_store
+from database.writer import db_writer
+from .wallet_service import wallet_service
+from .babylon_service import babylon_service
+from .transaction_service import transaction_service
+from .debt_service import debt_service
+from .financial_analytics import financial_analytics
+from .simple_budget_service import simple_budget_service
+from .budget_planner import budget_planner
+from .user_settings_service import user_settings_service
+from .transaction_editor import transaction_editor
+from .export_service import export_service
+from .import_service import import_service
+from .savings_projection import savings_projection
+from .advanced_analytics import advanced_analytics
+
+logger = logging.getLogger(__name__)
+
+# Потоков не больше, чем соединений в пуле: лишние всё равно ждали бы соединение
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', db_connection.pool.max_size))
+
+class DatabaseExecutor:
+    """
+    Выделенный пул потоков для работы с базой данных.
+    Синхронные вызовы сервисов выполняются здесь, а цикл событий бота
+    только ожидает результат и продолжает обслуживать других пользователей.
+    """
+    
+    def __init__(self, max_workers: int = DB_EXECUTOR_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='db-worker'
+            )
+        return self._executor
+    
+    async def run(self, func, *args, **kwargs):
+        """Выполняет синхронную функцию в пуле потоков БД"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        return await loop.run_in_executor(self._get_executor(), call)
+    
+    def shutdown(self, wait: bool = True):
+        """Останавливает пул потоков (при завершении бота)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+            logger.info("✅ Пул потоков БД остановлен")
+
+class AsyncService:
+    """
+    Асинхронная обёртка над сервисом.
+    Методы сервиса становятся корутинами, выполняемыми в DatabaseExecutor,
+    операции записи ставятся в очередь потока-писателя,
+    остальные атрибуты (например, справочники правил) отдаются как есть.
+    """
+    
+    def __init__(self, service, executor: DatabaseExecutor):
+        self._service = service
+        self._executor = executor
+    
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if not callable(attr):
+            return attr
+        
+        if getattr(attr, '__write_operation__', None) is not None:
+            @functools.wraps(attr)
+            async def wrapper(*args, **kwargs):
+                # В пуле только постановка в очередь (может ждать при полной очереди),
+                # результат ждем в цикле событий, не занимая поток
+                future = await self._executor.run(db_writer.submit, attr, *args, **kwargs)
+                return await asyncio.wrap_future(future)
+        else:
+            @functools.wraps(attr)
+            async def wrapper(*args, **kwargs):
+                return await self._executor.run(attr, *args, **kwargs)
+        
+        # Кэшируем обёртку, чтобы не создавать её на каждый вызов
+        self.__dict__[name] = wrapper
+        return wrapper
+
+# Глобальный экземпляр
+db_executor = DatabaseExecutor()
+
+async_wallet_service = AsyncService(wallet_service, db_executor)
+async_babylon_service = AsyncService(babylon_service, db_executor)
+async_transaction_service = AsyncService(transaction_service, db_executor)
+async_debt_service = AsyncService(debt_service, db_executor)
+async_financial_analytics = AsyncService(financial_analytics, db_executor)
+async_simple_budget_service = AsyncService(simple_budget_service, db_executor)
+async_budget_planner = AsyncService(budget_planner, db_executor)
+async_user_settings_service = AsyncService(user_settings_service, db_executor)
+async_transaction_editor = AsyncService(transaction_editor, db_executor)
+async_export_service = AsyncService(export_service, db_executor)
+async_import_service = AsyncService(import_service, db_executor)
+async_savings_projection = AsyncService(savings_projection, db_executor)
+async_advanced_analytics = AsyncService(advanced_analytics, db_executor)
+async_idempotency_store = AsyncService(idempotency_store, db_executor)
@@ -3,9 +3,60 @@ import logging
 import random
 from typing import Dict
 from database.connection import db_connection
+from database.writer import write_operation
+from utils.money import to_kopecks
 
 logger = logging.getLogger(__name__)
 
+# Остаток долгов, при котором прогресс "Свободы от долгов" равен 50%
+DEBT_PROGRESS_SCALE = to_kopecks(50000)
+
+# Прогресс правил всех пользователей одним запросом (суммы в копейках):
+# 10% - доля доходов, ушедшая в Золотой запас, относительно 10%;
+# контроль расходов - доля Бюджета на жизнь в балансе относительно 90%
+# (NULL - пустой баланс, прежний прогресс сохраняется);
+# свобода от долгов - 100% без долгов, дальше убывает с остатком
+RULE_PROGRESS_QUERY = '''
+    WITH users AS (
+        SELECT user_id FROM wallets
+        UNION SELECT user_id FROM debts
+        UNION SELECT user_id FROM babylon_rules
+    ),
+    savings AS (
+        SELECT user_id, SUM(amount) AS income, SUM(gold_amount) AS gold
+        FROM transactions
+        WHERE type = 'income'
+        GROUP BY user_id
+    ),
+    balances AS (
+        SELECT user_id,
+               SUM(CASE WHEN wallet_type = 'gold_reserve' THEN balance ELSE 0 END) AS gold_reserve,
+               SUM(CASE WHEN wallet_type = 'living_budget' THEN balance ELSE 0 END) AS living_budget
+        FROM wallets
+        GROUP BY user_id
+    ),
+    debt_totals AS (
+        SELECT user_id, SUM(current_amount) AS remaining
+        FROM debts
+        WHERE status = 'active'
+        GROUP BY user_id
+    )
+    SELECT u.user_id,
+           CASE WHEN s.income > 0
+                THEN ROUND(MAX(0.0, MIN(100.0, s.gold * 100.0 / s.income / 10.0 * 100)), 1)
+                ELSE 0.0 END,
+           CASE WHEN b.gold_reserve + b.living_budget > 0
+                THEN ROUND(MAX(0.0, MIN(100.0, b.living_budget * 100.0 / (b.gold_reserve + b.living_budget) / 90.0 * 100)), 1)
+                END,
+           CASE WHEN COALESCE(d.remaining, 0) <= 0 THEN 100.0
+                ELSE ROUND((1 - d.remaining * 1.0 / (d.remaining + :debt_scale)) * 100, 1) END
+    FROM users u
+    LEFT JOIN savings s ON s.user_id = u.user_id
+    LEFT JOIN balances b ON b.user_id = u.user_id
+    LEFT JOIN debt_totals d ON d.user_id = u.user_id
+    WHERE u.user_id IS NOT NULL
+'''
+
 class BabylonService:
     def __init__(self):
         self.rules = {
@@ -31,6 +82,7 @@ class BabylonService:
             }
         }
     
+    @write_operation
     def init_user_rules(self, user_id: int) -> bool:
         """Инициализирует прогресс правил для нового пользователя"""
         try:
@@ -80,6 +132,7 @@ class BabylonService:
 
 *Готов следовать мудрости древних?*"""
     
+    @write_operation
     def update_rule_progress(self, user_id: int, rule_name: str, progress: float) -> bool:
         """Обновляет прогресс выполнения правила"""
         try:
@@ -99,6 +152,41 @@ class BabylonService:
             logger.error(f"❌ Ошибка обновления прогресса правила: {e}")
             return False
     
+    @write_operation
+    def recompute_all_progress(self) -> Dict:
+        """
+        Пересчитывает прогресс правил всех пользователей из агрегатов (ночная задача):
+        один групповой запрос и одна пачка UPSERT вместо записи из каждого обработчика
+        """
+        try:
+            with db_connection.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(RULE_PROGRESS_QUERY, {'debt_scale': DEBT_PROGRESS_SCALE})
+                users = cursor.fetchall()
+                
+                rows = []
+                for user_id, ten_percent, control_expenses, debt_free in users:
+                    rows.append((user_id, '10_percent_rule', ten_percent))
+                    if control_expenses is not None:
+                        rows.append((user_id, 'control_expenses', control_expenses))
+                    rows.append((user_id, 'debt_free', debt_free))
+                
+                cursor.executemany('''
+                    INSERT INTO babylon_rules (user_id, rule_name, progress)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (user_id, rule_name) DO UPDATE SET
+                        progress = excluded.progress,
+                        last_updated = CURRENT_TIMESTAMP
+                ''', rows)
+                
+                conn.commit()
+                return {'success': True, 'users': len(users), 'updated': len(rows)}
+        
+        except Exception as e:
+            logger.error(f"❌ Ошибка пересчета прогресса правил: {e}")
+            return {'success': False, 'error': str(e)}
+    
     def get_user_progress(self, user_id: int) -> Dict:
         """Возвращает прогресс пользователя по всем правилам"""
         try:
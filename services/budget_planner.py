@@ -3,6 +3,8 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from database.connection import db_connection
+from database.writer import write_operation
+from utils.money import Money, to_rubles
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +25,13 @@ class BudgetPlanner:
                 ''', (user_id, category))
                 
                 result = cursor.fetchone()
-                return result[0] if result else None
+                return to_rubles(result[0]) if result else None
                 
         except Exception as e:
             logger.error(f"Check existing budget error: {e}")
             return None
     
+    @write_operation
     def set_monthly_budget(self, user_id: int, category: str, amount: float) -> Dict:
         """Установка месячного бюджета по категории с проверкой дубликатов"""
         try:
@@ -44,7 +47,7 @@ class BudgetPlanner:
                         UPDATE budgets 
                         SET amount = ?, created_at = CURRENT_TIMESTAMP
                         WHERE user_id = ? AND category = ? AND period = 'monthly'
-                    ''', (amount, user_id, category))
+                    ''', (Money.from_rubles(amount).to_db(), user_id, category))
                     
                     message = f"✅ *Бюджет обновлен!*\n\n" \
                              f"• Категория: {category}\n" \
@@ -56,7 +59,7 @@ class BudgetPlanner:
                     cursor.execute('''
                         INSERT INTO budgets (user_id, category, amount, period)
                         VALUES (?, ?, ?, 'monthly')
-                    ''', (user_id, category, amount))
+                    ''', (user_id, category, Money.from_rubles(amount).to_db()))
                     
                     message = f"✅ *Бюджет установлен!*\n\n" \
                              f"• Категория: {category}\n" \
@@ -81,10 +84,16 @@ class BudgetPlanner:
             with db_connection.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Получаем все установленные бюджеты
+                # Бюджеты и траты текущего месяца одним запросом:
+                # месячная сводка присоединяется по категории (без запроса на каждый бюджет)
                 cursor.execute('''
-                    SELECT category, amount FROM budgets 
-                    WHERE user_id = ? AND period = 'monthly'
+                    SELECT b.category, b.amount, COALESCE(r.total, 0) AS spent
+                    FROM budgets b
+                    LEFT JOIN rollup_monthly r
+                        ON r.user_id = b.user_id AND r.type = 'expense'
+                        AND r.month = strftime('%Y-%m', 'now') AND r.category = b.category
+                    WHERE b.user_id = ? AND b.period = 'monthly'
+                    ORDER BY b.id
                 ''', (user_id,))
                 budgets = cursor.fetchall()
                 
@@ -100,16 +109,9 @@ class BudgetPlanner:
                 total_budget = 0
                 total_spent = 0
                 
-                for category, budget_amount in budgets:
-                    # Расходы по категории за текущий месяц
-                    cursor.execute('''
-                        SELECT COALESCE(SUM(amount), 0)
-                        FROM transactions 
-                        WHERE user_id = ? AND category = ? AND type = 'expense'
-                        AND date >= date('now', 'start of month')
-                    ''', (user_id, category))
-                    
-                    spent = cursor.fetchone()[0]
+                for category, budget_kopecks, spent_kopecks in budgets:
+                    budget_amount = to_rubles(budget_kopecks)
+                    spent = to_rubles(spent_kopecks)
                     percentage = (spent / budget_amount * 100) if budget_amount > 0 else 0
                     remaining = max(0, budget_amount - spent)
                     
@@ -152,11 +154,11 @@ class BudgetPlanner:
                 cursor.execute('''
                     SELECT category, AVG(monthly_total) as avg_monthly
                     FROM (
-                        SELECT category, strftime('%Y-%m', date) as month, 
-                               SUM(amount) as monthly_total
-                        FROM transactions 
+                        SELECT category, substr(day, 1, 7) as month, 
+                               SUM(total) as monthly_total
+                        FROM rollup_daily 
                         WHERE user_id = ? AND type = 'expense'
-                        AND date >= date('now', '-3 months')
+                        AND day >= date('now', '-3 months')
                         GROUP BY category, month
                     )
                     GROUP BY category
@@ -172,7 +174,8 @@ class BudgetPlanner:
                     }
                 
                 suggestions = []
-                for category, avg_spending in spending_patterns:
+                for category, avg_kopecks in spending_patterns:
+                    avg_spending = to_rubles(avg_kopecks)
                     # Предлагаем бюджет на 10-20% выше средних расходов
                     suggested_budget = avg_spending * 1.15
                     suggestions.append({
@@ -216,6 +219,7 @@ class BudgetPlanner:
         
         return alerts
     
+    @write_operation
     def delete_budget(self, user_id: int, category: str) -> Dict:
         """Удаляет бюджет по категории"""
         try:
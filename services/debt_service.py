@@ -1,19 +1,43 @@
 # services/debt_service.py - ИСПРАВЛЕННАЯ ВЕРСИЯ
 import logging
+import os
 import random
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
 from database.connection import db_connection
+from database.writer import write_operation
+from database.idempotency import idempotent
 from database.models import Debt
 from services.wallet_service import wallet_service
+from utils.cache import MISSING, TTLCache
+from utils.money import Money, to_rubles
+from .debt_simulator import months_until, payoff_order, simulate
 
 logger = logging.getLogger(__name__)
 
+# Кэш симуляций погашения: сбрасывается при add_debt и make_payment,
+# TTL - чтобы даты в плане не отставали от календаря
+DEBT_PLAN_CACHE_SIZE = int(os.getenv('DEBT_PLAN_CACHE_SIZE', 1000))
+DEBT_PLAN_CACHE_TTL = float(os.getenv('DEBT_PLAN_CACHE_TTL', 3600))
+
+STRATEGY_NAMES = {
+    'snowball': 'Снежный ком',
+    'avalanche': 'Лавина',
+    'custom': 'Своя очередь',
+}
+
 class DebtService:
     """
     Чистая вавилонская система управления долгами с интеграцией в бюджет 90%.
     """
     
+    def __init__(self):
+        # user_id -> {(monthly_payment, custom_order): план}
+        self._plan_cache = TTLCache(max_size=DEBT_PLAN_CACHE_SIZE, ttl=DEBT_PLAN_CACHE_TTL)
+    
     def get_active_debts(self, user_id: int) -> List[Debt]:
         """Возвращает список активных долгов пользователя"""
         with db_connection.get_connection() as conn:
@@ -29,10 +53,18 @@ class DebtService:
             
             debts = []
             for row in cursor.fetchall():
-                debts.append(Debt(*row))
+                debts.append(self._row_to_debt(row))
             
             return debts
     
+    def _row_to_debt(self, row) -> Debt:
+        """Строка debts (суммы в копейках) -> Debt (суммы в рублях)"""
+        debt = Debt(*row)
+        debt.initial_amount = to_rubles(debt.initial_amount)
+        debt.current_amount = to_rubles(debt.current_amount)
+        return debt
+    
+    @write_operation
     def add_debt(self, user_id: int, creditor: str, amount: float, 
                 interest_rate: float = 0.0, due_date: Optional[datetime] = None) -> Dict:
         """Добавляет новый долг с вавилонской мудростью"""
@@ -44,11 +76,15 @@ class DebtService:
                     INSERT INTO debts (user_id, creditor, initial_amount, current_amount, 
                                      interest_rate, due_date, status)
                     VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (user_id, creditor, amount, amount, interest_rate, due_date, 'active'))
+                ''', (user_id, creditor, Money.from_rubles(amount).to_db(), Money.from_rubles(amount).to_db(),
+                      interest_rate, due_date, 'active'))
                 
                 conn.commit()
                 debt_id = cursor.lastrowid
                 
+                # План погашения пересчитается с новым долгом
+                db_connection.on_commit(lambda: self._plan_cache.invalidate(user_id))
+                
                 wisdom = self._get_debt_wisdom_message(amount, creditor)
                 
                 return {
@@ -65,68 +101,78 @@ class DebtService:
             logger.error(f"Debt add error: {e}")
             return {'success': False, 'error': 'Ошибка при добавлении долга'}
     
+    @write_operation
+    @idempotent('make_payment')
     def make_payment(self, user_id: int, debt_id: int, amount: float) -> Dict:
         """
         Погашение долга с ПРОВЕРКОЙ БЮДЖЕТА 90% и списанием средств
         """
         try:
-            # 🔒 ВАВИЛОНСКОЕ ПРАВИЛО: погашение только из Бюджета на жизни
-            affordability = wallet_service.can_afford_expense(user_id, amount)
-            
-            if not affordability['can_afford']:
-                return {
-                    'success': False,
-                    'error': f"🚫 *Недостаточно средств в Бюджете на жизнь!*\n\n"
-                            f"💼 Доступно: {affordability['available']:,.0f} руб.\n"
-                            f"💸 Нужно для погашения: {amount:,.0f} руб.\n"
-                            f"📉 Не хватает: {affordability['shortfall']:,.0f} руб.\n\n"
-                            f"💡 *Мудрость Вавилона:* «Сначала накопить, потом погашать»"
-                }
-            
-            with db_connection.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Получаем информацию о долге
-                cursor.execute('''
-                    SELECT current_amount, creditor FROM debts 
-                    WHERE id = ? AND user_id = ? AND status = 'active'
-                ''', (debt_id, user_id))
-                
-                result = cursor.fetchone()
-                if not result:
-                    return {'success': False, 'error': 'Долг не найден'}
-                
-                current_amount, creditor = result
-                
-                if amount > current_amount:
-                    amount = current_amount  # Нельзя заплатить больше долга
+            # Проверка бюджета, списание и обновление долга -
+            # одна единица работы с одним commit
+            with db_connection.transaction():
+                # 🔒 ВАВИЛОНСКОЕ ПРАВИЛО: погашение только из Бюджета на жизни
+                affordability = wallet_service.can_afford_expense(user_id, amount)
                 
-                new_amount = current_amount - amount
-                status = 'paid' if new_amount <= 0 else 'active'
-                
-                # 🔒 ВАВИЛОНСКОЕ ПРАВИЛО: списание из Бюджета на жизнь
-                wallet_service.update_wallet_balance(user_id, 'living_budget', -amount)
-                
-                # Обновляем долг
-                cursor.execute('''
-                    UPDATE debts 
-                    SET current_amount = ?, status = ?
-                    WHERE id = ? AND user_id = ?
-                ''', (new_amount, status, debt_id, user_id))
+                if not affordability['can_afford']:
+                    return {
+                        'success': False,
+                        'error': f"🚫 *Недостаточно средств в Бюджете на жизнь!*\n\n"
+                                f"💼 Доступно: {affordability['available']:,.0f} руб.\n"
+                                f"💸 Нужно для погашения: {amount:,.0f} руб.\n"
+                                f"📉 Не хватает: {affordability['shortfall']:,.0f} руб.\n\n"
+                                f"💡 *Мудрость Вавилона:* «Сначала накопить, потом погашать»"
+                    }
                 
-                # Сохраняем запись о погашении (для истории)
-                cursor.execute('''
-                    INSERT INTO debt_payments (user_id, debt_id, amount, payment_date)
-                    VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-                ''', (user_id, debt_id, amount))
+                with db_connection.get_connection() as conn:
+                    cursor = conn.cursor()
+                    
+                    # Получаем информацию о долге
+                    cursor.execute('''
+                        SELECT current_amount, creditor FROM debts 
+                        WHERE id = ? AND user_id = ? AND status = 'active'
+                    ''', (debt_id, user_id))
+                    
+                    result = cursor.fetchone()
+                    if not result:
+                        return {'success': False, 'error': 'Долг не найден'}
+                    
+                    current_amount = Money.from_db(result[0])
+                    creditor = result[1]
+                    payment = Money.from_rubles(amount)
+                    
+                    if payment > current_amount:
+                        payment = current_amount  # Нельзя заплатить больше долга
+                    
+                    remaining = current_amount - payment
+                    status = 'paid' if remaining.kopecks <= 0 else 'active'
+                    
+                    # 🔒 ВАВИЛОНСКОЕ ПРАВИЛО: списание из Бюджета на жизнь
+                    wallet_service.update_wallet_balance(user_id, 'living_budget', -payment)
+                    
+                    # Обновляем долг
+                    cursor.execute('''
+                        UPDATE debts 
+                        SET current_amount = ?, status = ?
+                        WHERE id = ? AND user_id = ?
+                    ''', (remaining.to_db(), status, debt_id, user_id))
+                    
+                    # Сохраняем запись о погашении (для истории)
+                    cursor.execute('''
+                        INSERT INTO debt_payments (user_id, debt_id, amount, payment_date)
+                        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                    ''', (user_id, debt_id, payment.to_db()))
+                    
+                    conn.commit()
+                    
+                    amount = payment.rubles
+                    new_amount = remaining.rubles
                 
-                conn.commit()
-            
-            # Обновляем прогресс правила "Свобода от долгов"
-            self._update_debt_rule_progress(user_id)
+                # План погашения пересчитается с новым остатком
+                db_connection.on_commit(lambda: self._plan_cache.invalidate(user_id))
             
             wisdom = self._get_payment_wisdom_message(amount, creditor, status)
-            new_budget_balance = affordability['available'] - amount
+            new_budget_balance = (Money.from_rubles(affordability['available']) - payment).rubles
             
             return {
                 'success': True,
@@ -138,7 +184,7 @@ class DebtService:
                           f"• 💼 Новый баланс бюджета: {new_budget_balance:,.0f} руб.\n\n"
                           f"{wisdom}"
             }
-            
+        
         except Exception as e:
             logger.error(f"Debt payment error: {e}")
             return {'success': False, 'error': 'Ошибка при погашении долга'}
@@ -146,32 +192,139 @@ class DebtService:
     # ... остальные методы debt_service с аналогичными исправлениями ...
     
     def calculate_snowball_plan(self, user_id: int) -> Dict:
-        """Рассчитывает план погашения по методу 'снежного кома'"""
-        debts = self.get_active_debts(user_id)
+        """Рассчитывает план погашения по методу 'снежного кома' со сравнением стратегий"""
+        simulation = self.simulate_payoff(user_id)
         
-        if not debts:
+        if 'error' in simulation:
+            return {'has_debts': False, 'message': f"❌ {simulation['error']}"}
+        if not simulation['has_debts']:
             return {'has_debts': False, 'message': '🎉 У вас нет активных долгов!'}
         
-        sorted_debts = sorted(debts, key=lambda x: x.current_amount)
+        snowball = simulation['strategies']['snowball']
+        debts = {debt['id']: debt for debt in simulation['debts']}
         
         plan = []
-        total_debt = sum(debt.current_amount for debt in debts)
-        
-        for i, debt in enumerate(sorted_debts):
+        for i, debt_id in enumerate(snowball['order']):
+            debt = debts[debt_id]
             plan.append({
                 'priority': i + 1,
-                'creditor': debt.creditor,
-                'amount': debt.current_amount,
-                'recommended_payment': self._calculate_recommended_payment(debt)
+                'creditor': debt['creditor'],
+                'amount': debt['amount'],
+                'recommended_payment': debt['minimum_payment'],
+                'payoff_month': snowball['payoff_months'][debt_id]
             })
         
         return {
             'has_debts': True,
-            'total_debt': total_debt,
+            'total_debt': simulation['total_debt'],
             'plan': plan,
-            'message': self._get_snowball_wisdom_message(total_debt, len(debts))
+            'simulation': simulation,
+            'message': self._get_snowball_wisdom_message(simulation['total_debt'], len(plan))
         }
     
+    def simulate_payoff(self, user_id: int, monthly_payment: Optional[float] = None,
+                        custom_order: Optional[Sequence[int]] = None) -> Dict:
+        """
+        Помесячная симуляция погашения активных долгов с процентами:
+        снежный ком, лавина и (если задана) своя очередь custom_order (id долгов).
+        monthly_payment - платеж в месяц по всем долгам, по умолчанию сумма
+        рекомендуемых платежей. Результат кэшируется до add_debt/make_payment.
+        """
+        variant = (monthly_payment, tuple(custom_order) if custom_order else None)
+        cached = self._plan_cache.get(user_id)
+        if cached is not MISSING and variant in cached:
+            return cached[variant]
+        version = self._plan_cache.version(user_id)
+        
+        try:
+            result = self._simulate_payoff(self.get_active_debts(user_id), monthly_payment, variant[1])
+        except Exception as e:
+            logger.error(f"Debt payoff simulation error: {e}")
+            return {'has_debts': False, 'error': 'Ошибка при расчете плана погашения'}
+        
+        variants = dict(cached) if cached is not MISSING else {}
+        variants[variant] = result
+        self._plan_cache.put(user_id, variants, version=version)
+        return result
+    
+    def _simulate_payoff(self, debts: List[Debt], monthly_payment: Optional[float],
+                         custom_order: Optional[Tuple[int, ...]]) -> Dict:
+        if not debts:
+            return {'has_debts': False, 'strategies': {}}
+        
+        balances = np.array([debt.current_amount for debt in debts], dtype=float)
+        rates = np.array([debt.interest_rate or 0.0 for debt in debts], dtype=float)
+        minimums = np.array([self._calculate_recommended_payment(debt) for debt in debts])
+        
+        strategies = {name: payoff_order(name, balances, rates) for name in ('snowball', 'avalanche')}
+        if custom_order:
+            position = {debt.id: i for i, debt in enumerate(debts)}
+            listed = [position[debt_id] for debt_id in custom_order if debt_id in position]
+            # Долги, не попавшие в свою очередь, идут после нее по снежному кому
+            rest = [i for i in strategies['snowball'].tolist() if i not in listed]
+            strategies['custom'] = np.array(listed + rest)
+        
+        names = list(strategies)
+        budget = monthly_payment if monthly_payment is not None else minimums.sum()
+        simulation = simulate(balances, rates, minimums, budget, [strategies[name] for name in names])
+        
+        today = datetime.now()
+        due_in = [months_until(debt.due_date, today) for debt in debts]
+        
+        results = {}
+        for s, name in enumerate(names):
+            payoff = simulation['payoff_month'][s]
+            months = int(simulation['months'][s])
+            results[name] = {
+                'name': STRATEGY_NAMES[name],
+                'order': [debts[i].id for i in strategies[name]],
+                'months': months if months >= 0 else None,
+                'debt_free_date': self._add_months(today, months).strftime('%m.%Y') if months >= 0 else None,
+                'total_interest': round(float(simulation['interest'][s].sum()), 2),
+                'total_paid': round(float(simulation['payment'][s].sum()), 2),
+                'payoff_months': {debt.id: (int(payoff[i]) if payoff[i] >= 0 else None)
+                                  for i, debt in enumerate(debts)},
+                # Долги, которые эта стратегия погасит позже срока
+                'late': [debt.creditor for i, debt in enumerate(debts)
+                         if due_in[i] is not None and (payoff[i] < 0 or payoff[i] > due_in[i])],
+                'schedule': [
+                    {'month': month + 1,
+                     'payment': round(float(simulation['payment'][s, month]), 2),
+                     'interest': round(float(simulation['interest'][s, month]), 2),
+                     'balance': round(float(simulation['balance'][s, month]), 2)}
+                    for month in range(simulation['payment'].shape[1])
+                ],
+            }
+        
+        # Рекомендуем стратегию с меньшими процентами среди погашающих все долги
+        finished = [name for name in names if results[name]['months'] is not None] or names
+        recommended = min(finished, key=lambda name: (results[name]['total_interest'], names.index(name)))
+        
+        return {
+            'has_debts': True,
+            'total_debt': round(float(balances.sum()), 2),
+            'monthly_payment': round(simulation['budget'], 2),
+            'debts': [{'id': debt.id, 'creditor': debt.creditor, 'amount': debt.current_amount,
+                       'interest_rate': debt.interest_rate or 0.0, 'minimum_payment': float(minimums[i])}
+                      for i, debt in enumerate(debts)],
+            'strategies': results,
+            'recommended': recommended,
+            'interest_saved': round(results['snowball']['total_interest'] - results['avalanche']['total_interest'], 2),
+        }
+    
+    @staticmethod
+    def _add_months(date: datetime, months: int) -> datetime:
+        """Первое число месяца через months месяцев"""
+        month_index = date.month - 1 + months
+        return datetime(date.year + month_index // 12, month_index % 12 + 1, 1)
+    
+    def invalidate_plan_cache(self, user_id: Optional[int] = None):
+        """Сбрасывает кэш планов погашения пользователя или (без аргумента) всех"""
+        if user_id is None:
+            self._plan_cache.invalidate()
+        else:
+            self._plan_cache.invalidate(user_id)
+    
     def _calculate_recommended_payment(self, debt: Debt) -> float:
         """Рассчитывает рекомендуемый платеж на основе суммы долга"""
         base_payment = 1000
@@ -198,20 +351,5 @@ class DebtService:
         """Возвращает мудрость для плана погашения"""
         return f"🏛️ *Совет Вавилона:* «Погашайте малые долги первыми — это даст силы для больших побед!»"
     
-    def _update_debt_rule_progress(self, user_id: int):
-        """Обновляет прогресс правила 'Свобода от долгов'"""
-        debts = self.get_active_debts(user_id)
-        total_debt = sum(debt.current_amount for debt in debts)
-        
-        # Прогресс: 100% если долгов нет, уменьшается с ростом долга
-        if total_debt == 0:
-            progress = 100.0
-        else:
-            # Чем меньше долг, тем выше прогресс (логарифмическая шкала)
-            progress = max(0.0, min(100.0, (1 - (total_debt / (total_debt + 50000))) * 100))
-        
-        from services.babylon_service import babylon_service
-        babylon_service.update_rule_progress(user_id, 'debt_free', progress)
-
 # Глобальный экземпляр сервиса
 debt_service = DebtService()
\ No newline at end of file
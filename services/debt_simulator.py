@@ -0,0 +1,100 @@
+# services/debt_simulator.py - ПОМЕСЯЧНАЯ СИМУЛЯЦИЯ ПОГАШЕНИЯ ДОЛГОВ
+"""
+Погашение долгов месяц за месяцем: начисление процентов, минимальные платежи
+и остаток бюджета на первый по очереди долг. Платеж погашенного долга
+переходит на следующий ("снежный ком"), потому что месячный бюджет постоянен.
+
+Стратегии отличаются только очередью долгов, поэтому все они считаются
+одновременно: состояние - матрица [стратегия, долг], цикл идет только по месяцам
+и заканчивается, как только все стратегии погасили все долги.
+"""
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+MAX_MONTHS = 360  # горизонт - 30 лет
+PAID_EPSILON = 0.005  # остаток меньше полкопейки считается погашенным
+
+def payoff_order(strategy: str, balances: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    """
+    Очередь долгов (индексы) для стратегии:
+    snowball - от меньшего остатка к большему, avalanche - от большей ставки к меньшей
+    """
+    if strategy == 'snowball':
+        return np.lexsort((-rates, balances))
+    if strategy == 'avalanche':
+        return np.lexsort((balances, -rates))
+    raise ValueError(f"Неизвестная стратегия погашения: {strategy}")
+
+def simulate(balances: np.ndarray, rates: np.ndarray, minimums: np.ndarray, budget: float,
+             orders: Sequence[np.ndarray], max_months: int = MAX_MONTHS) -> Dict[str, np.ndarray]:
+    """
+    Симулирует погашение для каждой очереди из orders.
+    
+    balances, rates (% годовых), minimums - по долгам; budget - платеж в месяц
+    по всем долгам (не меньше суммы минимальных платежей).
+    Возвращает массивы [стратегия, ...]: payoff_month (номер месяца погашения
+    каждого долга, -1 - не погашен за горизонт), months (-1 - не погашены все),
+    payment/interest/balance - итоги по месяцам.
+    """
+    orders = np.asarray(orders)
+    n_strategies = orders.shape[0]
+    budget = max(float(budget), float(np.sum(minimums)))
+    
+    # Долги каждой стратегии переставлены в ее очередь: в цикле нет выборок по индексам
+    balance = np.asarray(balances, dtype=float)[orders]
+    monthly_rate = (np.asarray(rates, dtype=float) / 100 / 12)[orders]
+    minimums = np.asarray(minimums, dtype=float)[orders]
+    
+    payoff_month = np.where(balance > PAID_EPSILON, -1, 0)
+    payments = np.zeros((n_strategies, max_months))
+    interests = np.zeros((n_strategies, max_months))
+    remaining = np.zeros((n_strategies, max_months))
+    
+    elapsed = 0
+    while elapsed < max_months and (payoff_month < 0).any():
+        active = balance > PAID_EPSILON
+        interest = balance * monthly_rate
+        balance += interest
+        
+        # Минимальные платежи, затем остаток бюджета по очереди стратегии
+        pay = np.minimum(balance, minimums)
+        extra = np.maximum(budget - pay.sum(axis=1), 0)
+        left = balance - pay
+        before = np.cumsum(left, axis=1) - left
+        pay += np.clip(extra[:, None] - before, 0, left)
+        
+        balance -= pay
+        balance[balance <= PAID_EPSILON] = 0.0
+        payoff_month[active & (balance == 0) & (payoff_month < 0)] = elapsed + 1
+        
+        payments[:, elapsed] = pay.sum(axis=1)
+        interests[:, elapsed] = interest.sum(axis=1)
+        remaining[:, elapsed] = balance.sum(axis=1)
+        elapsed += 1
+    
+    # Месяцы погашения - обратно в исходный порядок долгов
+    by_debt = np.empty_like(payoff_month)
+    by_debt[np.arange(n_strategies)[:, None], orders] = payoff_month
+    
+    all_paid = (payoff_month >= 0).all(axis=1)
+    return {
+        'budget': budget,
+        'payoff_month': by_debt,
+        'months': np.where(all_paid, payoff_month.max(axis=1), -1),
+        'payment': payments[:, :elapsed],
+        'interest': interests[:, :elapsed],
+        'balance': remaining[:, :elapsed],
+    }
+
+def months_until(due_date, today: datetime) -> Optional[int]:
+    """Сколько месяцев от today до срока долга (None - срок не задан или не разобран)"""
+    if not due_date:
+        return None
+    if not isinstance(due_date, datetime):
+        try:
+            due_date = datetime.fromisoformat(str(due_date))
+        except ValueError:
+            return None
+    return (due_date.year - today.year) * 12 + due_date.month - today.month
@@ -0,0 +1,84 @@
+# services/export_service.py - ВЫГРУЗКА ОПЕРАЦИЙ В CSV И JSON
+import csv
+import io
+import json
+import logging
+import os
+from typing import BinaryIO, Dict, Iterable, Iterator, List
+
+from services.transaction_service import transaction_service
+
+logger = logging.getLogger(__name__)
+
+# Строк в одной порции чтения из базы и записи в файл
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+EXPORT_COLUMNS = ('id', 'date', 'type', 'amount', 'category', 'description', 'gold_amount')
+
+def iter_csv(chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """CSV с заголовком; разделитель - точка с запятой (как ждет Excel в русской локали)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(EXPORT_COLUMNS)
+    
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_json(chunks: Iterable[List[tuple]]) -> Iterator[str]:
+    """JSON-массив объектов, по объекту на строку"""
+    separator = '\n'
+    yield '['
+    for rows in chunks:
+        parts = []
+        for row in rows:
+            parts.append(separator + json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+            separator = ',\n'
+        yield ''.join(parts)
+    yield '\n]\n'
+
+class ExportService:
+    """
+    Потоковая выгрузка истории операций.
+    Операции читаются из базы порциями и сразу пишутся в файл:
+    в памяти одновременно одна порция, сколько бы операций ни было у пользователя.
+    """
+    
+    FORMATS = {'csv': iter_csv, 'json': iter_json}
+    
+    def write_export(self, user_id: int, export_format: str, file: BinaryIO,
+                     chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict:
+        """
+        Записывает выгрузку в двоичный файл.
+        Возвращает число операций и размер файла в байтах
+        """
+        formatter = self.FORMATS.get(export_format)
+        if formatter is None:
+            return {'success': False, 'error': f'Неизвестный формат: {export_format}'}
+        
+        try:
+            counted = {'rows': 0}
+            
+            def chunks():
+                for rows in transaction_service.iter_transactions(user_id, chunk_size):
+                    counted['rows'] += len(rows)
+                    yield rows
+            
+            # BOM нужен Excel, чтобы распознать кириллицу в CSV
+            size = file.write(b'\xef\xbb\xbf') if export_format == 'csv' else 0
+            for text in formatter(chunks()):
+                size += file.write(text.encode('utf-8'))
+            
+            return {'success': True, 'rows': counted['rows'], 'bytes': size}
+        
+        except Exception as e:
+            logger.error(f"❌ Ошибка выгрузки операций пользователя {user_id}: {e}")
+            return {'success': False, 'error': 'Ошибка при выгрузке операций'}
+
+# Глобальный экземпляр
+export_service = ExportService()
@@ -1,71 +1,140 @@
 # services/financial_analytics.py - ИСПРАВЛЕННАЯ ВЕРСИЯ
 import logging
-from datetime import datetime, timedelta
+import os
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List
 from database.connection import db_connection
+from database.rollups import get_rollup_version
+from utils.cache import MISSING, TTLCache
+from utils.money import to_rubles
 
 logger = logging.getLogger(__name__)
 
+CHART_DATA_CACHE_SIZE = int(os.getenv('CHART_DATA_CACHE_SIZE', 5000))
+CHART_DATA_CACHE_TTL = float(os.getenv('CHART_DATA_CACHE_TTL', 3600))
+
 class FinancialAnalytics:
     """
     Практичная аналитика для повседневного использования
     """
     
-    def get_financial_overview(self, user_id: int) -> Dict:
+    def __init__(self):
+        # user_id -> данные графиков с версией сводок, по которой они посчитаны
+        self._chart_cache = TTLCache(max_size=CHART_DATA_CACHE_SIZE, ttl=CHART_DATA_CACHE_TTL)
+    
+    def get_user_snapshot(self, user_id: int, days: int = 30) -> Dict:
         """
-        Комплексный финансовый обзор пользователя
+        Сводка пользователя за один запрос: кошельки, доходы и расходы за период,
+        активные долги и настройки накоплений (условная агрегация по каждой таблице)
         """
         try:
             with db_connection.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Получаем текущие балансы кошельков
-                cursor.execute('''
-                    SELECT wallet_type, balance FROM wallets WHERE user_id = ?
-                ''', (user_id,))
-                wallets = {row[0]: row[1] for row in cursor.fetchall()}
-                
-                # Доходы за последние 30 дней
-                cursor.execute('''
-                    SELECT COALESCE(SUM(amount), 0) 
-                    FROM transactions 
-                    WHERE user_id = ? AND type = 'income' 
-                    AND date >= date('now', '-30 days')
-                ''', (user_id,))
-                monthly_income = cursor.fetchone()[0]
-                
-                # Расходы за последние 30 дней
-                cursor.execute('''
-                    SELECT COALESCE(SUM(amount), 0) 
-                    FROM transactions 
-                    WHERE user_id = ? AND type = 'expense' 
-                    AND date >= date('now', '-30 days')
-                ''', (user_id,))
-                monthly_expenses = cursor.fetchone()[0]
-                
-                # Накопления (золотой запас)
-                gold_reserve = wallets.get('gold_reserve', 0)
-                
-                # Расчет ключевых метрик
-                savings_rate = (gold_reserve / monthly_income * 100) if monthly_income > 0 else 0
-                expense_ratio = (monthly_expenses / monthly_income * 100) if monthly_income > 0 else 0
-                
-                return {
-                    'success': True,
-                    'wallets': wallets,
-                    'monthly_income': monthly_income,
-                    'monthly_expenses': monthly_expenses,
-                    'gold_reserve': gold_reserve,
-                    'savings_rate': savings_rate,
-                    'expense_ratio': expense_ratio,
-                    'net_flow': monthly_income - monthly_expenses,
-                    'total_balance': sum(wallets.values()) if wallets else 0
-                }
-                
+                return {'success': True, **self.query_snapshot(conn.cursor(), user_id, days)}
+        
         except Exception as e:
-            logger.error(f"Financial overview error: {e}")
+            logger.error(f"User snapshot error: {e}")
             return {'success': False, 'error': 'Ошибка расчета'}
     
+    def query_snapshot(self, cursor, user_id: int, days: int = 30) -> Dict:
+        """Выполняет запрос сводки на переданном курсоре (суммы в рублях)"""
+        cursor.execute('''
+            WITH wallet_totals AS (
+                SELECT
+                    SUM(CASE WHEN wallet_type = 'gold_reserve' THEN balance ELSE 0 END) AS gold_reserve,
+                    SUM(CASE WHEN wallet_type = 'living_budget' THEN balance ELSE 0 END) AS living_budget,
+                    SUM(CASE WHEN wallet_type = 'debt_repayment' THEN balance ELSE 0 END) AS debt_repayment
+                FROM wallets
+                WHERE user_id = :user_id
+            ),
+            period_totals AS (
+                SELECT
+                    SUM(CASE WHEN type = 'income' THEN total ELSE 0 END) AS income,
+                    SUM(CASE WHEN type = 'expense' THEN total ELSE 0 END) AS expenses,
+                    SUM(CASE WHEN type = 'income' THEN count ELSE 0 END) AS income_count,
+                    SUM(CASE WHEN type = 'expense' THEN count ELSE 0 END) AS expense_count
+                FROM rollup_daily
+                WHERE user_id = :user_id AND type IN ('income', 'expense')
+                AND day >= date('now', :since)
+            ),
+            debt_totals AS (
+                SELECT COUNT(*) AS debt_count,
+                       SUM(current_amount) AS debt_current,
+                       SUM(initial_amount) AS debt_initial
+                FROM debts
+                WHERE user_id = :user_id AND status = 'active'
+            )
+            SELECT w.gold_reserve, w.living_budget, w.debt_repayment,
+                   p.income, p.expenses, p.income_count, p.expense_count,
+                   d.debt_count, d.debt_current, d.debt_initial,
+                   s.savings_rate, s.auto_savings
+            FROM wallet_totals w, period_totals p, debt_totals d
+            LEFT JOIN user_settings s ON s.user_id = :user_id
+        ''', {'user_id': user_id, 'since': f'-{int(days)} days'})
+        
+        (gold_reserve, living_budget, debt_repayment,
+         income, expenses, income_count, expense_count,
+         debt_count, debt_current, debt_initial,
+         savings_rate, auto_savings) = cursor.fetchone()
+        
+        return {
+            'wallets': {
+                'gold_reserve': to_rubles(gold_reserve),
+                'living_budget': to_rubles(living_budget),
+                'debt_repayment': to_rubles(debt_repayment),
+            },
+            'period_days': days,
+            'income': to_rubles(income),
+            'expenses': to_rubles(expenses),
+            'income_count': income_count or 0,
+            'expense_count': expense_count or 0,
+            'debts': {
+                'count': debt_count,
+                'current_amount': to_rubles(debt_current),
+                'initial_amount': to_rubles(debt_initial),
+            },
+            'settings': {
+                'savings_rate': savings_rate if savings_rate is not None else 10.0,
+                'auto_savings': bool(auto_savings) if auto_savings is not None else True,
+            },
+        }
+    
+    def get_financial_overview(self, user_id: int) -> Dict:
+        """
+        Комплексный финансовый обзор пользователя
+        """
+        return self.build_overview(self.get_user_snapshot(user_id))
+    
+    def build_overview(self, snapshot: Dict) -> Dict:
+        """
+        Финансовый обзор из готовой сводки (без обращения к базе)
+        """
+        if not snapshot.get('success'):
+            return {'success': False, 'error': snapshot.get('error', 'Ошибка расчета')}
+        
+        wallets = snapshot['wallets']
+        monthly_income = snapshot['income']
+        monthly_expenses = snapshot['expenses']
+        
+        # Накопления (золотой запас)
+        gold_reserve = wallets.get('gold_reserve', 0)
+        
+        # Расчет ключевых метрик
+        savings_rate = (gold_reserve / monthly_income * 100) if monthly_income > 0 else 0
+        expense_ratio = (monthly_expenses / monthly_income * 100) if monthly_income > 0 else 0
+        
+        return {
+            'success': True,
+            'wallets': wallets,
+            'monthly_income': monthly_income,
+            'monthly_expenses': monthly_expenses,
+            'gold_reserve': gold_reserve,
+            'savings_rate': savings_rate,
+            'expense_ratio': expense_ratio,
+            'net_flow': monthly_income - monthly_expenses,
+            'total_balance': sum(wallets.values()) if wallets else 0,
+            'active_debt': snapshot['debts']['current_amount'],
+        }
+    
     def get_spending_analysis(self, user_id: int) -> Dict:
         """
         Детальный анализ расходов по категориям
@@ -76,10 +145,10 @@ class FinancialAnalytics:
                 
                 # Расходы по категориям за последние 30 дней
                 cursor.execute('''
-                    SELECT category, SUM(amount) as total, COUNT(*) as count
-                    FROM transactions 
+                    SELECT category, SUM(total) as total, SUM(count) as count
+                    FROM rollup_daily 
                     WHERE user_id = ? AND type = 'expense'
-                    AND date >= date('now', '-30 days')
+                    AND day >= date('now', '-30 days')
                     GROUP BY category
                     ORDER BY total DESC
                 ''', (user_id,))
@@ -90,8 +159,8 @@ class FinancialAnalytics:
                 # Если нет данных за 30 дней, берем все данные
                 if not categories_data:
                     cursor.execute('''
-                        SELECT category, SUM(amount) as total, COUNT(*) as count
-                        FROM transactions 
+                        SELECT category, SUM(total) as total, SUM(count) as count
+                        FROM rollup_monthly 
                         WHERE user_id = ? AND type = 'expense'
                         GROUP BY category
                         ORDER BY total DESC
@@ -99,9 +168,12 @@ class FinancialAnalytics:
                     categories_data = cursor.fetchall()
                     total_expenses = sum(row[1] for row in categories_data)
                 
+                total_expenses = to_rubles(total_expenses)
+                
                 # Форматируем данные по категориям
                 categories = []
                 for category, total, count in categories_data:
+                    total = to_rubles(total)
                     percentage = (total / total_expenses * 100) if total_expenses > 0 else 0
                     categories.append({
                         'name': category,
@@ -131,28 +203,28 @@ class FinancialAnalytics:
                 
                 # Доходы по месяцам за последние 6 месяцев
                 cursor.execute('''
-                    SELECT strftime('%Y-%m', date) as month, 
-                           SUM(amount) as monthly_income
-                    FROM transactions 
+                    SELECT substr(day, 1, 7) as month, 
+                           SUM(total) as monthly_income
+                    FROM rollup_daily 
                     WHERE user_id = ? AND type = 'income'
-                    AND date >= date('now', '-6 months')
-                    GROUP BY strftime('%Y-%m', date)
+                    AND day >= date('now', '-6 months')
+                    GROUP BY month
                     ORDER BY month DESC
                 ''', (user_id,))
                 
-                monthly_data = cursor.fetchall()
+                monthly_data = [(month, to_rubles(total)) for month, total in cursor.fetchall()]
                 
                 # Доходы по категориям
                 cursor.execute('''
-                    SELECT category, SUM(amount) as total
-                    FROM transactions 
+                    SELECT category, SUM(total) as total
+                    FROM rollup_daily 
                     WHERE user_id = ? AND type = 'income'
-                    AND date >= date('now', '-90 days')
+                    AND day >= date('now', '-90 days')
                     GROUP BY category
                     ORDER BY total DESC
                 ''', (user_id,))
                 
-                category_data = cursor.fetchall()
+                category_data = [(category, to_rubles(total)) for category, total in cursor.fetchall()]
                 total_income = sum(row[1] for row in category_data)
                 
                 # Анализ трендов
@@ -179,6 +251,40 @@ class FinancialAnalytics:
         except Exception as e:
             logger.error(f"Income analysis error: {e}")
             return {'success': False, 'error': 'Ошибка анализа доходов'}
+    
+    def get_chart_data(self, user_id: int) -> Dict:
+        """
+        Данные раздела графиков: обзор, расходы по категориям и доходы по месяцам.
+        Повторный запрос - одно чтение версии сводок: данные пересчитываются,
+        только если сводки пользователя изменились или наступил новый день (UTC)
+        """
+        try:
+            with db_connection.get_connection() as conn:
+                # Версию читаем до данных: запись во время расчета сделает результат устаревшим
+                version = (get_rollup_version(conn, user_id), datetime.now(timezone.utc).date().isoformat())
+            
+            cached = self._chart_cache.get(user_id)
+            if cached is not MISSING and cached['version'] == version:
+                return cached
+            
+            data = {
+                'success': True,
+                'version': version,
+                'overview': self.build_overview(self.get_user_snapshot(user_id)),
+                'spending': self.get_spending_analysis(user_id),
+                'income': self.get_income_analysis(user_id),
+            }
+            if all(data[part]['success'] for part in ('overview', 'spending', 'income')):
+                self._chart_cache.put(user_id, data)
+            return data
+        
+        except Exception as e:
+            logger.error(f"Chart data error: {e}")
+            return {'success': False, 'error': 'Ошибка расчета'}
+    
+    def get_cache_stats(self) -> Dict:
+        """Метрики кэша данных графиков"""
+        return self._chart_cache.get_stats()
 
 # Глобальный экземпляр
 financial_analytics = FinancialAnalytics()
\ No newline at end of file
@@ -0,0 +1,201 @@
+# services/health_score.py - КОЛОНОЧНЫЙ РАСЧЕТ ИНДЕКСА ФИНАНСОВОГО ЗДОРОВЬЯ
+"""
+История пользователей читается из дневных сводок групповыми запросами в массивы
+NumPy (пользователь, возраст дня, доход, расход). Окна 30/90/180 дней - это накопленные
+суммы по 30-дневным корзинам, стабильность доходов - вариация помесячных сумм.
+Один и тот же расчет работает для одного пользователя и для всех сразу
+(ночной пересчет): все компоненты считаются масками по оси пользователей.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+MONTH_DAYS = 30
+HISTORY_MONTHS = 6  # 180 дней - самое длинное окно
+WINDOWS = (30, 90, 180)
+
+# Компонент -> вес в общем индексе
+WEIGHTS = {
+    'rule_10_percent': 0.30,
+    'expense_control': 0.25,
+    'debt_freedom': 0.20,
+    'income_stability': 0.15,
+    'savings_habit': 0.10,
+}
+
+@dataclass
+class HealthHistory:
+    """Колонки истории и итоги по пользователям (суммы в копейках)"""
+    user_ids: np.ndarray        # отсортированные id пользователей
+    user_index: np.ndarray      # индекс пользователя для каждого дня окна
+    age: np.ndarray             # сколько дней назад был день (0 - сегодня)
+    income: np.ndarray
+    expenses: np.ndarray
+    first_age: np.ndarray       # по пользователям: возраст первого дня истории, -1 - истории нет
+    gold_reserve: np.ndarray
+    living_budget: np.ndarray
+    debt_count: np.ndarray
+    debt_current: np.ndarray
+    debt_initial: np.ndarray
+
+def _user_filter(user_ids: Optional[Iterable[int]]) -> tuple:
+    if user_ids is None:
+        return '', []
+    user_ids = list(user_ids)
+    return f" AND user_id IN ({','.join('?' * len(user_ids))})", user_ids
+
+def load_history(cursor, user_ids: Optional[Iterable[int]] = None) -> HealthHistory:
+    """
+    Читает историю пользователей user_ids (None - всех) четырьмя групповыми
+    запросами: дни окна и начало истории из rollup_daily, кошельки и активные долги
+    """
+    where, params = _user_filter(user_ids)
+    
+    # Дни самого длинного окна; более старая история нужна только для даты начала
+    cursor.execute(f'''
+        SELECT user_id, type = 'income',
+               CAST(julianday('now', 'start of day') - julianday(day) AS INTEGER), SUM(total)
+        FROM rollup_daily
+        WHERE type IN ('income', 'expense') AND day >= date('now', ?){where}
+        GROUP BY user_id, type, day
+    ''', [f'-{MONTH_DAYS * HISTORY_MONTHS - 1} days'] + params)
+    days = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 4)
+    
+    cursor.execute(f'''
+        SELECT user_id, CAST(julianday('now', 'start of day') - julianday(MIN(day)) AS INTEGER)
+        FROM rollup_daily
+        WHERE type IN ('income', 'expense'){where}
+        GROUP BY user_id
+    ''', params)
+    first_days = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+    
+    cursor.execute(f'''
+        SELECT user_id,
+               SUM(CASE WHEN wallet_type = 'gold_reserve' THEN balance ELSE 0 END),
+               SUM(CASE WHEN wallet_type = 'living_budget' THEN balance ELSE 0 END)
+        FROM wallets
+        WHERE balance IS NOT NULL{where}
+        GROUP BY user_id
+    ''', params)
+    wallets = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 3)
+    
+    cursor.execute(f'''
+        SELECT user_id, COUNT(*), SUM(current_amount), SUM(initial_amount)
+        FROM debts
+        WHERE status = 'active'{where}
+        GROUP BY user_id
+    ''', params)
+    debts = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 4)
+    
+    if user_ids is None:
+        users = np.unique(np.concatenate([first_days[:, 0], wallets[:, 0], debts[:, 0]]))
+    else:
+        users = np.unique(np.array(params, dtype=np.int64))
+    
+    def per_user(rows: np.ndarray, column: int, default: int = 0) -> np.ndarray:
+        values = np.full(len(users), default, dtype=np.int64)
+        values[np.searchsorted(users, rows[:, 0])] = rows[:, column]
+        return values
+    
+    is_income = days[:, 1] == 1
+    return HealthHistory(
+        user_ids=users,
+        user_index=np.searchsorted(users, days[:, 0]),
+        # День из будущего (часовой пояс, ручная дата) считается сегодняшним
+        age=np.maximum(days[:, 2], 0),
+        income=np.where(is_income, days[:, 3], 0),
+        expenses=np.where(is_income, 0, days[:, 3]),
+        first_age=np.maximum(per_user(first_days, 1, -1), -1),
+        gold_reserve=per_user(wallets, 1),
+        living_budget=per_user(wallets, 2),
+        debt_count=per_user(debts, 1),
+        debt_current=per_user(debts, 2),
+        debt_initial=per_user(debts, 3),
+    )
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Поэлементное деление, 0 там, где знаменатель не положителен"""
+    numerator = numerator.astype(float)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+def _monthly(history: HealthHistory, values: np.ndarray) -> np.ndarray:
+    """Суммы по 30-дневным корзинам за 180 дней: [пользователь, корзина], корзина 0 - последние 30 дней"""
+    cells = history.user_index * HISTORY_MONTHS + history.age // MONTH_DAYS
+    totals = np.bincount(cells, weights=values, minlength=len(history.user_ids) * HISTORY_MONTHS)
+    return totals.reshape(len(history.user_ids), HISTORY_MONTHS)
+
+def score_history(history: HealthHistory) -> Dict[int, Dict]:
+    """Компоненты индекса (0-100), общий балл и оконные суммы (рубли) для каждого пользователя"""
+    monthly_income = _monthly(history, history.income)
+    monthly_expenses = _monthly(history, history.expenses)
+    
+    # Окно N дней = накопленная сумма первых N/30 корзин
+    cumulative_income = np.cumsum(monthly_income, axis=1)
+    cumulative_expenses = np.cumsum(monthly_expenses, axis=1)
+    income = {days: cumulative_income[:, days // MONTH_DAYS - 1] for days in WINDOWS}
+    expenses = {days: cumulative_expenses[:, days // MONTH_DAYS - 1] for days in WINDOWS}
+    
+    # Сколько 30-дневных корзин покрывает история пользователя (не больше шести)
+    first_age = history.first_age
+    covered = np.where(first_age >= 0, np.minimum(first_age // MONTH_DAYS + 1, HISTORY_MONTHS), 0)
+    in_history = np.arange(HISTORY_MONTHS) < covered[:, None]
+    income_months = ((monthly_income > 0) & in_history).sum(axis=1)
+    
+    gold = history.gold_reserve
+    
+    # 1. Правило 10%: золотой запас относительно доходов за 90 дней
+    rule_10_percent = np.clip(_ratio(gold, income[90]) * 100 / 10.0 * 100, 0, 100)
+    
+    # 2. Контроль расходов: расходы за 30 дней к бюджету жизни, идеал 70-90%
+    expense_ratio = _ratio(expenses[30], history.living_budget) * 100
+    expense_control = np.select(
+        [history.living_budget <= 0, expense_ratio < 70, expense_ratio <= 90],
+        [50.0, expense_ratio / 70 * 100 * 0.8, 100.0],
+        np.maximum(0, 100 - (expense_ratio - 90) * 2)
+    )
+    
+    # 3. Свобода от долгов: доля погашенного и размер остатка (10 000 ₽ = 1 балл)
+    progress = _ratio(history.debt_initial - history.debt_current, history.debt_initial) * 100
+    burden = np.maximum(0, 100 - history.debt_current / 100 / 10000)
+    debt_freedom = np.select(
+        [history.debt_count == 0, history.debt_initial <= 0],
+        [100.0, 0.0],
+        (progress + burden) / 2
+    )
+    
+    # 4. Стабильность доходов: коэффициент вариации помесячных доходов в пределах истории
+    months = np.maximum(covered, 1)
+    mean = (monthly_income * in_history).sum(axis=1) / months
+    variance = (((monthly_income - mean[:, None]) ** 2) * in_history).sum(axis=1) / months
+    cv = _ratio(np.sqrt(variance), mean) * 100
+    income_stability = np.where(income_months < 2, 50.0, 100 - np.minimum(cv, 100))
+    
+    # 5. Накопительные привычки: размер запаса и регулярность месяцев с доходом
+    regularity = _ratio(income_months, covered)
+    savings_habit = np.where(
+        (gold > 0) & (income[90] > 0),
+        np.minimum(100, _ratio(gold, income[90]) * 100 * 2) * regularity,
+        0.0
+    )
+    
+    components = {
+        'rule_10_percent': rule_10_percent,
+        'expense_control': expense_control,
+        'debt_freedom': debt_freedom,
+        'income_stability': income_stability,
+        'savings_habit': savings_habit,
+    }
+    total = sum(components[name] * weight for name, weight in WEIGHTS.items())
+    
+    scores = {}
+    for index, user_id in enumerate(history.user_ids.tolist()):
+        scores[user_id] = {
+            'total_score': float(total[index]),
+            'components': {name: float(values[index]) for name, values in components.items()},
+            'windows': {
+                f'{days}d': {'income': income[days][index] / 100, 'expenses': expenses[days][index] / 100}
+                for days in WINDOWS
+            },
+        }
+    return scores
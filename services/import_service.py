@@ -0,0 +1,323 @@
+# services/import_service.py - ИМПОРТ ИСТОРИИ ОПЕРАЦИЙ ИЗ CSV И OFX
+import codecs
+import csv
+import logging
+import os
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from database.connection import db_connection
+from database.rollups import apply_transaction_range
+from database.writer import write_operation
+from services.wallet_service import wallet_service
+from utils.categorizers import categorize_expense, categorize_income
+from utils.money import Money
+
+logger = logging.getLogger(__name__)
+
+# Строк в одной пачке executemany (и между сообщениями о прогрессе)
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 5000))
+
+# Сколько ошибочных строк показывать пользователю
+MAX_REPORTED_ERRORS = 5
+
+# Строка импорта: (date 'YYYY-MM-DD HH:MM:SS', type, amount в копейках, category, description)
+ImportRow = Tuple[str, str, int, str, str]
+
+# Названия колонок CSV (в нижнем регистре): наша выгрузка и типичные выписки банков
+CSV_COLUMNS = {
+    'date': ('date', 'дата', 'дата операции', 'дата платежа'),
+    'amount': ('amount', 'сумма', 'сумма операции', 'сумма платежа'),
+    'type': ('type', 'тип', 'тип операции'),
+    'category': ('category', 'категория'),
+    'description': ('description', 'описание', 'назначение платежа', 'комментарий'),
+}
+
+_TYPES = {'income': 'income', 'доход': 'income', 'expense': 'expense', 'расход': 'expense'}
+
+# Форматы дат выписок: ISO (наша выгрузка) и русский ДД.ММ.ГГГГ, время по желанию.
+# Регулярные выражения вместо перебора strptime: на сотнях тысяч строк это в разы быстрее
+_ISO_DATE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?$')
+_RU_DATE = re.compile(r'(\d{1,2})[./](\d{1,2})[./](\d{4})(?: (\d{1,2}):(\d{2})(?::(\d{2}))?)?$')
+
+_WORD = re.compile(r'\w+')
+_OFX_TAG = re.compile(r'<(/?)(\w+)>([^<]*)')
+
+class ImportFormatError(ValueError):
+    """Файл нельзя импортировать целиком (нет нужных колонок, неизвестный формат)"""
+
+def parse_date(value: str) -> str:
+    """Дата выписки -> формат колонки transactions.date"""
+    value = value.strip()
+    match = _ISO_DATE.match(value)
+    if match:
+        year, month, day, hour, minute, second = match.groups()
+    else:
+        match = _RU_DATE.match(value)
+        if not match:
+            raise ValueError(f"неизвестный формат даты «{value}»")
+        day, month, year, hour, minute, second = match.groups()
+    # Конструктор проверяет саму дату (31.02 и т.п.)
+    try:
+        date = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    except ValueError:
+        raise ValueError(f"несуществующая дата «{value}»")
+    return date.strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_amount(value: str) -> Decimal:
+    """Сумма с пробелами-разделителями разрядов и десятичной запятой: «-1 234,56»"""
+    cleaned = value.replace('\xa0', '').replace(' ', '').replace(',', '.')
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        amount = None
+    if amount is None or not amount.is_finite():
+        raise ValueError(f"неверная сумма «{value}»")
+    return amount
+
+def categorize(transaction_type: str, category: str, description: str) -> str:
+    """Категория по словам исходной категории и описания (utils.categorizers)"""
+    categorizer = categorize_income if transaction_type == 'income' else categorize_expense
+    for word in _WORD.findall(f"{category} {description}".lower()):
+        result = categorizer(word)
+        if result != 'Другое':
+            return result
+    return 'Другое'
+
+def _make_row(date: str, amount: Decimal, transaction_type: Optional[str],
+              category: str, description: str, payee: str = '') -> ImportRow:
+    """
+    Без явного типа знак суммы задает направление, как в банковских выписках:
+    отрицательная - расход, положительная - доход.
+    Категория из файла сохраняется как есть, пустая - подбирается по получателю и описанию
+    """
+    if transaction_type is None:
+        transaction_type = 'expense' if amount < 0 else 'income'
+    kopecks = abs(Money.from_rubles(amount).to_db())
+    if not kopecks:
+        raise ValueError("нулевая сумма")
+    description = description.strip()
+    category = category.strip() or categorize(transaction_type, payee, description)
+    return (parse_date(date), transaction_type, kopecks, category, description)
+
+def parse_csv(lines: Iterable[str], errors: List[Tuple[int, str]]) -> Iterator[ImportRow]:
+    """
+    Потоково разбирает CSV с заголовком (разделитель , ; или табуляция).
+    Ошибочные строки пропускаются и попадают в errors как (номер строки, причина)
+    """
+    lines = iter(lines)
+    header_line = next(lines, '')
+    try:
+        dialect = csv.Sniffer().sniff(header_line, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    
+    header = [name.strip().lower() for name in next(csv.reader([header_line], dialect), [])]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for index, name in enumerate(header):
+            if name in aliases:
+                columns[field] = index
+                break
+    if 'date' not in columns or 'amount' not in columns:
+        raise ImportFormatError("В заголовке CSV нужны колонки даты и суммы (date/дата, amount/сумма)")
+    
+    def cell(values, field):
+        index = columns.get(field)
+        return values[index] if index is not None and index < len(values) else ''
+    
+    for line_number, values in enumerate(csv.reader(lines, dialect), start=2):
+        if not any(value.strip() for value in values):
+            continue
+        try:
+            transaction_type = None
+            if 'type' in columns:
+                transaction_type = _TYPES.get(cell(values, 'type').strip().lower())
+                if transaction_type is None:
+                    raise ValueError(f"неизвестный тип «{cell(values, 'type')}»")
+            yield _make_row(cell(values, 'date'), parse_amount(cell(values, 'amount')), transaction_type,
+                            cell(values, 'category'), cell(values, 'description'))
+        except ValueError as e:
+            errors.append((line_number, str(e)))
+
+def parse_ofx(lines: Iterable[str], errors: List[Tuple[int, str]]) -> Iterator[ImportRow]:
+    """
+    Потоково разбирает OFX (SGML 1.x и XML 2.x): операции - блоки STMTTRN
+    с полями DTPOSTED, TRNAMT, NAME и MEMO
+    """
+    transaction = None
+    for line_number, line in enumerate(lines, start=1):
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    transaction = {'line': line_number}
+                    continue
+                if transaction is not None:
+                    try:
+                        posted = transaction.get('DTPOSTED', '')[:14]
+                        date = datetime.strptime(posted, '%Y%m%d%H%M%S' if len(posted) == 14 else '%Y%m%d')
+                        yield _make_row(date.strftime('%Y-%m-%d %H:%M:%S'),
+                                        parse_amount(transaction.get('TRNAMT', '')), None, '',
+                                        transaction.get('MEMO') or transaction.get('NAME', ''),
+                                        payee=transaction.get('NAME', ''))
+                    except ValueError as e:
+                        errors.append((transaction['line'], str(e)))
+                transaction = None
+            elif transaction is not None and not closing:
+                transaction[tag] = value.strip()
+
+PARSERS = {'csv': parse_csv, 'ofx': parse_ofx, 'qfx': parse_ofx}
+
+def detect_encoding(path: str, chunk_size: int = 1 << 20) -> str:
+    """UTF-8 (с BOM или без), иначе cp1251 - кодировка выгрузок российских банков"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as f:
+        try:
+            while True:
+                chunk = f.read(chunk_size)
+                decoder.decode(chunk, final=not chunk)
+                if not chunk:
+                    return 'utf-8-sig'
+        except UnicodeDecodeError:
+            return 'cp1251'
+
+def _batched(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+class ImportService:
+    """
+    Импорт истории из выписок: потоковый разбор в потоке вызывающего,
+    вставка пачками через executemany - каждая пачка отдельной операцией писателя,
+    чтобы большой файл не занимал поток-писатель целиком.
+    Сводки и балансы кошельков обновляются один раз на пачку.
+    """
+    
+    def import_file(self, user_id: int, path: str, file_format: str,
+                    progress: Optional[Callable[[int], None]] = None,
+                    batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+        """Импортирует файл выписки (csv, ofx, qfx)"""
+        parser = PARSERS.get(file_format)
+        if parser is None:
+            return {'success': False, 'error': f'Формат {file_format} не поддерживается'}
+        
+        try:
+            errors = []
+            with open(path, encoding=detect_encoding(path), newline='') as f:
+                return self._import(user_id, parser(f, errors), errors, progress, batch_size)
+        except ImportFormatError as e:
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            logger.error(f"❌ Ошибка импорта файла пользователя {user_id}: {e}")
+            return {'success': False, 'error': 'Ошибка при импорте файла'}
+    
+    def import_rows(self, user_id: int, rows: Iterable[ImportRow],
+                    progress: Optional[Callable[[int], None]] = None,
+                    batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+        """Импортирует уже разобранные строки"""
+        try:
+            return self._import(user_id, rows, [], progress, batch_size)
+        except Exception as e:
+            logger.error(f"❌ Ошибка импорта операций пользователя {user_id}: {e}")
+            return {'success': False, 'error': 'Ошибка при импорте операций'}
+    
+    def _import(self, user_id: int, rows: Iterable[ImportRow], errors: list,
+                progress: Optional[Callable[[int], None]], batch_size: int) -> Dict:
+        totals = {'imported': 0, 'income': 0, 'expenses': 0, 'gold': 0, 'date_from': None, 'date_to': None}
+        
+        if not wallet_service.init_user_wallets(user_id):
+            return {'success': False, 'error': 'Ошибка при импорте файла'}
+        
+        # Пачка фиксируется целиком или не фиксируется вовсе. Уже записанные пачки
+        # при ошибке остаются - пользователь узнает, сколько операций загружено
+        for batch in _batched(rows, batch_size):
+            try:
+                written = self._insert_batch(user_id, batch)
+            except Exception as e:
+                logger.error(f"❌ Ошибка записи пачки импорта пользователя {user_id}: {e}")
+                return {
+                    'success': False,
+                    'error': f"Ошибка при импорте: загружено операций - {totals['imported']}, "
+                             f"остальные не сохранены",
+                    'imported': totals['imported'],
+                }
+            
+            for key in ('imported', 'income', 'expenses', 'gold'):
+                totals[key] += written[key]
+            totals['date_from'] = min(filter(None, (totals['date_from'], written['date_from'])))
+            totals['date_to'] = max(filter(None, (totals['date_to'], written['date_to'])))
+            
+            if progress:
+                try:
+                    progress(totals['imported'])
+                except Exception as e:
+                    logger.error(f"Ошибка обработчика прогресса импорта: {e}")
+        
+        return {
+            'success': True,
+            'imported': totals['imported'],
+            'skipped': len(errors),
+            'errors': [f"строка {line}: {reason}" for line, reason in errors[:MAX_REPORTED_ERRORS]],
+            'income': Money(totals['income']).rubles,
+            'expenses': Money(totals['expenses']).rubles,
+            'gold_reserve': Money(totals['gold']).rubles,
+            'date_from': totals['date_from'],
+            'date_to': totals['date_to'],
+        }
+    
+    @write_operation
+    def _insert_batch(self, user_id: int, batch: List[ImportRow]) -> Dict:
+        """Одна пачка - одна транзакция: executemany, сводки по диапазону id и по одному обновлению кошелька"""
+        params = []
+        income = expenses = gold = 0
+        
+        with db_connection.transaction() as conn:
+            settings = conn.execute(
+                'SELECT savings_rate, auto_savings FROM user_settings WHERE user_id = ?', (user_id,)
+            ).fetchone()
+            savings_rate = settings[0] if settings and settings[1] else 0
+            
+            for date, transaction_type, amount, category, description in batch:
+                if transaction_type == 'income':
+                    # Доля Золотого запаса - по настройкам пользователя, как при обычном доходе
+                    gold_part = Money(amount).split(savings_rate)[0].to_db()
+                    income += amount
+                    gold += gold_part
+                else:
+                    gold_part = 0
+                    expenses += amount
+                params.append((user_id, transaction_type, amount, category, description, date, gold_part))
+            
+            # Пока транзакция держит блокировку записи, новые id идут подряд после текущего максимума
+            first_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM transactions').fetchone()[0]
+            conn.executemany('''
+                INSERT INTO transactions (user_id, type, amount, category, description, date, gold_amount)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', params)
+            apply_transaction_range(conn, first_id, first_id + len(params) - 1)
+            
+            if gold:
+                wallet_service.update_wallet_balance(user_id, 'gold_reserve', Money(gold))
+            if income - gold - expenses:
+                wallet_service.update_wallet_balance(user_id, 'living_budget', Money(income - gold - expenses))
+        
+        dates = [row[0] for row in batch]
+        return {
+            'imported': len(batch),
+            'income': income,
+            'expenses': expenses,
+            'gold': gold,
+            'date_from': min(dates),
+            'date_to': max(dates),
+        }
+
+# Глобальный экземпляр
+import_service = ImportService()
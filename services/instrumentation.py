@@ -0,0 +1,73 @@
+# services/instrumentation.py - МЕТРИКИ СЕРВИСНОГО СЛОЯ
+from database.connection import db_connection
+from database.writer import db_writer
+from database.idempotency import idempotency_store
+from utils.financial_charts import financial_charts
+from utils.metrics import instrument_service, metrics
+
+from .wallet_service import wallet_service
+from .babylon_service import babylon_service
+from .transaction_service import transaction_service
+from .debt_service import debt_service
+from .financial_analytics import financial_analytics
+from .simple_budget_service import simple_budget_service
+from .budget_planner import budget_planner
+from .user_settings_service import user_settings_service
+from .transaction_editor import transaction_editor
+from .advanced_analytics import advanced_analytics
+from .export_service import export_service
+from .import_service import import_service
+from .savings_projection import savings_projection
+
+SERVICES = {
+    'wallet_service': wallet_service,
+    'babylon_service': babylon_service,
+    'transaction_service': transaction_service,
+    'debt_service': debt_service,
+    'financial_analytics': financial_analytics,
+    'simple_budget_service': simple_budget_service,
+    'budget_planner': budget_planner,
+    'user_settings_service': user_settings_service,
+    'transaction_editor': transaction_editor,
+    'advanced_analytics': advanced_analytics,
+    'export_service': export_service,
+    'import_service': import_service,
+    'savings_projection': savings_projection,
+}
+
+def database_gauges():
+    """Мгновенные значения очереди записи, пула соединений и кэшей"""
+    writer = db_writer.get_stats()
+    pool = db_connection.get_pool_stats()
+    cache = wallet_service.get_cache_stats()
+    keys = idempotency_store.get_cache_stats()
+    chart_data = financial_analytics.get_cache_stats()
+    chart_text = financial_charts.get_cache_stats()
+    return [
+        ('db_writer_queue_depth', {}, writer['queue_depth']),
+        ('db_writer_completed_total', {}, writer['completed']),
+        ('db_writer_failed_total', {}, writer['failed']),
+        ('db_writer_avg_batch_size', {}, writer['avg_batch_size']),
+        ('db_pool_connections', {'state': 'in_use'}, pool['in_use']),
+        ('db_pool_connections', {'state': 'idle'}, pool['idle']),
+        ('db_pool_avg_wait_seconds', {}, pool['avg_wait_time']),
+        ('wallet_cache_size', {}, cache['size']),
+        ('wallet_cache_hit_rate', {}, cache['hit_rate']),
+        ('idempotency_cache_size', {}, keys['size']),
+        ('chart_cache_hit_rate', {'layer': 'data'}, chart_data['hit_rate']),
+        ('chart_cache_hit_rate', {'layer': 'render'}, chart_text['hit_rate']),
+    ]
+
+def instrument_services():
+    """Оборачивает публичные методы всех сервисов сбором метрик"""
+    for name, service in SERVICES.items():
+        instrument_service(service, name)
+
+metrics.describe('db_writer_queue_depth', 'gauge', 'Операций в очереди потока-писателя')
+metrics.describe('db_writer_completed_total', 'counter', 'Выполненные операции записи')
+metrics.describe('db_writer_failed_total', 'counter', 'Операции записи, завершившиеся ошибкой')
+metrics.describe('db_pool_connections', 'gauge', 'Соединения пула по состоянию')
+metrics.describe('wallet_cache_hit_rate', 'gauge', 'Доля попаданий в кэш балансов')
+metrics.describe('chart_cache_hit_rate', 'gauge', 'Доля попаданий в кэши графиков по слоям')
+metrics.register_collector(database_gauges)
+instrument_services()
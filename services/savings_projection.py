@@ -0,0 +1,147 @@
+# services/savings_projection.py - ПРОГНОЗ ДОСТИЖЕНИЯ ЦЕЛИ ЗОЛОТОГО ЗАПАСА
+"""
+Когда Золотой запас дорастет до цели: Монте-Карло по истории пользователя.
+Каждый путь - это месяцы, случайно выбранные (с возвращением) из полных месяцев
+истории доходов; в запас идет savings_rate% дохода, как при распределении.
+Расходы оплачиваются только из Бюджета на жизнь, поэтому на запас не влияют.
+
+Пути считаются пачками массивов NumPy [путь, месяц]; расчет останавливается
+по бюджету времени, так что его можно вызывать прямо из обработчика.
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+from database.connection import db_connection
+from utils.money import to_kopecks, to_rubles
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_PATHS = int(os.getenv('PROJECTION_PATHS', 5000))
+PROJECTION_BATCH = 1000
+PROJECTION_TIME_BUDGET = float(os.getenv('PROJECTION_TIME_BUDGET', 0.2))  # секунд
+HISTORY_MONTHS = 24
+MIN_HISTORY_MONTHS = 2
+MAX_HORIZON_MONTHS = 360
+
+PERCENTILES = (10, 50, 90)
+
+class SavingsProjectionService:
+    """Прогноз Золотого запаса по распределению месячных доходов"""
+    
+    def load_inputs(self, user_id: int) -> Dict:
+        """Запас, норма накоплений и доходы полных месяцев истории (копейки, месяцы без дохода - нули)"""
+        with db_connection.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT month, SUM(total)
+                FROM rollup_monthly
+                WHERE user_id = ? AND type = 'income'
+                AND month >= strftime('%Y-%m', 'now', 'start of month', ?)
+                AND month < strftime('%Y-%m', 'now')
+                GROUP BY month
+            ''', (user_id, f'-{HISTORY_MONTHS} months'))
+            income_by_month = dict(cursor.fetchall())
+            
+            cursor.execute('''
+                SELECT COALESCE(SUM(CASE WHEN w.wallet_type = 'gold_reserve' THEN w.balance END), 0),
+                       s.savings_rate, s.auto_savings
+                FROM (SELECT ? AS user_id) u
+                LEFT JOIN wallets w ON w.user_id = u.user_id
+                LEFT JOIN user_settings s ON s.user_id = u.user_id
+            ''', (user_id,))
+            gold_reserve, savings_rate, auto_savings = cursor.fetchone()
+        
+        # Месяцы от первого месяца с доходом до прошлого включительно
+        months = []
+        if income_by_month:
+            year, month = (int(part) for part in min(income_by_month).split('-'))
+            today = datetime.now()
+            while (year, month) < (today.year, today.month):
+                months.append(f'{year:04d}-{month:02d}')
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        
+        if savings_rate is None:
+            savings_rate = 10.0
+        return {
+            'gold_reserve': gold_reserve,
+            'savings_rate': savings_rate if auto_savings is None or auto_savings else 0.0,
+            'monthly_income': np.array([income_by_month.get(month, 0) for month in months], dtype=float),
+        }
+    
+    def project_goal(self, user_id: int, target: float, horizon_months: int = 120,
+                     paths: int = PROJECTION_PATHS, seed: Optional[int] = None) -> Dict:
+        """
+        Вероятность и сроки достижения target рублей в Золотом запасе
+        с перцентильными полосами запаса по месяцам
+        """
+        try:
+            inputs = self.load_inputs(user_id)
+            return self.simulate(inputs, to_kopecks(target), min(horizon_months, MAX_HORIZON_MONTHS), paths, seed)
+        
+        except Exception as e:
+            logger.error(f"Savings projection error: {e}")
+            return {'success': False, 'error': 'Ошибка при расчете прогноза'}
+    
+    def simulate(self, inputs: Dict, target: int, horizon_months: int, paths: int,
+                 seed: Optional[int] = None, time_budget: float = PROJECTION_TIME_BUDGET) -> Dict:
+        """Монте-Карло по подготовленным данным (суммы в копейках)"""
+        gold = inputs['gold_reserve']
+        history = inputs['monthly_income']
+        deposits = history * inputs['savings_rate'] / 100
+        
+        if gold >= target:
+            return {'success': True, 'reached': True, 'target': to_rubles(target), 'gold_reserve': to_rubles(gold)}
+        if len(history) < MIN_HISTORY_MONTHS:
+            return {'success': False, 'error': f'Нужна история доходов хотя бы за {MIN_HISTORY_MONTHS} полных месяца'}
+        if not deposits.any():
+            return {'success': False, 'error': 'Запас не пополняется: нет доходов или накопления выключены'}
+        
+        rng = np.random.default_rng(seed)
+        deadline = time.perf_counter() + time_budget
+        balances, hit_months = [], []
+        simulated = 0
+        # Первая пачка считается всегда, остальные - пока есть время
+        while simulated < paths and (not simulated or time.perf_counter() < deadline):
+            batch = min(PROJECTION_BATCH, paths - simulated)
+            sampled = deposits[rng.integers(0, len(deposits), size=(batch, horizon_months))]
+            balance = gold + np.cumsum(sampled, axis=1)
+            reached = balance >= target
+            # Номер месяца достижения цели, 0 - не достигнута за горизонт
+            hit_months.append(np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, 0))
+            balances.append(balance)
+            simulated += batch
+        
+        balance = np.concatenate(balances)
+        hit = np.concatenate(hit_months)
+        # Не достигшие цели считаются бесконечно долгими: перцентиль может быть "не достигнута"
+        months_to_target = np.where(hit > 0, hit, np.inf)
+        
+        bands = np.percentile(balance, PERCENTILES, axis=0)
+        return {
+            'success': True,
+            'reached': False,
+            'target': to_rubles(target),
+            'gold_reserve': to_rubles(gold),
+            'savings_rate': inputs['savings_rate'],
+            'history_months': len(history),
+            'mean_deposit': to_rubles(int(deposits.mean())),
+            'paths': simulated,
+            'horizon_months': horizon_months,
+            'probability': float((hit > 0).mean()),
+            # Перцентиль -> месяцев до цели (None - не достигается за горизонт)
+            'months_to_target': {
+                p: (int(value) if np.isfinite(value) else None)
+                for p, value in zip(PERCENTILES, np.percentile(months_to_target, PERCENTILES, method='higher'))
+            },
+            # Перцентиль -> запас в рублях на конец каждого месяца
+            'bands': {p: (band / 100).round(2).tolist() for p, band in zip(PERCENTILES, bands)},
+        }
+
+# Глобальный экземпляр сервиса
+savings_projection = SavingsProjectionService()
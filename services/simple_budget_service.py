@@ -2,6 +2,8 @@
 import logging
 from typing import Dict, List, Optional
 from database.connection import db_connection
+from database.writer import write_operation
+from utils.money import Money, to_rubles
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +13,7 @@ class SimpleBudgetService:
     Бюджеты работают ТОЛЬКО с расходами из 90%.
     """
     
+    @write_operation
     def set_category_limit(self, user_id: int, category: str, monthly_limit: float) -> bool:
         """Устанавливает месячный лимит для категории расходов"""
         try:
@@ -20,7 +23,7 @@ class SimpleBudgetService:
                 cursor.execute('''
                     INSERT OR REPLACE INTO budgets (user_id, category, amount, period)
                     VALUES (?, ?, ?, 'monthly')
-                ''', (user_id, category, monthly_limit))
+                ''', (user_id, category, Money.from_rubles(monthly_limit).to_db()))
                 
                 conn.commit()
                 return True
@@ -41,7 +44,7 @@ class SimpleBudgetService:
                 ''', (user_id, category))
                 
                 result = cursor.fetchone()
-                return result[0] if result else None
+                return to_rubles(result[0]) if result else None
                 
         except Exception as e:
             logger.error(f"Budget get error: {e}")
@@ -63,17 +66,20 @@ class SimpleBudgetService:
                 
                 # Получаем текущие расходы за месяц
                 cursor.execute('''
-                    SELECT COALESCE(SUM(amount), 0) 
-                    FROM transactions 
-                    WHERE user_id = ? AND category = ? AND type = 'expense'
-                    AND date >= date('now', 'start of month')
+                    SELECT COALESCE(SUM(total), 0) 
+                    FROM rollup_monthly 
+                    WHERE user_id = ? AND type = 'expense'
+                    AND month = strftime('%Y-%m', 'now') AND category = ?
                 ''', (user_id, category))
                 
-                current_spent = cursor.fetchone()[0]
+                current_spent = Money.from_db(cursor.fetchone()[0])
+                limit = Money.from_rubles(monthly_limit)
                 
-                total_after_expense = current_spent + new_expense
-                exceeded = total_after_expense > monthly_limit
-                overspend = max(0, total_after_expense - monthly_limit)
+                total_after = current_spent + Money.from_rubles(new_expense)
+                exceeded = total_after > limit
+                overspend = max(Money(), total_after - limit).rubles
+                total_after_expense = total_after.rubles
+                current_spent = current_spent.rubles
                 
                 return {
                     'has_limit': True,
@@ -99,7 +105,7 @@ class SimpleBudgetService:
                     SELECT category, amount FROM budgets WHERE user_id = ?
                 ''', (user_id,))
                 
-                limits = {row[0]: row[1] for row in cursor.fetchall()}
+                limits = {row[0]: to_rubles(row[1]) for row in cursor.fetchall()}
                 return limits
                 
         except Exception as e:
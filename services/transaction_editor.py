@@ -1,33 +1,42 @@
 # services/transaction_editor.py - ИСПРАВЛЕННАЯ ВЕРСИЯ
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
 from database.connection import db_connection
+from database.writer import write_operation
+from database.rollups import apply_transaction
 from database.models import Transaction
 from services.wallet_service import wallet_service
+from utils.money import Money, to_rubles
 
 logger = logging.getLogger(__name__)
 
 class TransactionEditor:
     """Сервис для редактирования существующих транзакций"""
     
-    def get_recent_transactions_for_edit(self, user_id: int, limit: int = 5) -> List[Transaction]:
-        """Получает последние транзакции для редактирования"""
+    def get_recent_transactions_for_edit(self, user_id: int, limit: int = 5,
+                                         before: Optional[Tuple[str, int]] = None) -> List[Transaction]:
+        """
+        Получает последние транзакции для редактирования.
+        before - курсор (date, id): следующая страница операций старше него
+        """
         try:
             with db_connection.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    SELECT id, user_id, type, amount, category, description, date
+                keyset = 'AND (date, id) < (?, ?)' if before is not None else ''
+                cursor.execute(f'''
+                    SELECT id, user_id, type, amount, category, description, date, gold_amount
                     FROM transactions 
-                    WHERE user_id = ? 
+                    WHERE user_id = ? {keyset}
                     ORDER BY date DESC, id DESC 
                     LIMIT ?
-                ''', (user_id, limit))
+                ''', (user_id, *(before or ()), limit))
                 
                 transactions = []
                 for row in cursor.fetchall():
-                    transactions.append(Transaction(*row))
+                    transactions.append(self._row_to_transaction(row))
                 
                 return transactions
                 
@@ -42,7 +51,7 @@ class TransactionEditor:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
-                    SELECT id, user_id, type, amount, category, description, date
+                    SELECT id, user_id, type, amount, category, description, date, gold_amount
                     FROM transactions 
                     WHERE id = ? AND user_id = ?
                 ''', (transaction_id, user_id))
@@ -50,13 +59,14 @@ class TransactionEditor:
                 result = cursor.fetchone()
                 
                 if result:
-                    return Transaction(*result)
+                    return self._row_to_transaction(result)
                 return None
                 
         except Exception as e:
             logger.error(f"Error getting transaction by ID: {e}")
             return None
     
+    @write_operation
     def edit_transaction(self, user_id: int, transaction_id: int, 
                         new_amount: float = None, new_category: str = None,
                         new_description: str = None) -> Dict:
@@ -73,21 +83,28 @@ class TransactionEditor:
             new_category = new_category if new_category is not None else original_transaction.category
             new_description = new_description if new_description is not None else original_transaction.description
             
-            # Если изменилась сумма, пересчитываем балансы
-            if old_amount != new_amount:
-                self._recalculate_balances(user_id, original_transaction, old_amount, new_amount)
-            
-            # Обновляем транзакцию в базе
-            with db_connection.get_connection() as conn:
+            # Пересчет балансов и обновление записи - одна транзакция
+            with db_connection.transaction() as conn:
+                gold_amount = Money.from_rubles(original_transaction.gold_amount)
+                
+                # Если изменилась сумма, пересчитываем балансы
+                if old_amount != new_amount:
+                    gold_amount = self._recalculate_balances(
+                        user_id, original_transaction,
+                        Money.from_rubles(old_amount), Money.from_rubles(new_amount)
+                    )
+                
+                # Обновляем транзакцию в базе (и сводки: старая версия уходит, новая приходит)
                 cursor = conn.cursor()
                 
+                apply_transaction(conn, transaction_id, -1)
                 cursor.execute('''
                     UPDATE transactions 
-                    SET amount = ?, category = ?, description = ?, date = CURRENT_TIMESTAMP
+                    SET amount = ?, gold_amount = ?, category = ?, description = ?, date = CURRENT_TIMESTAMP
                     WHERE id = ? AND user_id = ?
-                ''', (new_amount, new_category, new_description, transaction_id, user_id))
-                
-                conn.commit()
+                ''', (Money.from_rubles(new_amount).to_db(), gold_amount.to_db(),
+                      new_category, new_description, transaction_id, user_id))
+                apply_transaction(conn, transaction_id, 1)
             
             return {
                 'success': True,
@@ -104,25 +121,44 @@ class TransactionEditor:
             return {'success': False, 'error': 'Ошибка при редактировании транзакции'}
     
     def _recalculate_balances(self, user_id: int, transaction: Transaction, 
-                            old_amount: float, new_amount: float):
-        """Пересчитывает балансы после изменения суммы транзакции"""
+                            old_amount: Money, new_amount: Money) -> Money:
+        """
+        Пересчитывает балансы после изменения суммы транзакции.
+        Возвращает новую долю Золотого запаса транзакции.
+        """
         amount_diff = new_amount - old_amount
+        gold_amount = Money.from_rubles(transaction.gold_amount)
         
         if transaction.type == 'income':
-            # Для доходов: пересчитываем распределение
-            from services.user_settings_service import user_settings_service
-            settings = user_settings_service.get_user_settings(user_id)
-            savings_rate = settings.savings_rate if settings else 10.0
+            # Для доходов: новая сумма делится в той же пропорции,
+            # что и исходная (по сохраненной доле Золотого запаса)
+            if old_amount:
+                savings_rate = Decimal(gold_amount.kopecks) * 100 / Decimal(old_amount.kopecks)
+            else:
+                from services.user_settings_service import user_settings_service
+                settings = user_settings_service.get_user_settings(user_id)
+                savings_rate = settings.savings_rate if settings else 10.0
             
-            gold_reserve_diff = round(amount_diff * (savings_rate / 100), 2)
+            new_gold_amount = new_amount.percent(savings_rate)
+            gold_reserve_diff = new_gold_amount - gold_amount
             living_budget_diff = amount_diff - gold_reserve_diff
             
             wallet_service.update_wallet_balance(user_id, 'gold_reserve', gold_reserve_diff)
             wallet_service.update_wallet_balance(user_id, 'living_budget', living_budget_diff)
             
+            return new_gold_amount
+        
         else:  # expense
             # Для расходов: просто корректируем бюджет на жизнь
             wallet_service.update_wallet_balance(user_id, 'living_budget', -amount_diff)
+            
+            return gold_amount
+    
+    def _row_to_transaction(self, row) -> Transaction:
+        """Строка transactions (суммы в копейках) -> Transaction (суммы в рублях)"""
+        transaction_id, user_id, transaction_type, amount, category, description, date, gold_amount = row
+        return Transaction(transaction_id, user_id, transaction_type, to_rubles(amount),
+                           category, description, date, to_rubles(gold_amount))
     
     def _get_edit_success_message(self, transaction: Transaction, 
                                 new_amount: float, new_category: str) -> str:
@@ -137,6 +173,7 @@ class TransactionEditor:
                 f"• Дата: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n"
                 f"💡 Балансы автоматически пересчитаны")
     
+    @write_operation
     def delete_transaction(self, user_id: int, transaction_id: int) -> Dict:
         """Удаляет транзакцию с перерасчетом балансов"""
         try:
@@ -144,33 +181,30 @@ class TransactionEditor:
             if not transaction:
                 return {'success': False, 'error': 'Транзакция не найдена'}
             
-            # Отменяем влияние транзакции на балансы
-            if transaction.type == 'income':
-                # Для доходов: вычитаем из балансов
-                from services.user_settings_service import user_settings_service
-                settings = user_settings_service.get_user_settings(user_id)
-                savings_rate = settings.savings_rate if settings else 10.0
+            # Откат балансов и удаление записи - одна транзакция
+            with db_connection.transaction() as conn:
+                # Отменяем влияние транзакции на балансы
+                if transaction.type == 'income':
+                    # Для доходов: вычитаем ровно то распределение, что было сделано
+                    # при добавлении (а не по текущему проценту накоплений)
+                    amount = Money.from_rubles(transaction.amount)
+                    gold_reserve = Money.from_rubles(transaction.gold_amount)
+                    
+                    wallet_service.update_wallet_balance(user_id, 'gold_reserve', -gold_reserve)
+                    wallet_service.update_wallet_balance(user_id, 'living_budget', -(amount - gold_reserve))
                 
-                gold_reserve_revert = -round(transaction.amount * (savings_rate / 100), 2)
-                living_budget_revert = -(transaction.amount - abs(gold_reserve_revert))
+                else:  # expense
+                    # Для расходов: возвращаем сумму в бюджет
+                    wallet_service.update_wallet_balance(user_id, 'living_budget', transaction.amount)
                 
-                wallet_service.update_wallet_balance(user_id, 'gold_reserve', gold_reserve_revert)
-                wallet_service.update_wallet_balance(user_id, 'living_budget', living_budget_revert)
-                
-            else:  # expense
-                # Для расходов: возвращаем сумму в бюджет
-                wallet_service.update_wallet_balance(user_id, 'living_budget', transaction.amount)
-            
-            # Удаляем транзакцию
-            with db_connection.get_connection() as conn:
+                # Удаляем транзакцию (сначала вычитаем ее из сводок)
                 cursor = conn.cursor()
                 
+                apply_transaction(conn, transaction_id, -1)
                 cursor.execute('''
                     DELETE FROM transactions 
                     WHERE id = ? AND user_id = ?
                 ''', (transaction_id, user_id))
-                
-                conn.commit()
             
             return {
                 'success': True,
@@ -1,11 +1,18 @@
 # services/transaction_service.py - ИСПРАВЛЕННАЯ ВЕРСИЯ
 import logging
-from typing import Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 from database.connection import db_connection
+from database.writer import write_operation
+from database.idempotency import idempotent
+from database.rollups import apply_transaction
 from services.wallet_service import wallet_service  # ← ДОБАВЛЯЕМ ИМПОРТ
+from utils.money import Money, to_rubles
 
 logger = logging.getLogger(__name__)
 
+# Колонки истории: (type, amount, category, description, date, id)
+_HISTORY_COLUMNS = 'type, amount, category, description, date, id'
+
 class TransactionService:
     """
     Чистый вавилонский сервис транзакций.
@@ -15,22 +22,28 @@ class TransactionService:
     def __init__(self):
         pass  # Убираем self.conn, используем глобальный db_connection
     
+    @write_operation
+    @idempotent('add_income')
     def add_income(self, user_id: int, amount: float, category: str, description: str = "", 
                    use_custom_settings: bool = True) -> Dict:
         """
         Добавляет доход с ГИБКИМ распределением
         """
         try:
-            # Гибкое распределение дохода
-            distribution = wallet_service.distribute_income_flexible(
-                user_id, amount, use_custom_settings
-            )
-            
-            if not distribution['success']:
-                return distribution
-            
-            # Сохраняем запись о доходе (для истории)
-            self._save_transaction(user_id, 'income', amount, category, description)
+            # Распределение и запись в историю - одна единица работы
+            with db_connection.transaction():
+                # Гибкое распределение дохода
+                distribution = wallet_service.distribute_income_flexible(
+                    user_id, amount, use_custom_settings
+                )
+                
+                if not distribution['success']:
+                    return distribution
+                
+                # Сохраняем запись о доходе вместе с долей Золотого запаса:
+                # удаление и редактирование откатят именно ее
+                self._save_transaction(user_id, 'income', amount, category, description,
+                                       gold_amount=distribution['gold_reserve'])
             
             return {
                 'success': True,
@@ -46,30 +59,35 @@ class TransactionService:
             logger.error(f"Income error for user {user_id}: {e}")
             return {'success': False, 'error': 'Ошибка при добавлении дохода'}
     
+    @write_operation
+    @idempotent('add_expense')
     def add_expense(self, user_id: int, amount: float, category: str, description: str = "") -> Dict:
         """
         Добавляет расход ТОЛЬКО из Бюджета на жизнь (90%)
         """
         try:
-            # ВАВИЛОНСКОЕ ПРАВИЛО: расходы только из 90%
-            affordability = wallet_service.can_afford_expense(user_id, amount)
-            
-            if not affordability['can_afford']:
-                return {
-                    'success': False,
-                    'error': f"🚫 *Недостаточно средств в Бюджете на жизнь!*\n\n"
-                            f"💼 Доступно: {affordability['available']:,.0f} руб.\n"
-                            f"💸 Нужно: {affordability['needed']:,.0f} руб.\n"
-                            f"📉 Не хватает: {affordability['shortfall']:,.0f} руб."
-                }
+            # Проверка баланса, списание и запись - одна единица работы,
+            # поэтому параллельный расход не может проскочить между ними
+            with db_connection.transaction():
+                # ВАВИЛОНСКОЕ ПРАВИЛО: расходы только из 90%
+                affordability = wallet_service.can_afford_expense(user_id, amount)
+                
+                if not affordability['can_afford']:
+                    return {
+                        'success': False,
+                        'error': f"🚫 *Недостаточно средств в Бюджете на жизнь!*\n\n"
+                                f"💼 Доступно: {affordability['available']:,.0f} руб.\n"
+                                f"💸 Нужно: {affordability['needed']:,.0f} руб.\n"
+                                f"📉 Не хватает: {affordability['shortfall']:,.0f} руб."
+                    }
+                
+                # Списание ТОЛЬКО из Бюджета на жизнь
+                wallet_service.update_wallet_balance(user_id, 'living_budget', -amount)
+                
+                # Сохраняем запись о расходе
+                self._save_transaction(user_id, 'expense', amount, category, description)
             
-            # Списание ТОЛЬКО из Бюджета на жизнь
-            wallet_service.update_wallet_balance(user_id, 'living_budget', -amount)
-            
-            # Сохраняем запись о расходе
-            self._save_transaction(user_id, 'expense', amount, category, description)
-            
-            new_balance = affordability['available'] - amount
+            new_balance = (Money.from_rubles(affordability['available']) - Money.from_rubles(amount)).rubles
             
             return {
                 'success': True,
@@ -85,33 +103,100 @@ class TransactionService:
             return {'success': False, 'error': 'Ошибка при добавлении расхода'}
     
     def _save_transaction(self, user_id: int, transaction_type: str, amount: float, 
-                         category: str, description: str):
-        """Внутренний метод для сохранения транзакции в историю"""
+                         category: str, description: str, gold_amount: float = 0.0):
+        """Внутренний метод для сохранения транзакции в историю (суммы - в копейках)"""
         with db_connection.get_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
-                INSERT INTO transactions (user_id, type, amount, category, description)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, transaction_type, amount, category, description))
+                INSERT INTO transactions (user_id, type, amount, category, description, gold_amount)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (user_id, transaction_type, Money.from_rubles(amount).to_db(), category, description,
+                  Money.from_rubles(gold_amount).to_db()))
+            
+            # Сводки обновляются в той же транзакции
+            apply_transaction(conn, cursor.lastrowid)
             
             conn.commit()
     
-    def get_transaction_history(self, user_id: int, limit: int = 10) -> list:
-        """Простая история транзакций (только для отображения)"""
+    def get_transaction_history(self, user_id: int, limit: int = 10,
+                                before: Optional[Tuple[str, int]] = None) -> list:
+        """
+        Простая история транзакций (только для отображения).
+        before - курсор (date, id): вернуть операции старше него
+        """
+        return self.get_history_page(user_id, limit, before=before)['transactions']
+    
+    def get_history_page(self, user_id: int, limit: int = 10,
+                         before: Optional[Tuple[str, int]] = None,
+                         after: Optional[Tuple[str, int]] = None) -> Dict:
+        """
+        Страница истории по ключу (date, id) от новых к старым.
+        before - листать к более старым, after - к более новым.
+        Запрос идет по индексу (user_id, date) и не зависит от глубины листания, в отличие от OFFSET
+        """
         with db_connection.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT type, amount, category, description, date 
-                FROM transactions 
-                WHERE user_id = ? 
-                ORDER BY date DESC 
-                LIMIT ?
-            ''', (user_id, limit))
+            if after is not None:
+                rows = conn.execute(f'''
+                    SELECT {_HISTORY_COLUMNS} FROM transactions
+                    WHERE user_id = ? AND (date, id) > (?, ?)
+                    ORDER BY date ASC, id ASC
+                    LIMIT ?
+                ''', (user_id, *after, limit + 1)).fetchall()
+                
+                # У начала истории страница неполная - показываем первую страницу целиком
+                if len(rows) <= limit:
+                    return self.get_history_page(user_id, limit)
+                rows = rows[:limit][::-1]
+                has_newer, has_older = True, True
+            else:
+                keyset = 'AND (date, id) < (?, ?)' if before is not None else ''
+                rows = conn.execute(f'''
+                    SELECT {_HISTORY_COLUMNS} FROM transactions
+                    WHERE user_id = ? {keyset}
+                    ORDER BY date DESC, id DESC
+                    LIMIT ?
+                ''', (user_id, *(before or ()), limit + 1)).fetchall()
+                
+                has_newer, has_older = before is not None, len(rows) > limit
+                rows = rows[:limit]
+        
+        transactions = [(row[0], to_rubles(row[1])) + tuple(row[2:]) for row in rows]
+        return {
+            'transactions': transactions,
+            'has_newer': has_newer and bool(transactions),
+            'has_older': has_older,
+            # Курсоры - (date, id) первой и последней операции страницы
+            'newest': (transactions[0][4], transactions[0][5]) if transactions else None,
+            'oldest': (transactions[-1][4], transactions[-1][5]) if transactions else None,
+        }
+    
+    def iter_transactions(self, user_id: int, chunk_size: int = 1000) -> Iterator[List[tuple]]:
+        """
+        Все операции пользователя от старых к новым порциями по chunk_size.
+        Каждая порция читается отдельным запросом по ключу (date, id): в памяти
+        одна порция, соединение пула не удерживается между порциями.
+        Строки: (id, date, type, amount, category, description, gold_amount), суммы в рублях
+        """
+        cursor_key = None
+        while True:
+            with db_connection.get_connection() as conn:
+                keyset = 'AND (date, id) > (?, ?)' if cursor_key is not None else ''
+                rows = conn.execute(f'''
+                    SELECT id, date, type, amount, category, description, gold_amount
+                    FROM transactions
+                    WHERE user_id = ? {keyset}
+                    ORDER BY date ASC, id ASC
+                    LIMIT ?
+                ''', (user_id, *(cursor_key or ()), chunk_size)).fetchall()
             
-            transactions = cursor.fetchall()
-            return transactions
+            if not rows:
+                return
+            yield [(row[0], row[1], row[2], to_rubles(row[3]), row[4], row[5], to_rubles(row[6]))
+                   for row in rows]
+            if len(rows) < chunk_size:
+                return
+            cursor_key = (rows[-1][1], rows[-1][0])
 
 # Глобальный экземпляр ЧИСТОГО сервиса
 transaction_service = TransactionService()
\ No newline at end of file
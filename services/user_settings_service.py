@@ -2,6 +2,7 @@
 import logging
 from typing import Dict, Optional
 from database.connection import db_connection
+from database.writer import write_operation
 from database.models import UserSettings
 
 logger = logging.getLogger(__name__)
@@ -9,6 +10,7 @@ logger = logging.getLogger(__name__)
 class UserSettingsService:
     """Сервис для управления пользовательскими настройками"""
     
+    @write_operation
     def init_user_settings(self, user_id: int) -> bool:
         """Инициализирует настройки для нового пользователя"""
         try:
@@ -48,6 +50,7 @@ class UserSettingsService:
             logger.error(f"❌ Ошибка получения настроек для пользователя {user_id}: {e}")
             return None
     
+    @write_operation
     def update_savings_rate(self, user_id: int, savings_rate: float) -> bool:
         """Обновляет процент накоплений пользователя"""
         try:
@@ -71,6 +74,7 @@ class UserSettingsService:
             logger.error(f"❌ Ошибка обновления процента накоплений для пользователя {user_id}: {e}")
             return False
     
+    @write_operation
     def toggle_auto_savings(self, user_id: int, auto_savings: bool) -> bool:
         """Включает/выключает автоматическое распределение доходов"""
         try:
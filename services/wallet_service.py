@@ -1,36 +1,50 @@
 # services/wallet_service.py - ОБНОВЛЕННАЯ ВЕРСИЯ
 import logging
+import os
 from typing import Dict, List, Optional
 from database.connection import db_connection
+from database.writer import write_operation
 from database.models import Wallet
+from utils.cache import MISSING, TTLCache
+from utils.money import Money, to_rubles
 
 logger = logging.getLogger(__name__)
 
+# Кэш балансов: сколько пользователей держать и сколько секунд доверять записи.
+# TTL ограничивает устаревание, если базу меняет другой процесс
+WALLET_CACHE_SIZE = int(os.getenv('WALLET_CACHE_SIZE', 10000))
+WALLET_CACHE_TTL = float(os.getenv('WALLET_CACHE_TTL', 60))
+
 class WalletService:
     def __init__(self):
         self.wallet_types = ['gold_reserve', 'living_budget', 'debt_repayment']
+        # user_id -> {wallet_type: баланс в копейках}; только зафиксированные данные
+        self._balance_cache = TTLCache(max_size=WALLET_CACHE_SIZE, ttl=WALLET_CACHE_TTL)
     
+    @write_operation
     def init_user_wallets(self, user_id: int) -> bool:
         """Инициализирует три кошелька для нового пользователя"""
         try:
-            with db_connection.get_connection() as conn:
+            from .user_settings_service import user_settings_service
+            from .babylon_service import babylon_service
+            
+            # Кошельки, настройки и правила создаются одной транзакцией
+            with db_connection.transaction() as conn:
                 cursor = conn.cursor()
                 
                 for wallet_type in self.wallet_types:
                     cursor.execute('''
                         INSERT OR IGNORE INTO wallets (user_id, wallet_type, balance)
                         VALUES (?, ?, ?)
-                    ''', (user_id, wallet_type, 0.0))
+                    ''', (user_id, wallet_type, 0))
                 
-                conn.commit()
-            
-            # Инициализируем настройки пользователя
-            from .user_settings_service import user_settings_service
-            user_settings_service.init_user_settings(user_id)
-            
-            # Инициализируем правила Вавилона
-            from .babylon_service import babylon_service
-            babylon_service.init_user_rules(user_id)
+                # Инициализируем настройки пользователя
+                user_settings_service.init_user_settings(user_id)
+                
+                # Инициализируем правила Вавилона
+                babylon_service.init_user_rules(user_id)
+                
+                db_connection.on_commit(lambda: self.invalidate_cache(user_id))
             
             logger.info(f"✅ Инициализированы кошельки для пользователя {user_id}")
             return True
@@ -39,15 +53,18 @@ class WalletService:
             logger.error(f"❌ Ошибка инициализации кошельков для пользователя {user_id}: {e}")
             return False
     
+    @write_operation
     def distribute_income(self, user_id: int, amount: float) -> Dict:
         """Распределяет доход по правилу 10%/90%"""
         try:
-            gold_reserve = round(amount * 0.10, 2)
-            living_budget = round(amount * 0.90, 2)
+            gold, living = Money.from_rubles(amount).split(10)
+            gold_reserve = gold.rubles
+            living_budget = living.rubles
             
-            # Обновляем балансы кошельков
-            self.update_wallet_balance(user_id, 'gold_reserve', gold_reserve)
-            self.update_wallet_balance(user_id, 'living_budget', living_budget)
+            # Обновляем балансы кошельков одной транзакцией
+            with db_connection.transaction():
+                self.update_wallet_balance(user_id, 'gold_reserve', gold)
+                self.update_wallet_balance(user_id, 'living_budget', living)
             
             return {
                 'success': True,
@@ -64,26 +81,31 @@ class WalletService:
             logger.error(f"❌ Ошибка распределения дохода для пользователя {user_id}: {e}")
             return {'success': False, 'error': str(e)}
     
+    @write_operation
     def distribute_income_flexible(self, user_id: int, amount: float, use_custom_settings: bool = True) -> Dict:
         """Распределяет доход с учетом пользовательских настроек"""
         try:
             from .user_settings_service import user_settings_service
             
-            if use_custom_settings:
-                settings = user_settings_service.get_user_settings(user_id)
-                if settings and settings.auto_savings:
-                    savings_rate = settings.savings_rate
+            # Чтение настроек и оба пополнения - одна транзакция
+            with db_connection.transaction():
+                if use_custom_settings:
+                    settings = user_settings_service.get_user_settings(user_id)
+                    if settings and settings.auto_savings:
+                        savings_rate = settings.savings_rate
+                    else:
+                        savings_rate = 0  # Если авто-накопления выключены
                 else:
-                    savings_rate = 0  # Если авто-накопления выключены
-            else:
-                savings_rate = 10.0  # Стандартное правило 10%
-            
-            gold_reserve = round(amount * (savings_rate / 100), 2)
-            living_budget = round(amount - gold_reserve, 2)
-            
-            # Обновляем балансы кошельков
-            self.update_wallet_balance(user_id, 'gold_reserve', gold_reserve)
-            self.update_wallet_balance(user_id, 'living_budget', living_budget)
+                    savings_rate = 10.0  # Стандартное правило 10%
+                
+                # Деление в копейках: части в сумме точно равны доходу
+                gold, living = Money.from_rubles(amount).split(savings_rate)
+                gold_reserve = gold.rubles
+                living_budget = living.rubles
+                
+                # Обновляем балансы кошельков
+                self.update_wallet_balance(user_id, 'gold_reserve', gold)
+                self.update_wallet_balance(user_id, 'living_budget', living)
             
             return {
                 'success': True,
@@ -98,9 +120,12 @@ class WalletService:
             logger.error(f"❌ Ошибка гибкого распределения для пользователя {user_id}: {e}")
             return {'success': False, 'error': str(e)}
     
-    def update_wallet_balance(self, user_id: int, wallet_type: str, amount: float) -> bool:
-        """Обновляет баланс кошелька"""
+    @write_operation
+    def update_wallet_balance(self, user_id: int, wallet_type: str, amount) -> bool:
+        """Обновляет баланс кошелька (amount - рубли или Money)"""
         try:
+            delta = Money.from_rubles(amount).to_db()
+            
             with db_connection.get_connection() as conn:
                 cursor = conn.cursor()
                 
@@ -108,11 +133,17 @@ class WalletService:
                     UPDATE wallets 
                     SET balance = balance + ?, created_at = CURRENT_TIMESTAMP
                     WHERE user_id = ? AND wallet_type = ?
-                ''', (amount, user_id, wallet_type))
+                ''', (delta, user_id, wallet_type))
                 
                 conn.commit()
-                return cursor.rowcount > 0
-                
+                updated = cursor.rowcount > 0
+            
+            # Сброс, а не сквозная запись: читатель, успевший положить уже
+            # зафиксированный баланс до хука, получил бы изменение дважды
+            if updated:
+                db_connection.on_commit(lambda: self._balance_cache.invalidate(user_id))
+            return updated
+        
         except Exception as e:
             logger.error(f"❌ Ошибка обновления баланса кошелька: {e}")
             return False
@@ -120,16 +151,7 @@ class WalletService:
     def get_wallet_balance(self, user_id: int, wallet_type: str) -> float:
         """Возвращает баланс конкретного кошелька"""
         try:
-            with db_connection.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT balance FROM wallets 
-                    WHERE user_id = ? AND wallet_type = ?
-                ''', (user_id, wallet_type))
-                
-                result = cursor.fetchone()
-                return result[0] if result else 0.0
+            return to_rubles(self._get_balances(user_id).get(wallet_type, 0))
                 
         except Exception as e:
             logger.error(f"❌ Ошибка получения баланса кошелька: {e}")
@@ -138,27 +160,63 @@ class WalletService:
     def get_all_wallets(self, user_id: int) -> Dict[str, float]:
         """Возвращает балансы всех кошельков пользователя"""
         try:
-            with db_connection.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT wallet_type, balance FROM wallets 
-                    WHERE user_id = ?
-                ''', (user_id,))
-                
-                wallets = {row[0]: row[1] for row in cursor.fetchall()}
-                
-                # Гарантируем, что все типы кошельков присутствуют
-                for wallet_type in self.wallet_types:
-                    if wallet_type not in wallets:
-                        wallets[wallet_type] = 0.0
-                
-                return wallets
+            balances = self._get_balances(user_id)
+            
+            # Гарантируем, что все типы кошельков присутствуют
+            wallets = {wallet_type: to_rubles(balance) for wallet_type, balance in balances.items()}
+            for wallet_type in self.wallet_types:
+                if wallet_type not in wallets:
+                    wallets[wallet_type] = 0.0
+            
+            return wallets
                 
         except Exception as e:
             logger.error(f"❌ Ошибка получения всех кошельков: {e}")
             return {wallet_type: 0.0 for wallet_type in self.wallet_types}
     
+    def _get_balances(self, user_id: int) -> Dict[str, int]:
+        """
+        Балансы пользователя в копейках: из кэша или одним запросом.
+        Внутри единицы работы читаем базу напрямую - там видны
+        незафиксированные изменения, которые нельзя ни брать из кэша, ни класть в него.
+        """
+        in_unit_of_work = db_connection.in_unit_of_work()
+        if not in_unit_of_work:
+            cached = self._balance_cache.get(user_id)
+            if cached is not MISSING:
+                return cached
+            version = self._balance_cache.version(user_id)
+        
+        with db_connection.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT wallet_type, balance FROM wallets 
+                WHERE user_id = ?
+            ''', (user_id,))
+            
+            balances = {row[0]: row[1] or 0 for row in cursor.fetchall()}
+        
+        # Запись между чтением версии и запросом сделает результат устаревшим -
+        # тогда put его отбросит
+        if not in_unit_of_work:
+            self._balance_cache.put(user_id, balances, version=version)
+        return balances
+    
+    def invalidate_cache(self, user_id: Optional[int] = None):
+        """
+        Сбрасывает кэш балансов пользователя или (без аргумента) всех.
+        Нужен, когда кошельки меняет другой процесс или ручная правка базы.
+        """
+        if user_id is None:
+            self._balance_cache.invalidate()
+        else:
+            self._balance_cache.invalidate(user_id)
+    
+    def get_cache_stats(self) -> dict:
+        """Возвращает метрики кэша балансов"""
+        return self._balance_cache.get_stats()
+    
     def get_wallet_display_name(self, wallet_type: str) -> str:
         """Возвращает читаемое название кошелька"""
         names = {
@@ -170,13 +228,14 @@ class WalletService:
     
     def can_afford_expense(self, user_id: int, amount: float) -> Dict:
         """Проверяет, достаточно ли средств в бюджете на жизнь для расхода"""
-        living_budget = self.get_wallet_balance(user_id, 'living_budget')
+        living_budget = Money.from_rubles(self.get_wallet_balance(user_id, 'living_budget'))
+        needed = Money.from_rubles(amount)
         
         return {
-            'can_afford': living_budget >= amount,
-            'available': living_budget,
-            'needed': amount,
-            'shortfall': max(0, amount - living_budget)
+            'can_afford': living_budget >= needed,
+            'available': living_budget.rubles,
+            'needed': needed.rubles,
+            'shortfall': max(Money(), needed - living_budget).rubles
         }
     
     def _get_distribution_message(self, amount: float, gold_reserve: float, 
@@ -1,8 +1,12 @@
 # test_database.py
+import importlib
+import os
 import sqlite3
 import threading
 import time
 
+import pytest
+
 def test_database_locking():
     """Тестирует работу с базой данных из нескольких потоков"""
     print("🧪 Тестирование работы с базой данных...")
@@ -10,7 +14,8 @@ def test_database_locking():
     def worker(thread_id):
         """Рабочая функция для тестирования"""
         try:
-            conn = sqlite3.connect('finance.db', timeout=30.0)
+            # Под pytest DB_PATH указывает во временный каталог (conftest.py)
+            conn = sqlite3.connect(os.getenv('DB_PATH', 'finance.db'), timeout=30.0)
             cursor = conn.cursor()
             
             # Тестируем разные операции
@@ -41,5 +46,1058 @@ def test_database_locking():
     
     print("🎉 Тестирование завершено!")
 
+def test_connection_pool_reuse(tmp_path):
+    """Пул переиспользует соединения и не превышает лимит"""
+    from database.connection import DatabaseConnection
+    
+    db = DatabaseConnection(str(tmp_path / 'pool.db'), pool_size=2)
+    
+    for _ in range(10):
+        with db.get_connection() as conn:
+            conn.execute("SELECT COUNT(*) FROM transactions").fetchone()
+    
+    # Вложенный вызов в том же потоке получает то же соединение
+    with db.get_connection() as outer:
+        with db.get_connection() as inner:
+            assert inner is outer
+    
+    def worker():
+        for _ in range(20):
+            with db.get_connection() as conn:
+                conn.execute("INSERT INTO user_settings (savings_rate) VALUES (10.0)")
+                conn.commit()
+    
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    stats = db.get_pool_stats()
+    assert stats['created'] <= 2
+    assert stats['in_use'] == 0
+    assert stats['acquired'] >= 111
+    
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM user_settings").fetchone()[0] == 100
+    
+    db.close_all()
+    assert db.get_pool_stats()['size'] == 0
+
+def test_unit_of_work_single_commit(tmp_path):
+    """Единица работы фиксирует вложенные операции одним commit и откатывает их целиком"""
+    from database.connection import DatabaseConnection
+    
+    db = DatabaseConnection(str(tmp_path / 'uow.db'))
+    
+    def insert(user_id):
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO user_settings (user_id) VALUES (?)", (user_id,))
+            conn.commit()  # внутри единицы работы фиксация откладывается
+    
+    with db.transaction() as conn:
+        insert(1)
+        insert(2)
+        assert conn.in_transaction
+    
+    # Ошибка во вложенной операции откатывает всю единицу работы
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction():
+            insert(3)
+            insert(1)
+    
+    # Вложенная transaction() откатывается до своей точки сохранения
+    with db.transaction():
+        insert(4)
+        with pytest.raises(sqlite3.IntegrityError):
+            with db.transaction():
+                insert(5)
+                insert(4)
+    
+    with db.get_connection() as conn:
+        users = [row[0] for row in conn.execute("SELECT user_id FROM user_settings ORDER BY user_id")]
+    
+    assert users == [1, 2, 4]
+    assert db.get_pool_stats()['in_use'] == 0
+
+def test_migrations_and_hot_query_plans(tmp_path):
+    """Миграции идемпотентны, а горячие запросы не сканируют таблицы целиком"""
+    from database.connection import DatabaseConnection
+    from database.migrations import get_latest_version, get_schema_version, run_migrations
+    from database.query_plans import find_full_scans
+    
+    db = DatabaseConnection(str(tmp_path / 'plans.db'))
+    
+    with db.get_connection() as conn:
+        assert get_schema_version(conn) == get_latest_version()
+        assert run_migrations(conn) == get_latest_version()
+        assert find_full_scans(conn) == []
+    
+    db.close_all()
+
+def test_writer_group_commit(tmp_path):
+    """Поток-писатель объединяет операции в пачки и изолирует ошибки точками сохранения"""
+    from database.connection import DatabaseConnection
+    from database.writer import DatabaseWriter
+    
+    db = DatabaseConnection(str(tmp_path / 'writer.db'))
+    writer = DatabaseWriter(db)
+    
+    def insert(user_id):
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO user_settings (user_id) VALUES (?)", (user_id,))
+            conn.commit()
+        return user_id
+    
+    futures = [writer.submit(insert, user_id) for user_id in range(200)]
+    duplicate = writer.submit(insert, 0)
+    
+    assert [f.result(timeout=10) for f in futures] == list(range(200))
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=10)
+    
+    # Вложенная запись из потока-писателя выполняется сразу
+    assert writer.submit(lambda: writer.execute(insert, 500)).result(timeout=10) == 500
+    writer.stop()
+    
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM user_settings").fetchone()[0] == 201
+    
+    stats = writer.get_stats()
+    assert stats['completed'] == 201 and stats['failed'] == 1
+    assert stats['batches'] < 202
+    assert stats['queue_depth'] == 0
+    db.close_all()
+
+def test_money_kopecks(tmp_path):
+    """Деление сумм без потерянных копеек и перевод старых REAL-колонок в копейки"""
+    from utils.money import Money
+    from database.connection import DatabaseConnection
+    
+    for rubles, rate in [(1000.33, 10), (0.01, 50), (333.37, 17.5), (-99.99, 10)]:
+        gold, living = Money.from_rubles(rubles).split(rate)
+        assert gold + living == Money.from_rubles(rubles)
+    
+    path = str(tmp_path / 'legacy.db')
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE wallets (id INTEGER PRIMARY KEY, user_id INTEGER, wallet_type TEXT,
+                              balance REAL DEFAULT 0.0, UNIQUE(user_id, wallet_type));
+        CREATE TABLE transactions (id INTEGER PRIMARY KEY, user_id INTEGER, type TEXT, amount REAL,
+                                   category TEXT, description TEXT, date TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        INSERT INTO wallets (user_id, wallet_type, balance) VALUES (1, 'living_budget', 90.9);
+        INSERT INTO transactions (user_id, type, amount) VALUES (1, 'income', 101.01);
+    """)
+    legacy.close()
+    
+    db = DatabaseConnection(path)
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT balance FROM wallets").fetchone()[0] == 9090
+        assert conn.execute("SELECT amount, gold_amount FROM transactions").fetchone() == (10101, 0)
+        assert conn.execute("SELECT typeof(balance) FROM wallets").fetchone()[0] == 'integer'
+    db.close_all()
+
+def test_rollups_follow_transactions(tmp_path):
+    """Инкрементальные сводки совпадают с полной перестройкой после вставки, правки и удаления"""
+    from database.connection import DatabaseConnection
+    from database.rollups import apply_transaction, rebuild_rollups
+    
+    db = DatabaseConnection(str(tmp_path / 'rollups.db'))
+    
+    def snapshot(conn):
+        return (conn.execute("SELECT * FROM rollup_daily ORDER BY 1, 2, 3, 4").fetchall(),
+                conn.execute("SELECT * FROM rollup_monthly ORDER BY 1, 2, 3, 4").fetchall())
+    
+    with db.transaction() as conn:
+        ids = []
+        for amount, category, date in [(100, 'Еда', '2024-01-05'), (250, 'Еда', '2024-01-05'),
+                                       (70, 'Такси', '2024-02-01'), (900, 'Еда', '2024-02-10')]:
+            cursor = conn.execute(
+                "INSERT INTO transactions (user_id, type, amount, category, date) VALUES (1, 'expense', ?, ?, ?)",
+                (amount, category, date)
+            )
+            apply_transaction(conn, cursor.lastrowid)
+            ids.append(cursor.lastrowid)
+        
+        apply_transaction(conn, ids[0], -1)
+        conn.execute("UPDATE transactions SET amount = 40, category = 'Кафе' WHERE id = ?", (ids[0],))
+        apply_transaction(conn, ids[0])
+        
+        apply_transaction(conn, ids[2], -1)
+        conn.execute("DELETE FROM transactions WHERE id = ?", (ids[2],))
+        
+        incremental = snapshot(conn)
+        rebuild_rollups(conn)
+        assert snapshot(conn) == incremental
+    
+    assert ('2024-02', 'Такси') not in [(row[2], row[3]) for row in incremental[1]]
+    db.close_all()
+
+def test_balance_cache_and_commit_hooks(tmp_path):
+    """Кэш: LRU, TTL, отброс устаревшего заполнения; хуки фиксации не срабатывают при откате"""
+    from database.connection import DatabaseConnection
+    from utils.cache import MISSING, TTLCache
+    
+    now = [0.0]
+    cache = TTLCache(max_size=2, ttl=10, clock=lambda: now[0])
+    cache.put(1, {'living_budget': 100})
+    cache.put(2, {'living_budget': 200})
+    assert cache.get(1) == {'living_budget': 100}
+    cache.put(3, {'living_budget': 300})
+    assert cache.get(2) is MISSING  # вытеснен давно не использованный
+    
+    version = cache.version(1)
+    cache.update(1, lambda balances: {'living_budget': balances['living_budget'] + 5})
+    assert cache.get(1) == {'living_budget': 105}
+    assert not cache.put(1, {'living_budget': 100}, version=version)  # чтение до записи
+    
+    now[0] = 11
+    assert cache.get(1) is MISSING
+    stats = cache.get_stats()
+    assert stats['evictions'] == 1 and stats['expirations'] == 1 and stats['hits'] == 2
+    
+    # Версии не копятся: удаляются вместе с записями, но заполнение,
+    # начатое до изменения и удаления ключа, все равно отбрасывается
+    version = cache.version(7)
+    for key in range(100):
+        cache.invalidate(key)
+    assert len(cache._versions) <= 2 * cache.max_size
+    assert not cache.put(7, 'stale', version=version)
+    version = cache.version(8)
+    assert cache.put(8, 'fresh', version=version)
+    cache.update(8, lambda value: value + '!')
+    version = cache.version(8)
+    cache.put(9, 'a')
+    cache.put(10, 'b')
+    assert cache.get(8) is MISSING and 8 not in cache._versions
+    assert cache.put(8, 'fresh!', version=version)
+    
+    db = DatabaseConnection(str(tmp_path / 'hooks.db'))
+    fired = []
+    
+    with db.transaction():
+        db.on_commit(lambda: fired.append('outer'))
+        try:
+            with db.transaction():
+                db.on_commit(lambda: fired.append('rolled_back'))
+                raise ValueError("откат точки сохранения")
+        except ValueError:
+            pass
+        with db.transaction():
+            db.on_commit(lambda: fired.append('nested'))
+        assert fired == []
+    assert fired == ['outer', 'nested']
+    
+    try:
+        with db.transaction():
+            db.on_commit(lambda: fired.append('failed'))
+            raise ValueError("откат транзакции")
+    except ValueError:
+        pass
+    assert 'failed' not in fired
+    db.close_all()
+
+def test_user_snapshot_single_query(tmp_path):
+    """Сводка пользователя одним запросом совпадает с отдельными выборками"""
+    from database.connection import DatabaseConnection
+    from database.rollups import apply_transaction
+    from services.financial_analytics import financial_analytics
+    
+    db = DatabaseConnection(str(tmp_path / 'snapshot.db'))
+    
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO wallets (user_id, wallet_type, balance) VALUES (?, ?, ?)",
+                         [(1, 'gold_reserve', 10000), (1, 'living_budget', 55050), (2, 'gold_reserve', 999)])
+        conn.execute("INSERT INTO user_settings (user_id, savings_rate, auto_savings) VALUES (1, 15, 0)")
+        conn.executemany("INSERT INTO debts (user_id, creditor, initial_amount, current_amount, status) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         [(1, 'Банк', 50000, 20000, 'active'), (1, 'Друг', 1000, 0, 'paid')])
+        for user_id, kind, amount, date in [(1, 'income', 100000, "date('now')"),
+                                            (1, 'expense', 2550, "date('now', '-3 days')"),
+                                            (1, 'expense', 7000, "date('now', '-60 days')"),
+                                            (2, 'expense', 500, "date('now')")]:
+            cursor = conn.execute(
+                f"INSERT INTO transactions (user_id, type, amount, category, date) VALUES (?, ?, ?, 'x', {date})",
+                (user_id, kind, amount)
+            )
+            apply_transaction(conn, cursor.lastrowid)
+        
+        snapshot = financial_analytics.query_snapshot(conn.cursor(), 1)
+        empty = financial_analytics.query_snapshot(conn.cursor(), 3)
+    
+    assert snapshot['wallets'] == {'gold_reserve': 100.0, 'living_budget': 550.5, 'debt_repayment': 0.0}
+    assert (snapshot['income'], snapshot['expenses'], snapshot['expense_count']) == (1000.0, 25.5, 1)
+    assert snapshot['debts'] == {'count': 1, 'current_amount': 200.0, 'initial_amount': 500.0}
+    assert snapshot['settings'] == {'savings_rate': 15.0, 'auto_savings': False}
+    
+    assert empty['income'] == 0 and empty['debts']['count'] == 0 and empty['settings']['savings_rate'] == 10.0
+    
+    overview = financial_analytics.build_overview({'success': True, **snapshot})
+    assert overview['net_flow'] == 974.5 and overview['total_balance'] == 650.5
+    db.close_all()
+
+def test_budget_progress_single_query(tmp_path, monkeypatch):
+    """Прогресс бюджетов - один запрос независимо от числа бюджетов"""
+    from database.connection import DatabaseConnection
+    from database.rollups import rebuild_rollups
+    
+    # services/__init__ экспортирует экземпляр под именем модуля
+    budget_module = importlib.import_module('services.budget_planner')
+    
+    db = DatabaseConnection(str(tmp_path / 'budgets.db'))
+    monkeypatch.setattr(budget_module, 'db_connection', db)
+    
+    with db.transaction() as conn:
+        for user_id, categories in [(1, ['Еда']), (2, [f'Категория {i}' for i in range(20)])]:
+            for category in categories:
+                conn.execute("INSERT INTO budgets (user_id, category, amount, period) VALUES (?, ?, 10000, 'monthly')",
+                             (user_id, category))
+        conn.execute("INSERT INTO transactions (user_id, type, amount, category, date) "
+                     "VALUES (1, 'expense', 2500, 'Еда', datetime('now', 'start of month'))")
+        conn.execute("INSERT INTO transactions (user_id, type, amount, category, date) "
+                     "VALUES (1, 'expense', 9999, 'Еда', datetime('now', 'start of month', '-1 month'))")
+        rebuild_rollups(conn)
+    
+    statements = []
+    with db.get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        small = budget_module.budget_planner.get_budget_progress(1)
+        calls_small = len(statements)
+        large = budget_module.budget_planner.get_budget_progress(2)
+        conn.set_trace_callback(None)
+    
+    assert calls_small == 1 and len(statements) == 2
+    assert small['budgets'][0]['spent'] == 25.0 and small['budgets'][0]['percentage'] == 25.0
+    assert len(large['budgets']) == 20 and large['total_spent'] == 0
+    db.close_all()
+
+def test_benchmark_data_generator(tmp_path):
+    """Генератор бенчмарков детерминирован по seed и дает согласованные сводки и балансы"""
+    from benchmarks.data_generator import clear_dataset, generate_dataset
+    from benchmarks.stats import latency_summary
+    from database.connection import DatabaseConnection
+    from database.rollups import rebuild_rollups
+    
+    db = DatabaseConnection(str(tmp_path / 'bench.db'))
+    
+    def dump(conn):
+        return conn.execute("SELECT user_id, type, amount, category FROM transactions ORDER BY id").fetchall()
+    
+    with db.transaction() as conn:
+        counts = generate_dataset(conn, users=10, transactions=2000, seed=7, chunk_size=300)
+        first = dump(conn)
+        
+        rollups = conn.execute("SELECT * FROM rollup_monthly ORDER BY 1, 2, 3, 4").fetchall()
+        rebuild_rollups(conn)
+        assert conn.execute("SELECT * FROM rollup_monthly ORDER BY 1, 2, 3, 4").fetchall() == rollups
+        
+        total = conn.execute(
+            "SELECT SUM(CASE WHEN type = 'income' THEN amount ELSE -amount END) FROM transactions"
+        ).fetchone()[0]
+        assert conn.execute("SELECT SUM(balance) FROM wallets").fetchone()[0] == total
+        
+        clear_dataset(conn)
+        generate_dataset(conn, users=10, transactions=2000, seed=7, chunk_size=300)
+        assert dump(conn) == first
+    
+    assert counts['transactions'] == len(first) == 2000
+    assert len({row[0] for row in first}) > 1 and {row[1] for row in first} == {'income', 'expense'}
+    
+    summary = latency_summary([float(value) for value in range(1, 101)], elapsed_s=2.0)
+    assert summary['p50_ms'] == 50.5 and summary['p99_ms'] == 99.01 and summary['throughput_per_s'] == 50.0
+    db.close_all()
+
+def test_telegram_load_harness():
+    """Нагрузочный стенд прогоняет сценарии через настоящие обработчики без ошибок"""
+    import asyncio
+    from benchmarks.telegram_load import run_load
+    
+    report = asyncio.run(run_load(users=4, flows_per_user=3, rate=0, api_latency=0.0, seed=1))
+    
+    assert report['errors'] == 0, report['error_samples']
+    assert report['update_latency']['count'] == report['updates']
+    assert report['bot_api_calls']['sendMessage'] >= report['updates']
+    assert 'conversations.save_transaction' in report['handlers']
+
+def test_metrics_registry_and_endpoint():
+    """Обработчики и сервисы пишут метрики, эндпоинт отдает формат Prometheus"""
+    import asyncio
+    import urllib.request
+    from benchmarks.telegram_load import run_load
+    from utils.metrics import MetricsRegistry, metrics, start_metrics_server
+    
+    registry = MetricsRegistry(buckets=(0.01, 0.1, 1.0))
+    for seconds in (0.005, 0.05, 0.05, 0.5):
+        registry.observe_call('service', (('service', 'demo'), ('method', 'run')), seconds, failed=False)
+    registry.observe_call('service', (('service', 'demo'), ('method', 'run')), 2.0, failed=True)
+    registry.register_collector(lambda: [('demo_queue_depth', {}, 3)])
+    
+    calls = registry.get_calls('service')['demo.run']
+    assert calls['calls'] == 5 and calls['errors'] == 1
+    assert 10 <= calls['p50_ms'] <= 100
+    
+    server = start_metrics_server(0, registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert '# TYPE service_latency_seconds histogram' in body
+    assert 'service_latency_seconds_bucket{service="demo",method="run",le="0.1"} 3' in body
+    assert 'service_latency_seconds_bucket{service="demo",method="run",le="+Inf"} 5' in body
+    assert 'service_errors_total{service="demo",method="run"} 1' in body
+    assert 'demo_queue_depth 3' in body
+    
+    # Глобальный реестр: обработчики из setup_bot() и публичные методы сервисов
+    metrics.reset()
+    report = asyncio.run(run_load(users=2, flows_per_user=1, rate=0, api_latency=0.0, seed=3))
+    assert report['errors'] == 0, report['error_samples']
+    
+    handlers = metrics.get_calls('bot_handler')
+    assert handlers['handlers.start']['calls'] == 2
+    assert handlers['conversations.save_transaction']['calls'] >= 2
+    assert metrics.get_calls('service')['transaction_service.add_income']['calls'] >= 2
+    
+    rendered = metrics.render()
+    assert 'bot_active_conversations{conversation="conversations.handle_transaction_start"} 0' in rendered
+    assert 'db_writer_queue_depth' in rendered
+
+def test_query_profiler_slow_log(tmp_path, caplog):
+    """Профилировщик группирует запросы по нормализованному тексту и пишет план медленных"""
+    from database.connection import DatabaseConnection
+    from database.profiler import QueryProfiler, normalize_sql
+    
+    assert normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x''y'\n  LIMIT 10") == \
+        "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?"
+    
+    profiler = QueryProfiler(slow_ms=float('inf'), enabled=True)
+    db = DatabaseConnection(str(tmp_path / 'profile.db'), profiler=profiler)
+    
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO budgets (user_id, category, amount, period) VALUES (?, ?, ?, 'monthly')",
+                         [(user_id, 'Еда', 1000) for user_id in range(50)])
+        for user_id in range(20):
+            conn.execute("SELECT category, amount FROM budgets WHERE user_id = ?", (user_id,)).fetchall()
+        conn.cursor().execute("SELECT COUNT(*) FROM budgets WHERE user_id = 7").fetchone()
+    
+    top = {row['statement']: row for row in profiler.get_top(50)}
+    assert top["SELECT category, amount FROM budgets WHERE user_id = ?"]['count'] == 20
+    assert top["SELECT COUNT(*) FROM budgets WHERE user_id = ?"]['count'] == 1
+    assert profiler.get_top(1, order_by='count')[0]['count'] == 20
+    
+    # Порог 0: каждый запрос медленный и попадает в журнал вместе с планом
+    profiler.slow_ms = 0
+    with caplog.at_level('WARNING', logger='database.profiler'):
+        with db.get_connection() as conn:
+            conn.execute("SELECT SUM(amount) FROM budgets WHERE user_id = ? GROUP BY category", (3,)).fetchall()
+    assert any('Медленный запрос' in r.message and 'SEARCH budgets' in r.message for r in caplog.records)
+    
+    profiler.disable()
+    profiler.reset()
+    with db.get_connection() as conn:
+        conn.execute("SELECT 1").fetchone()
+    assert profiler.get_top() == []
+    db.close_all()
+
+def test_keyset_history_and_streaming_export(tmp_path, monkeypatch):
+    """История листается по ключу (date, id) без пропусков, выгрузка идет порциями"""
+    import io
+    import json
+    from database.connection import DatabaseConnection
+    
+    db = DatabaseConnection(str(tmp_path / 'history.db'))
+    transaction_module = importlib.import_module('services.transaction_service')
+    monkeypatch.setattr(transaction_module, 'db_connection', db)
+    from services.export_service import export_service
+    from services.transaction_service import transaction_service
+    
+    # Одинаковые даты у соседних операций: порядок решает id
+    with db.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO transactions (user_id, type, amount, category, description, date) VALUES (?, ?, ?, ?, ?, ?)",
+            [(1, 'expense', 100 * n, 'Еда', f'покупка {n}', f'2025-01-{n // 3 + 1:02d} 12:00:00') for n in range(23)]
+        )
+        conn.execute("INSERT INTO transactions (user_id, type, amount, category, date) VALUES (2, 'income', 5, 'x', '2025-01-05')")
+    
+    seen = []
+    page = transaction_service.get_history_page(1, limit=5)
+    assert not page['has_newer']
+    while True:
+        seen.extend(trans[5] for trans in page['transactions'])
+        if not page['has_older']:
+            break
+        page = transaction_service.get_history_page(1, limit=5, before=page['oldest'])
+    assert seen == sorted(seen, reverse=True) and len(seen) == 23
+    
+    # Назад к новым: последняя страница -> предыдущая, у начала - первая страница целиком
+    newer = transaction_service.get_history_page(1, limit=5, after=page['newest'])
+    assert [trans[5] for trans in newer['transactions']] == seen[15:20]
+    second = transaction_service.get_history_page(1, limit=5, before=transaction_service.get_history_page(1, limit=5)['oldest'])
+    first = transaction_service.get_history_page(1, limit=5, after=second['newest'])
+    assert [trans[5] for trans in first['transactions']] == seen[:5] and not first['has_newer']
+    assert transaction_service.get_transaction_history(1, limit=3, before=page['oldest']) == []
+    
+    chunks = list(transaction_service.iter_transactions(1, chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [10, 10, 3]
+    
+    csv_file = io.BytesIO()
+    result = export_service.write_export(1, 'csv', csv_file, chunk_size=7)
+    assert result['success'] and result['rows'] == 23 and result['bytes'] == len(csv_file.getvalue())
+    lines = csv_file.getvalue().decode('utf-8-sig').splitlines()
+    assert lines[0] == 'id;date;type;amount;category;description;gold_amount' and len(lines) == 24
+    assert lines[1].endswith(';expense;0.0;Еда;покупка 0;0.0')
+    
+    json_file = io.BytesIO()
+    assert export_service.write_export(1, 'json', json_file, chunk_size=4)['rows'] == 23
+    exported = json.loads(json_file.getvalue())
+    assert [row['id'] for row in exported] == sorted(seen) and exported[-1]['amount'] == 22.0
+    
+    empty = io.BytesIO()
+    assert export_service.write_export(3, 'json', empty)['rows'] == 0 and json.loads(empty.getvalue()) == []
+    assert not export_service.write_export(1, 'xml', io.BytesIO())['success']
+    db.close_all()
+
+def test_bulk_import_csv_and_ofx(tmp_path, isolated_db):
+    """Импорт выписки пачками: строки, сводки и балансы совпадают с пооперационным учетом"""
+    from database.rollups import ROLLUP_PERIODS
+    from services.import_service import import_service
+    from services.wallet_service import wallet_service
+    
+    user_id = 910001
+    rows = ['Дата;Сумма;Категория;Описание']
+    rows += [f'{day:02d}.01.2024;-{day * 100},50;;продукты у дома' for day in range(1, 29)]
+    rows += ['31.01.2024 18:00;"150 000,00";Премия;зарплата за январь', 'вчера;100;;', '01.02.2024;abc;;', '']
+    path = tmp_path / 'statement.csv'
+    path.write_bytes('\n'.join(rows).encode('cp1251'))
+    
+    progress = []
+    result = import_service.import_file(user_id, str(path), 'csv', progress=progress.append, batch_size=10)
+    assert result['success'], result
+    assert result['imported'] == 29 and result['skipped'] == 2
+    assert progress == [10, 20, 29]
+    assert result['date_from'] == '2024-01-01 00:00:00' and result['date_to'] == '2024-01-31 18:00:00'
+    assert result['expenses'] == sum(day * 100 + 0.5 for day in range(1, 29))
+    assert result['gold_reserve'] == 15000.0  # 10% по настройкам по умолчанию
+    
+    with isolated_db.get_connection() as conn:
+        categories = dict(conn.execute(
+            "SELECT type, GROUP_CONCAT(DISTINCT category) FROM transactions WHERE user_id = ? GROUP BY type", (user_id,)
+        ).fetchall())
+        # Пустая категория подобрана по описанию, категория из файла сохранена
+        assert categories == {'expense': 'Еда', 'income': 'Премия'}
+        for table, (period, period_expr) in ROLLUP_PERIODS.items():
+            expected = conn.execute(f"""
+                SELECT type, {period_expr}, category, SUM(amount), COUNT(*) FROM transactions
+                WHERE user_id = ? GROUP BY type, {period_expr}, category ORDER BY 1, 2, 3
+            """, (user_id,)).fetchall()
+            actual = conn.execute(f"""
+                SELECT type, {period}, category, total, count FROM {table} WHERE user_id = ? ORDER BY 1, 2, 3
+            """, (user_id,)).fetchall()
+            assert actual == expected
+    
+    wallets = wallet_service.get_all_wallets(user_id)
+    assert wallets['gold_reserve'] == 15000.0
+    assert wallets['living_budget'] == round(135000.0 - result['expenses'], 2)
+    
+    ofx = tmp_path / 'statement.ofx'
+    ofx.write_text("""OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240205120000.000[+3:MSK]<TRNAMT>-450.00<NAME>Такси до работы</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT</TRNTYPE>
+<DTPOSTED>20240210</DTPOSTED>
+<TRNAMT>5000</TRNAMT>
+<NAME>Фриланс проект</NAME>
+<MEMO>оплата по договору</MEMO>
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+""", encoding='utf-8')
+    result = import_service.import_file(user_id, str(ofx), 'ofx')
+    assert result['success'] and result['imported'] == 2 and result['skipped'] == 0
+    with isolated_db.get_connection() as conn:
+        assert conn.execute(
+            "SELECT type, amount, category, description, date FROM transactions WHERE user_id = ? AND date >= '2024-02-01' ORDER BY date",
+            (user_id,)
+        ).fetchall() == [
+            ('expense', 45000, 'Транспорт', 'Такси до работы', '2024-02-05 12:00:00'),
+            ('income', 500000, 'Фриланс', 'оплата по договору', '2024-02-10 00:00:00'),
+        ]
+    
+    bad = tmp_path / 'bad.csv'
+    bad.write_text('a,b\n1,2\n', encoding='utf-8')
+    assert not import_service.import_file(user_id, str(bad), 'csv')['success']
+    
+    # Каждая пачка - своя операция писателя: ошибка во второй пачке не отменяет первую
+    rows = [('2024-03-01 00:00:00', 'expense', 100, 'Еда', ''), ('2024-03-02 00:00:00', 'expense', 200, 'Еда', ''),
+            ('2024-03-03 00:00:00', 'expense', None, 'Еда', '')]
+    partial = import_service.import_rows(user_id, rows, batch_size=2)
+    assert not partial['success'] and partial['imported'] == 2
+    with isolated_db.get_connection() as conn:
+        assert conn.execute(
+            "SELECT COUNT(*) FROM transactions WHERE user_id = ? AND date >= '2024-03-01'", (user_id,)
+        ).fetchone()[0] == 2
+    
+    # Значения из файла в итоговом сообщении не ломают разметку Markdown
+    from bot.import_handlers import format_import_result
+    result = dict(result, skipped=1, errors=['строка 3: неизвестный тип «some_type*»'])
+    assert '«some\\_type\\*»' in format_import_result(result)
+    assert '«some_type*»' in format_import_result(result, markdown=False)
+
+def test_idempotent_writes_on_redelivery(isolated_db):
+    """Повторно доставленное обновление не применяет операцию второй раз"""
+    from database.idempotency import idempotency_store
+    from services.debt_service import debt_service
+    from services.transaction_service import transaction_service
+    from services.wallet_service import wallet_service
+    
+    user_id = 920001
+    wallet_service.init_user_wallets(user_id)
+    
+    # Неудачная операция не запоминается: после пополнения тот же ключ выполняется
+    assert not transaction_service.add_expense(user_id, 500, 'Еда', idempotency_key='update:3')['success']
+    
+    first = transaction_service.add_income(user_id, 10000, 'Зарплата', idempotency_key='update:1')
+    assert first['success'] and 'duplicate' not in first
+    repeat = transaction_service.add_income(user_id, 10000, 'Зарплата', idempotency_key='update:1')
+    assert repeat['duplicate'] and repeat['message'] == first['message']
+    
+    assert transaction_service.add_expense(user_id, 500, 'Еда', idempotency_key='update:3')['success']
+    
+    # После перезапуска кэш пуст - ключ находится в базе
+    idempotency_store._recent.invalidate()
+    assert transaction_service.add_expense(user_id, 500, 'Еда', idempotency_key='update:3')['duplicate']
+    
+    debt_service.add_debt(user_id, 'Банк', 3000)
+    debt_id = debt_service.get_active_debts(user_id)[0].id
+    for _ in range(2):
+        assert debt_service.make_payment(user_id, debt_id, 1000, idempotency_key='update:4')['success']
+    
+    # Без ключа операции выполняются как раньше
+    assert transaction_service.add_expense(user_id, 100, 'Еда')['success']
+    
+    assert wallet_service.get_all_wallets(user_id) == {'gold_reserve': 1000.0, 'living_budget': 7400.0, 'debt_repayment': 0.0}
+    assert debt_service.get_active_debts(user_id)[0].current_amount == 2000.0
+    with isolated_db.get_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM transactions WHERE user_id = ?', (user_id,)).fetchone()[0] == 3
+        assert conn.execute('SELECT COUNT(*) FROM processed_updates WHERE user_id = ?', (user_id,)).fetchone()[0] == 3
+        conn.execute("UPDATE processed_updates SET created_at = datetime('now', '-3 days') WHERE update_key = 'update:1'")
+        conn.commit()
+    
+    # Ночная задача удаляет ключи старше срока хранения
+    import asyncio
+    from bot.jobs import NIGHTLY_JOBS, prune_idempotency_keys
+    assert prune_idempotency_keys in NIGHTLY_JOBS
+    asyncio.run(prune_idempotency_keys(None))
+    with isolated_db.get_connection() as conn:
+        assert [row[0] for row in conn.execute(
+            'SELECT update_key FROM processed_updates WHERE user_id = ? ORDER BY update_key', (user_id,)
+        )] == ['update:3', 'update:4']
+
+def test_user_lanes_serialize_per_user():
+    """Обновления одного пользователя идут по очереди, разных - параллельно"""
+    import asyncio
+    from datetime import datetime
+    from telegram import Chat, Message, Update, User
+    from bot.lanes import UserLaneProcessor
+    
+    def make_update(update_id, user_id):
+        user = User(id=user_id, first_name='Тест', is_bot=False)
+        message = Message(message_id=update_id, date=datetime.now(), chat=Chat(id=user_id, type='private'),
+                          from_user=user, text='1500 еда')
+        return Update(update_id=update_id, message=message)
+    
+    processor = UserLaneProcessor(max_concurrent_updates=16)
+    running = {'total': 0, 'max_total': 0}
+    per_user = {}
+    order = []
+    
+    async def handle(update):
+        user_id = update.effective_user.id
+        per_user[user_id] = per_user.get(user_id, 0) + 1
+        assert per_user[user_id] == 1, "два обновления одного пользователя одновременно"
+        running['total'] += 1
+        running['max_total'] = max(running['max_total'], running['total'])
+        await asyncio.sleep(0.01)
+        order.append((user_id, update.update_id))
+        running['total'] -= 1
+        per_user[user_id] -= 1
+    
+    async def run():
+        updates = [make_update(update_id, 1 + update_id % 3) for update_id in range(12)]
+        await asyncio.gather(*(processor.process_update(update, handle(update)) for update in updates))
+    
+    asyncio.run(run())
+    
+    assert running['max_total'] == 3
+    for user_id in (1, 2, 3):
+        ids = [update_id for user, update_id in order if user == user_id]
+        assert ids == sorted(ids) and len(ids) == 4
+    stats = processor.get_stats()
+    assert stats['active_lanes'] == 0 and stats['processed'] == 12 and stats['max_lane_depth'] == 4
+
+def test_user_backlog_does_not_block_other_users():
+    """Очередь обновлений одного пользователя не занимает места других пользователей"""
+    import asyncio
+    from datetime import datetime
+    from telegram import Chat, Message, Update, User
+    from bot.lanes import UserLaneProcessor
+    
+    def make_update(update_id, user_id):
+        user = User(id=user_id, first_name='Тест', is_bot=False)
+        message = Message(message_id=update_id, date=datetime.now(), chat=Chat(id=user_id, type='private'),
+                          from_user=user, text='1500 еда')
+        return Update(update_id=update_id, message=message)
+    
+    processor = UserLaneProcessor(max_concurrent_updates=2)
+    finished = []
+    
+    async def handle(update):
+        await asyncio.sleep(0.02)
+        finished.append(update.effective_user.id)
+    
+    async def run():
+        updates = [make_update(update_id, 1) for update_id in range(8)] + [make_update(8, 2)]
+        await asyncio.gather(*(processor.process_update(update, handle(update)) for update in updates))
+    
+    asyncio.run(run())
+    
+    # Второй пользователь завершается вместе с первым обновлением первого, а не после всей его очереди
+    assert finished.index(2) <= 1
+    assert finished.count(1) == 8
+    stats = processor.get_stats()
+    assert stats['processed'] == 9 and stats['max_lane_depth'] == 8 and stats['active_lanes'] == 0
+
+def test_lane_queue_is_capped_and_throttled():
+    """Очередь полосы ограничена, а при перегрузке обновления ждут до постановки в очередь"""
+    import asyncio
+    from datetime import datetime
+    from telegram import Chat, Message, Update, User
+    from bot.lanes import UserLaneProcessor
+    
+    def make_update(update_id, user_id):
+        user = User(id=user_id, first_name='Тест', is_bot=False)
+        message = Message(message_id=update_id, date=datetime.now(), chat=Chat(id=user_id, type='private'),
+                          from_user=user, text='1500 еда')
+        return Update(update_id=update_id, message=message)
+    
+    blocked = [False]
+    processor = UserLaneProcessor(max_concurrent_updates=16, backpressure=lambda: blocked[0], max_lane_pending=3)
+    handled = []
+    
+    async def handle(update, release=None):
+        if release is not None:
+            await release.wait()
+        handled.append(update.update_id)
+    
+    async def run():
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(processor.process_update(make_update(0, 1), handle(make_update(0, 1), release)))]
+        await asyncio.sleep(0)
+        for update_id in range(1, 6):
+            update = make_update(update_id, 1)
+            tasks.append(asyncio.create_task(processor.process_update(update, handle(update))))
+        await asyncio.sleep(0.01)
+        assert processor.get_stats()['waiting'] == 3 and processor.get_stats()['dropped'] == 2
+        
+        # Перегрузка: новые обновления не встают в очередь полосы
+        blocked[0] = True
+        for update_id in (6, 7):
+            update = make_update(update_id, 1)
+            tasks.append(asyncio.create_task(processor.process_update(update, handle(update))))
+        await asyncio.sleep(0.1)
+        assert processor.get_stats()['waiting'] == 3
+        
+        release.set()
+        await asyncio.sleep(0.1)
+        assert handled == [0, 1, 2, 3]
+        blocked[0] = False
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+    
+    asyncio.run(run())
+    
+    assert handled == [0, 1, 2, 3, 6, 7]
+    stats = processor.get_stats()
+    assert stats['dropped'] == 2 and stats['throttled'] == 2 and stats['active_lanes'] == 0
+
+def test_update_backpressure_from_writer_queue(tmp_path):
+    """Переполненная очередь записи придерживает обновления, не нарушая их порядок"""
+    import asyncio
+    from database.connection import DatabaseConnection
+    from database.writer import DatabaseWriter
+    from bot.lanes import UserLaneProcessor
+    
+    db = DatabaseConnection(str(tmp_path / 'backlog.db'))
+    writer = DatabaseWriter(db, max_queue=10)
+    release = threading.Event()
+    writer.submit(release.wait)  # поток-писатель занят, очередь копится
+    time.sleep(0.05)
+    for _ in range(8):
+        writer.submit(lambda: None)
+    assert writer.is_backlogged()
+    
+    processor = UserLaneProcessor(max_concurrent_updates=4, backpressure=writer.is_backlogged)
+    handled = []
+    
+    async def handle(number):
+        handled.append(number)
+    
+    async def run():
+        tasks = [asyncio.create_task(processor.process_update(None, handle(number))) for number in range(3)]
+        await asyncio.sleep(0.2)
+        assert handled == [] and processor.get_stats()['throttled'] == 3
+        # Писатель разобрал очередь - обновления продолжаются
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+    
+    asyncio.run(run())
+    
+    assert sorted(handled) == [0, 1, 2]
+    assert not writer.is_backlogged()
+    assert processor.get_stats()['throttled_seconds'] > 0
+    writer.stop()
+    db.close_all()
+
+def test_every_menu_button_has_route():
+    """Каждая кнопка меню из keyboards/*.py находит маршрут, а не уходит в быстрый ввод"""
+    import inspect
+    import pkgutil
+    import keyboards
+    from telegram import ReplyKeyboardMarkup
+    from bot.router import create_menu_router, handle_free_text
+    
+    # Клавиатуры ответов внутри диалогов: их кнопки разбирают состояния ConversationHandler
+    dialog_keyboards = {
+        'get_category_keyboard', 'get_budget_categories_keyboard', 'get_budget_confirmation_keyboard',
+        'get_savings_options_keyboard', 'get_edit_confirmation_keyboard', 'get_debt_selection_keyboard',
+    }
+    
+    router = create_menu_router()
+    checked = set()
+    for module_info in pkgutil.iter_modules(keyboards.__path__):
+        module = importlib.import_module(f'keyboards.{module_info.name}')
+        for name, factory in inspect.getmembers(module, inspect.isfunction):
+            if not name.endswith('_keyboard') or name in dialog_keyboards or factory.__module__ != module.__name__:
+                continue
+            if inspect.signature(factory).parameters:
+                continue
+            markup = factory()
+            if not isinstance(markup, ReplyKeyboardMarkup):
+                continue
+            for row in markup.keyboard:
+                for button in row:
+                    assert router.resolve(button.text) is not handle_free_text, f"{name}: {button.text}"
+                    checked.add(button.text)
+    
+    assert '💼 Транзакции' in checked and '🎯 Вехи освобождения' in checked
+    assert router.resolve('1500 еда обед') is handle_free_text
+
+def test_health_score_windows_and_batch(isolated_db, monkeypatch):
+    """Индекс здоровья считает окна 30/90/180 дней по всей истории, пакетно и для одного пользователя"""
+    from services.advanced_analytics import advanced_analytics
+    from services.health_score import load_history, score_history
+    
+    db = isolated_db
+    with db.transaction() as conn:
+        # Пользователь 1: ровный доход полгода и старый крупный доход за пределами окон
+        for age in (5, 35, 65, 95, 125, 155):
+            conn.execute("INSERT INTO rollup_daily (user_id, type, day, category, total, count) "
+                         "VALUES (1, 'income', date('now', ?), 'Зарплата', 1000000, 1)", (f'-{age} days',))
+        conn.execute("INSERT INTO rollup_daily (user_id, type, day, category, total, count) "
+                     "VALUES (1, 'income', date('now', '-200 days'), 'Премия', 99999900, 1)")
+        conn.execute("INSERT INTO rollup_daily (user_id, type, day, category, total, count) "
+                     "VALUES (1, 'expense', date('now', '-3 days'), 'Еда', 800000, 4)")
+        conn.execute("INSERT INTO wallets (user_id, wallet_type, balance) VALUES "
+                     "(1, 'gold_reserve', 300000), (1, 'living_budget', 1000000), (2, 'gold_reserve', 0)")
+        conn.execute("INSERT INTO debts (user_id, creditor, initial_amount, current_amount) "
+                     "VALUES (3, 'Банк', 10000000, 5000000)")
+    
+    with db.get_connection() as conn:
+        batch = score_history(load_history(conn.cursor()))
+        single = score_history(load_history(conn.cursor(), [1]))
+    
+    assert sorted(batch) == [1, 2, 3]
+    assert single[1] == batch[1]
+    
+    first = batch[1]
+    assert first['windows']['30d'] == {'income': 10000.0, 'expenses': 8000.0}
+    assert first['windows']['90d']['income'] == 30000.0
+    assert first['windows']['180d']['income'] == 60000.0
+    assert first['components'] == {
+        'rule_10_percent': 100.0, 'expense_control': 100.0, 'debt_freedom': 100.0,
+        'income_stability': 100.0, 'savings_habit': 20.0,
+    }
+    assert first['total_score'] == pytest.approx(92.0)
+    
+    # Нет истории: средние баллы там, где данных недостаточно
+    assert batch[2]['total_score'] == pytest.approx(40.0)
+    assert batch[3]['components']['debt_freedom'] == pytest.approx(72.5)
+    
+    # Ночной пересчет сохраняет индекс всех пользователей
+    assert advanced_analytics.get_saved_health_score(1) is None
+    assert advanced_analytics.recompute_all_health_scores() == {'success': True, 'users': 3}
+    saved = advanced_analytics.get_saved_health_score(1)
+    assert saved['total_score'] == 92.0 and saved['level'] == "🏛️ Мудрец Вавилона"
+    assert saved['components']['savings_habit'] == 20.0
+    assert saved['windows']['30d'] == {'income': 10000.0, 'expenses': 8000.0}
+    
+    # Индекс пользователя берется из ночного пересчета, без него - считается сразу
+    live = advanced_analytics.calculate_financial_health_score(2)
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM health_scores WHERE user_id = 2")
+    assert advanced_analytics.calculate_financial_health_score(1) == saved
+    fresh = advanced_analytics.calculate_financial_health_score(2)
+    assert 'computed_at' not in fresh and fresh['total_score'] == live['total_score'] == 40.0
+    assert fresh['recommendations'] == live['recommendations']
+    
+    # Ошибка расчета не выдается за пересчет без пользователей
+    import services.advanced_analytics as module
+    def broken(cursor, user_ids=None):
+        raise sqlite3.OperationalError("database disk image is malformed")
+    monkeypatch.setattr(module, 'load_history', broken)
+    result = advanced_analytics.recompute_all_health_scores()
+    assert not result['success'] and 'malformed' in result['error']
+
+def test_nightly_rule_progress_recompute(isolated_db):
+    """Ночной пересчет выставляет прогресс правил всех пользователей из агрегатов"""
+    from services.babylon_service import babylon_service
+    from services.debt_service import debt_service
+    from services.transaction_service import transaction_service
+    from services.wallet_service import wallet_service
+    
+    saver, newcomer = 930001, 930002
+    for user_id in (saver, newcomer):
+        wallet_service.init_user_wallets(user_id)
+        babylon_service.init_user_rules(user_id)
+    
+    assert transaction_service.add_income(saver, 10000, 'Зарплата')['success']
+    assert transaction_service.add_expense(saver, 4000, 'Еда')['success']
+    assert debt_service.add_debt(saver, 'Банк', 50000)['success']
+    
+    # Обработчики больше не пишут прогресс - до пересчета он нулевой
+    assert babylon_service.get_user_progress(saver)['10_percent_rule'] == 0.0
+    
+    result = babylon_service.recompute_all_progress()
+    assert result == {'success': True, 'users': 2, 'updated': 5}
+    
+    assert babylon_service.get_user_progress(saver) == {
+        '10_percent_rule': 100.0, 'control_expenses': 92.6, 'debt_free': 50.0, 'wise_investment': 0.0,
+    }
+    # Пустой баланс не меняет контроль расходов, без долгов правило выполнено
+    assert babylon_service.get_user_progress(newcomer) == {
+        '10_percent_rule': 0.0, 'control_expenses': 0.0, 'debt_free': 100.0, 'wise_investment': 0.0,
+    }
+
+def test_debt_payoff_simulation_and_cache(isolated_db):
+    """Симуляция погашения учитывает проценты, сравнивает стратегии и кэшируется до платежа"""
+    from services.debt_service import debt_service
+    from services.transaction_service import transaction_service
+    from services.wallet_service import wallet_service
+    
+    user_id = 940001
+    wallet_service.init_user_wallets(user_id)
+    transaction_service.add_income(user_id, 10000, 'Зарплата')
+    card = debt_service.add_debt(user_id, 'Карта', 10000, interest_rate=30)['debt_id']
+    bank = debt_service.add_debt(user_id, 'Банк', 5000)['debt_id']
+    loan = debt_service.add_debt(user_id, 'Рассрочка', 20000, interest_rate=10, due_date='2000-01-01')['debt_id']
+    
+    simulation = debt_service.simulate_payoff(user_id, monthly_payment=5000)
+    snowball, avalanche = simulation['strategies']['snowball'], simulation['strategies']['avalanche']
+    assert snowball['order'] == [bank, card, loan]
+    assert avalanche['order'] == [card, loan, bank]
+    assert simulation['recommended'] == 'avalanche'
+    assert 0 < avalanche['total_interest'] < snowball['total_interest']
+    assert simulation['interest_saved'] == round(snowball['total_interest'] - avalanche['total_interest'], 2)
+    
+    for strategy in (snowball, avalanche):
+        assert strategy['months'] == len(strategy['schedule']) == max(strategy['payoff_months'].values())
+        assert strategy['schedule'][-1]['balance'] == 0
+        assert strategy['total_paid'] == pytest.approx(35000 + strategy['total_interest'], abs=0.05)
+        assert strategy['late'] == ['Рассрочка']
+    
+    custom = debt_service.simulate_payoff(user_id, monthly_payment=5000, custom_order=[loan])
+    assert custom['strategies']['custom']['order'] == [loan, bank, card]
+    
+    # Повторный запрос - из кэша, платеж по долгу его сбрасывает
+    assert debt_service.simulate_payoff(user_id, monthly_payment=5000) is simulation
+    assert debt_service.make_payment(user_id, bank, 5000)['success']
+    after = debt_service.simulate_payoff(user_id, monthly_payment=5000)
+    assert after is not simulation and after['total_debt'] == 30000
+    
+    plan = debt_service.calculate_snowball_plan(user_id)
+    assert [item['creditor'] for item in plan['plan']] == ['Карта', 'Рассрочка']
+    assert plan['plan'][0]['recommended_payment'] == 1000
+
+def test_savings_goal_projection(isolated_db):
+    """Прогноз цели запаса: детерминированный срок, вероятность, полосы и бюджет времени"""
+    import numpy as np
+    from services.savings_projection import PROJECTION_BATCH, savings_projection
+    from utils.financial_charts import financial_charts
+    
+    # Постоянный доход 100 000 ₽, 10% в запас: 50 000 ₽ за 5 месяцев при любом сценарии
+    inputs = {'gold_reserve': 0, 'savings_rate': 10.0, 'monthly_income': np.full(6, 10000000.0)}
+    projection = savings_projection.simulate(inputs, 5000000, horizon_months=12, paths=500, seed=1)
+    assert projection['probability'] == 1.0
+    assert projection['months_to_target'] == {10: 5, 50: 5, 90: 5}
+    assert projection['bands'][50][:3] == [10000.0, 20000.0, 30000.0]
+    
+    # Нерегулярный доход: сроки расходятся, недостижимая за горизонт цель - None
+    inputs['monthly_income'] = np.array([0.0, 0.0, 10000000.0, 30000000.0])
+    projection = savings_projection.simulate(inputs, 10000000, horizon_months=12, paths=2000, seed=1)
+    low, median, high = (projection['months_to_target'][p] for p in (10, 50, 90))
+    assert 0 < projection['probability'] < 1 and high is None
+    assert low is not None and median is not None and low <= median
+    assert all(a <= b <= c for a, b, c in zip(*(projection['bands'][p] for p in (10, 50, 90))))
+    
+    # Без бюджета времени считается только первая пачка путей
+    limited = savings_projection.simulate(inputs, 10000000, 12, paths=PROJECTION_BATCH * 5, time_budget=0)
+    assert limited['paths'] == PROJECTION_BATCH
+    
+    assert savings_projection.simulate({**inputs, 'gold_reserve': 10000000}, 5000000, 12, 100)['reached']
+    assert not savings_projection.simulate({**inputs, 'monthly_income': np.ones(1)}, 5000000, 12, 100)['success']
+    assert not savings_projection.project_goal(950001, 100000)['success']
+    
+    chart = financial_charts.create_savings_projection(projection)
+    assert '100,000' in chart and 'не за 12 мес.' in chart
+
+def test_chart_cache_follows_rollup_version(isolated_db):
+    """Графики из кэша до изменения сводок пользователя, текст графика - по содержимому данных"""
+    from database.rollups import get_rollup_version, rebuild_rollups
+    from services.financial_analytics import financial_analytics
+    from services.transaction_service import transaction_service
+    from services.wallet_service import wallet_service
+    from utils.financial_charts import financial_charts
+    
+    user_id = 960001
+    wallet_service.init_user_wallets(user_id)
+    transaction_service.add_income(user_id, 10000, 'Зарплата')
+    
+    with isolated_db.get_connection() as conn:
+        version = get_rollup_version(conn, user_id)
+    assert version == 1
+    
+    first = financial_analytics.get_chart_data(user_id)
+    assert first['success'] and first['version'][0] == version
+    assert financial_analytics.get_chart_data(user_id) is first
+    
+    # Расход меняет сводки - данные пересчитываются
+    transaction_service.add_expense(user_id, 2500, 'Еда')
+    second = financial_analytics.get_chart_data(user_id)
+    assert second is not first and second['version'][0] == version + 1
+    assert second['overview']['monthly_expenses'] == 2500
+    assert second['spending']['categories'][0]['name'] == 'Еда'
+    
+    with isolated_db.get_connection() as conn:
+        rebuild_rollups(conn, user_id)
+        conn.commit()
+        assert get_rollup_version(conn, user_id) == version + 2
+    
+    # Одинаковые данные - тот же закэшированный текст
+    stats = financial_charts.get_cache_stats()
+    chart = financial_charts.create_spending_by_category(second['spending']['categories'])
+    assert financial_charts.create_spending_by_category(list(second['spending']['categories'])) is chart
+    assert financial_charts.get_cache_stats()['hits'] == stats['hits'] + 1
+    assert '\n'.join(chart.splitlines()[:3]) == "📊 *РАСХОДЫ ПО КАТЕГОРИЯМ:*\n\nЕда:"
+
 if __name__ == "__main__":
     test_database_locking()
\ No newline at end of file
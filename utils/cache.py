@@ -0,0 +1,140 @@
+# utils/cache.py - ВНУТРИПРОЦЕССНЫЙ КЭШ С ОГРАНИЧЕНИЕМ РАЗМЕРА И ВРЕМЕНИ ЖИЗНИ
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+MISSING = object()
+
+class TTLCache:
+    """
+    Потокобезопасный LRU-кэш с временем жизни записей.
+    
+    Каждая запись ключа имеет версию: читатель запоминает version(key) до похода
+    в базу и кладет результат через put(..., version=...). Если за это время ключ
+    был изменен или сброшен, устаревшее значение не попадет в кэш.
+    
+    Версии - значения общего счетчика изменений. Храним их только для измененных
+    ключей: при вытеснении и истечении записи версия удаляется, а ключи без своей
+    версии получают нижнюю границу не меньше любой удаленной. Так словарь версий
+    ограничен, а заполнение, начатое до удаления, все равно будет отброшено.
+    """
+    
+    def __init__(self, max_size: int = 1024, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._versions = {}
+        self._tick = 0   # счетчик изменений
+        self._floor = 0  # версия ключей без своей записи в _versions
+        self._lock = threading.Lock()
+        
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+    
+    def get(self, key: Hashable) -> Any:
+        """Возвращает значение или MISSING"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISSING
+            
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self._drop_version(key)
+                self._expirations += 1
+                self._misses += 1
+                return MISSING
+            
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+    
+    def version(self, key: Hashable) -> int:
+        """Текущая версия ключа (растет при каждом изменении и сбросе)"""
+        with self._lock:
+            return self._versions.get(key, self._floor)
+    
+    def put(self, key: Hashable, value: Any, version: Optional[int] = None) -> bool:
+        """
+        Кладет значение в кэш. С version - только если ключ с тех пор не менялся.
+        Возвращает True, если значение сохранено.
+        """
+        with self._lock:
+            if version is not None and self._versions.get(key, self._floor) != version:
+                return False
+            
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            
+            while len(self._data) > self.max_size:
+                evicted, _ = self._data.popitem(last=False)
+                self._drop_version(evicted)
+                self._evictions += 1
+            return True
+    
+    def update(self, key: Hashable, func: Callable[[Any], Any]):
+        """
+        Сквозная запись: применяет func к закэшированному значению (если оно есть)
+        и продвигает версию ключа, отменяя параллельные заполнения старыми данными.
+        """
+        with self._lock:
+            self._bump_version(key)
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                self._data[key] = (func(value), expires_at)
+    
+    def invalidate(self, key: Hashable = MISSING):
+        """Сбрасывает один ключ или (без аргумента) весь кэш"""
+        with self._lock:
+            self._invalidations += 1
+            if key is MISSING:
+                # Новая граница отменяет заполнения всех ключей
+                self._tick += 1
+                self._floor = self._tick
+                self._versions.clear()
+                self._data.clear()
+            else:
+                self._bump_version(key)
+                self._data.pop(key, None)
+    
+    def _bump_version(self, key: Hashable):
+        """Продвигает версию ключа (вызывается под блокировкой)"""
+        self._tick += 1
+        self._versions[key] = self._tick
+        
+        # Версии сброшенных ключей без записей копятся - удаляем их разом,
+        # когда их становится больше размера кэша
+        if len(self._versions) > 2 * self.max_size:
+            for stale in [stale for stale in self._versions if stale not in self._data]:
+                self._drop_version(stale)
+    
+    def _drop_version(self, key: Hashable):
+        """Удаляет версию ключа, поднимая нижнюю границу (вызывается под блокировкой)"""
+        version = self._versions.pop(key, None)
+        if version is not None:
+            self._floor = max(self._floor, version)
+    
+    def get_stats(self) -> dict:
+        """Возвращает метрики кэша"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+            }
@@ -1,4 +1,33 @@
 # utils/financial_charts.py - ПРАКТИЧНЫЕ ТЕКСТОВЫЕ ГРАФИКИ
+import hashlib
+import os
+from datetime import datetime
+from functools import wraps
+
+from utils.cache import MISSING, TTLCache
+
+CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', 2000))
+CHART_CACHE_TTL = float(os.getenv('CHART_CACHE_TTL', 3600))
+
+# Хэш имени графика и входных данных -> готовый текст (LRU)
+_render_cache = TTLCache(max_size=CHART_CACHE_SIZE, ttl=CHART_CACHE_TTL)
+
+def cached_chart(render):
+    """
+    Кэширует текст графика по содержимому входных данных: те же данные -
+    тот же текст, поэтому сбрасывать кэш не нужно, старые записи вытесняются
+    """
+    @wraps(render)
+    def wrapper(*args, **kwargs):
+        content = repr((render.__name__, args, sorted(kwargs.items()))).encode()
+        key = hashlib.blake2b(content, digest_size=16).digest()
+        
+        text = _render_cache.get(key)
+        if text is MISSING:
+            text = render(*args, **kwargs)
+            _render_cache.put(key, text)
+        return text
+    return wrapper
 
 class FinancialCharts:
     """
@@ -6,6 +35,7 @@ class FinancialCharts:
     """
     
     @staticmethod
+    @cached_chart
     def create_spending_by_category(categories_data: list, width: int = 20) -> str:
         """
         Создает текстовую диаграмму расходов по категориям
@@ -13,7 +43,7 @@ class FinancialCharts:
         if not categories_data:
             return "📊 Нет данных о расходах за последний период"
         
-        chart_text = "📊 *РАСХОДЫ ПО КАТЕГОРИЯМ:*\n\n"
+        lines = ["📊 *РАСХОДЫ ПО КАТЕГОРИЯМ:*", ""]
         
         for category in categories_data[:8]:  # Ограничиваем 8 категориями
             name = category['name']
@@ -24,13 +54,13 @@ class FinancialCharts:
             bar_length = int(percentage / 100 * width)
             bar = '█' * bar_length + '░' * (width - bar_length)
             
-            chart_text += f"{name}:\n"
-            chart_text += f"{bar} {percentage:.1f}%\n"
-            chart_text += f"Сумма: {amount:,.0f} руб.\n\n"
+            lines += [f"{name}:", f"{bar} {percentage:.1f}%", f"Сумма: {amount:,.0f} руб.", ""]
         
-        return chart_text
+        lines.append("")
+        return '\n'.join(lines)
     
     @staticmethod
+    @cached_chart
     def create_income_vs_expenses(income: float, expenses: float, width: int = 20) -> str:
         """
         Создает сравнение доходов и расходов
@@ -41,31 +71,33 @@ class FinancialCharts:
         ratio = expenses / income if income > 0 else 0
         savings = income - expenses
         
-        chart_text = "📈 *ДОХОДЫ vs РАСХОДЫ:*\n\n"
-        
         # Диаграмма доходов
         income_bar = '🟢' * width
-        chart_text += f"Доходы: {income:,.0f} руб.\n{income_bar}\n\n"
         
         # Диаграмма расходов (относительно доходов)
         expense_ratio = min(1.0, ratio)
         expense_bar_length = int(expense_ratio * width)
         expense_bar = '🔴' * expense_bar_length + '⚪' * (width - expense_bar_length)
         
-        chart_text += f"Расходы: {expenses:,.0f} руб. ({ratio*100:.1f}%)\n{expense_bar}\n\n"
+        lines = [
+            "📈 *ДОХОДЫ vs РАСХОДЫ:*", "",
+            f"Доходы: {income:,.0f} руб.", income_bar, "",
+            f"Расходы: {expenses:,.0f} руб. ({ratio*100:.1f}%)", expense_bar, "",
+        ]
         
         # Результат
         if savings > 0:
             savings_ratio = savings / income
             savings_bar_length = int(savings_ratio * width)
             savings_bar = '💰' * savings_bar_length + '⚪' * (width - savings_bar_length)
-            chart_text += f"Накопления: +{savings:,.0f} руб.\n{savings_bar}"
+            lines += [f"Накопления: +{savings:,.0f} руб.", savings_bar]
         else:
-            chart_text += f"⚠️ Перерасход: {abs(savings):,.0f} руб."
+            lines.append(f"⚠️ Перерасход: {abs(savings):,.0f} руб.")
         
-        return chart_text
+        return '\n'.join(lines)
     
     @staticmethod
+    @cached_chart
     def create_monthly_trend(monthly_data: list) -> str:
         """
         Создает график месячной динамики
@@ -73,7 +105,7 @@ class FinancialCharts:
         if not monthly_data:
             return "📅 Нет данных для построения графика"
         
-        chart_text = "📅 *ДИНАМИКА ПО МЕСЯЦАМ:*\n\n"
+        lines = ["📅 *ДИНАМИКА ПО МЕСЯЦАМ:*", ""]
         
         # Находим максимальное значение для масштабирования
         max_value = max([data[1] for data in monthly_data]) if monthly_data else 1
@@ -86,11 +118,13 @@ class FinancialCharts:
             bar_length = int((amount / max_value) * 15) if max_value > 0 else 0
             bar = '█' * bar_length
             
-            chart_text += f"{month_name}. {amount:,.0f} руб. {bar}\n"
+            lines.append(f"{month_name}. {amount:,.0f} руб. {bar}")
         
-        return chart_text
+        lines.append("")
+        return '\n'.join(lines)
     
     @staticmethod
+    @cached_chart
     def create_savings_progress(gold_reserve: float, monthly_income: float) -> str:
         """
         Создает график прогресса накоплений
@@ -102,24 +136,83 @@ class FinancialCharts:
         ideal_savings = monthly_income * 0.1 * 6
         progress_ratio = min(1.0, gold_reserve / ideal_savings) if ideal_savings > 0 else 0
         
-        chart_text = "💰 *ПРОГРЕСС НАКОПЛЕНИЙ:*\n\n"
-        
         # Прогресс-бар
         bar_length = int(progress_ratio * 20)
         bar = '💰' * bar_length + '⚪' * (20 - bar_length)
         
-        chart_text += f"Текущие накопления: {gold_reserve:,.0f} руб.\n"
-        chart_text += f"Цель (6 месяцев): {ideal_savings:,.0f} руб.\n\n"
-        chart_text += f"{bar} {progress_ratio*100:.1f}%\n\n"
-        
         if progress_ratio >= 1.0:
-            chart_text += "🎉 Отличный результат! Вы достигли цели!"
+            advice = "🎉 Отличный результат! Вы достигли цели!"
         elif progress_ratio >= 0.5:
-            chart_text += "💪 Хороший прогресс! Продолжайте в том же духе!"
+            advice = "💪 Хороший прогресс! Продолжайте в том же духе!"
         else:
-            chart_text += "🚀 Начните с малого - каждый доход откладывайте 10%"
-        
-        return chart_text
+            advice = "🚀 Начните с малого - каждый доход откладывайте 10%"
+        
+        return '\n'.join([
+            "💰 *ПРОГРЕСС НАКОПЛЕНИЙ:*", "",
+            f"Текущие накопления: {gold_reserve:,.0f} руб.",
+            f"Цель (6 месяцев): {ideal_savings:,.0f} руб.", "",
+            f"{bar} {progress_ratio*100:.1f}%", "",
+            advice,
+        ])
+    
+    @staticmethod
+    def create_savings_projection(projection: dict, width: int = 20) -> str:
+        """
+        Создает прогноз достижения цели Золотого запаса с перцентильными полосами
+        """
+        if not projection['success']:
+            return f"🎯 {projection['error']}"
+        
+        target = projection['target']
+        gold_reserve = projection['gold_reserve']
+        lines = [
+            "🎯 *ПРОГНОЗ ЦЕЛИ НАКОПЛЕНИЙ:*", "",
+            f"Цель: {target:,.0f} руб.",
+            f"Золотой запас: {gold_reserve:,.0f} руб.", "",
+        ]
+        
+        if projection['reached']:
+            lines.append("🎉 Цель уже достигнута!")
+            return '\n'.join(lines)
+        
+        # Вероятность достижения за горизонт
+        probability = projection['probability']
+        bar_length = int(probability * width)
+        bar = '🟢' * bar_length + '⚪' * (width - bar_length)
+        horizon = projection['horizon_months']
+        lines += [f"Вероятность за {horizon} мес.: {probability*100:.0f}%", bar, ""]
+        
+        # Сроки: пессимистичный (90-й перцентиль), средний и оптимистичный (10-й)
+        today = datetime.now()
+        lines.append("📅 *Когда будет цель:*")
+        for label, percentile in (('Оптимистично', 10), ('Скорее всего', 50), ('Пессимистично', 90)):
+            months = projection['months_to_target'][percentile]
+            if months is None:
+                lines.append(f"{label}: не за {horizon} мес.")
+                continue
+            month_index = today.month - 1 + months
+            lines.append(f"{label}: через {months} мес. ({month_index % 12 + 1:02d}.{today.year + month_index // 12})")
+        
+        # Полосы запаса на контрольных месяцах: от 10-го до 90-го перцентиля
+        bands = projection['bands']
+        checkpoints = sorted({month for month in (3, 6, 12, 24, 60, horizon) if month <= horizon})
+        max_value = max(bands[90][month - 1] for month in checkpoints)
+        lines += ["", "📈 *Запас через (10% / 50% / 90%):*"]
+        for month in checkpoints:
+            low, median, high = (bands[percentile][month - 1] for percentile in (10, 50, 90))
+            start = int(low / max_value * width) if max_value > 0 else 0
+            end = max(int(high / max_value * width), start + 1) if max_value > 0 else 1
+            band = '░' * start + '█' * (end - start)
+            lines += [f"{month} мес. {band}", f"{low:,.0f} / {median:,.0f} / {high:,.0f} руб."]
+        
+        lines += ["", f"В среднем в запас: {projection['mean_deposit']:,.0f} руб./мес."
+                      f" ({projection['paths']:,} сценариев по {projection['history_months']} мес. истории)"]
+        return '\n'.join(lines)
+    
+    @staticmethod
+    def get_cache_stats() -> dict:
+        """Метрики кэша готовых графиков"""
+        return _render_cache.get_stats()
 
 # Глобальный экземпляр
-financial_charts = FinancialCharts()
\ No newline at end of file
+financial_charts = FinancialCharts()
@@ -0,0 +1,293 @@
+# utils/metrics.py - МЕТРИКИ ОБРАБОТЧИКОВ И СЕРВИСОВ (ФОРМАТ PROMETHEUS)
+import bisect
+import functools
+import inspect
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы задержек, секунды
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами (накопительные счетчики считаются при выводе)"""
+    
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя корзина - +Inf
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def cumulative(self) -> list:
+        """[(граница, число наблюдений <= границы)], последняя граница - +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+    
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины (как histogram_quantile)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower = 0.0
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            if seen + count >= rank and count:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        # Квантиль в корзине +Inf: верхней границы нет, отдаем последнюю известную
+        return self.buckets[-1]
+
+class MetricsRegistry:
+    """
+    Потокобезопасный реестр метрик: счетчики, гистограммы задержек
+    и сборщики мгновенных значений (очередь записи, пул, кэш, активные диалоги).
+    Метрики выводятся в текстовом формате Prometheus.
+    """
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._families = {}  # имя -> (тип, описание)
+        self._counters = {}  # (имя, метки) -> значение
+        self._histograms = {}  # (имя, метки) -> Histogram
+        self._collectors = []
+    
+    def describe(self, name: str, metric_type: str, help_text: str):
+        """Регистрирует тип и описание семейства метрик"""
+        with self._lock:
+            self._families[name] = (metric_type, help_text)
+    
+    def inc(self, name: str, labels: Tuple[Tuple[str, str], ...] = (), value: float = 1):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def observe(self, name: str, labels: Tuple[Tuple[str, str], ...], value: float):
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = self._histograms[(name, labels)] = Histogram(self.buckets)
+            histogram.observe(value)
+    
+    def observe_call(self, prefix: str, labels: Tuple[Tuple[str, str], ...], seconds: float, failed: bool):
+        """Вызов обработчика или сервиса: счетчик вызовов, ошибок и задержка"""
+        with self._lock:
+            calls = (f'{prefix}_calls_total', labels)
+            self._counters[calls] = self._counters.get(calls, 0) + 1
+            if failed:
+                errors = (f'{prefix}_errors_total', labels)
+                self._counters[errors] = self._counters.get(errors, 0) + 1
+            
+            latency = (f'{prefix}_latency_seconds', labels)
+            histogram = self._histograms.get(latency)
+            if histogram is None:
+                histogram = self._histograms[latency] = Histogram(self.buckets)
+            histogram.observe(seconds)
+    
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, dict, float]]]):
+        """
+        Сборщик мгновенных значений: функция, возвращающая (имя, метки, значение).
+        Вызывается при каждом выводе метрик.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+    
+    def _collect_gauges(self) -> list:
+        gauges = []
+        for collector in list(self._collectors):
+            try:
+                for name, labels, value in collector():
+                    gauges.append((name, tuple(sorted(labels.items())), value))
+            except Exception as e:
+                logger.error(f"❌ Ошибка сборщика метрик {collector!r}: {e}")
+        return gauges
+    
+    def get_calls(self, prefix: str) -> Dict[str, dict]:
+        """
+        Сводка вызовов семейства prefix (bot_handler, service) по значению первой метки:
+        число вызовов, ошибок, средняя задержка и оценки p50/p95 в миллисекундах
+        """
+        with self._lock:
+            result = {}
+            for (name, labels), histogram in self._histograms.items():
+                if name != f'{prefix}_latency_seconds':
+                    continue
+                label = '.'.join(value for _, value in labels)
+                result[label] = {
+                    'calls': histogram.count,
+                    'errors': self._counters.get((f'{prefix}_errors_total', labels), 0),
+                    'avg_ms': round(histogram.sum / histogram.count * 1000, 3) if histogram.count else 0.0,
+                    'p50_ms': round(histogram.quantile(0.5) * 1000, 3),
+                    'p95_ms': round(histogram.quantile(0.95) * 1000, 3),
+                }
+            return result
+    
+    def get_gauges(self) -> Dict[str, float]:
+        """Текущие значения сборщиков: 'имя{метки}' -> значение"""
+        return {_series(name, labels): value for name, labels, value in self._collect_gauges()}
+    
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        gauges = self._collect_gauges()
+        lines = []
+        
+        with self._lock:
+            families = dict(self._families)
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        
+        def header(name, default_type):
+            metric_type, help_text = families.get(name, (default_type, name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+        
+        current = None
+        for (name, labels), value in counters:
+            if name != current:
+                header(name, 'counter')
+                current = name
+            lines.append(f'{_series(name, labels)} {_format_value(value)}')
+        
+        current = None
+        for (name, labels), histogram in histograms:
+            if name != current:
+                header(name, 'histogram')
+                current = name
+            for bound, count in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                lines.append(f'{_series(name + "_bucket", labels + (("le", le),))} {count}')
+            lines.append(f'{_series(name + "_sum", labels)} {_format_value(histogram.sum)}')
+            lines.append(f'{_series(name + "_count", labels)} {histogram.count}')
+        
+        current = None
+        for name, labels, value in sorted(gauges, key=lambda gauge: (gauge[0], gauge[1])):
+            if name != current:
+                header(name, 'gauge')
+                current = name
+            lines.append(f'{_series(name, labels)} {_format_value(value)}')
+        
+        return '\n'.join(lines) + '\n'
+    
+    def reset(self):
+        """Сбрасывает накопленные счетчики и гистограммы (описания и сборщики остаются)"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _series(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _is_failure(result) -> bool:
+    """Сервисы сообщают об ошибке результатом {'success': False, ...}"""
+    return isinstance(result, dict) and result.get('success', True) is False
+
+def instrument_service(service, service_name: str, registry: 'MetricsRegistry' = None):
+    """
+    Подменяет публичные методы экземпляра сервиса обертками со сбором метрик.
+    Атрибуты исходного метода (например, __write_operation__) сохраняются,
+    поэтому асинхронный фасад по-прежнему отправляет записи потоку-писателю.
+    """
+    registry = registry or metrics
+    for name in dir(type(service)):
+        if name.startswith('_'):
+            continue
+        method = getattr(service, name)
+        if not callable(method) or getattr(method, '__metrics_wrapped__', False):
+            continue
+        # У генератора замерялось бы только создание, а не чтение порций
+        if inspect.isgeneratorfunction(method):
+            continue
+        setattr(service, name, _timed_method(method, (('service', service_name), ('method', name)), registry))
+    return service
+
+def _timed_method(method, labels, registry):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = method(*args, **kwargs)
+            failed = _is_failure(result)
+            return result
+        finally:
+            registry.observe_call('service', labels, time.perf_counter() - started, failed)
+    
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = None
+    
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # Опросы Prometheus не засоряют журнал
+        pass
+
+def start_metrics_server(port: int, host: str = '127.0.0.1',
+                         registry: 'MetricsRegistry' = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Запускает HTTP-эндпоинт /metrics в фоновом потоке.
+    По умолчанию слушает только локальный интерфейс.
+    """
+    handler = type('MetricsRequestHandler', (_MetricsRequestHandler,), {'registry': registry or metrics})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        logger.error(f"❌ Не удалось запустить эндпоинт метрик на {host}:{port}: {e}")
+        return None
+    
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    logger.info(f"📈 Метрики доступны на http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+# Глобальный экземпляр
+metrics = MetricsRegistry()
+
+metrics.describe('bot_handler_calls_total', 'counter', 'Вызовы обработчиков Telegram')
+metrics.describe('bot_handler_errors_total', 'counter', 'Обработчики, завершившиеся исключением')
+metrics.describe('bot_handler_latency_seconds', 'histogram', 'Время выполнения обработчиков Telegram')
+metrics.describe('service_calls_total', 'counter', 'Вызовы публичных методов сервисов')
+metrics.describe('service_errors_total', 'counter', 'Вызовы сервисов с исключением или success=False')
+metrics.describe('service_latency_seconds', 'histogram', 'Время выполнения методов сервисов')
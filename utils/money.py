@@ -0,0 +1,101 @@
+# utils/money.py - ДЕНЕЖНЫЕ СУММЫ В КОПЕЙКАХ
+from decimal import Decimal, ROUND_HALF_UP
+from functools import total_ordering
+
+_ONE = Decimal('1')
+
+def _round_kopecks(value: Decimal) -> int:
+    """Округляет до целой копейки (половина - от нуля)"""
+    return int(value.quantize(_ONE, rounding=ROUND_HALF_UP))
+
+@total_ordering
+class Money:
+    """
+    Денежная сумма в целых копейках.
+    В базе хранится целое число копеек (точные SUM и сравнения),
+    на границе с интерфейсом сумма переводится в рубли.
+    """
+    
+    __slots__ = ('kopecks',)
+    
+    def __init__(self, kopecks: int = 0):
+        self.kopecks = int(kopecks)
+    
+    @classmethod
+    def from_rubles(cls, rubles) -> 'Money':
+        """Создает сумму из рублей (float, int, str или Decimal)"""
+        if isinstance(rubles, Money):
+            return rubles
+        return cls(_round_kopecks(Decimal(str(rubles)) * 100))
+    
+    @classmethod
+    def from_db(cls, value) -> 'Money':
+        """Создает сумму из значения колонки (NULL - ноль)"""
+        return cls(value or 0)
+    
+    @property
+    def rubles(self) -> float:
+        """Сумма в рублях для отображения и расчетов интерфейса"""
+        return self.kopecks / 100
+    
+    def to_db(self) -> int:
+        """Значение для записи в базу"""
+        return self.kopecks
+    
+    def percent(self, rate) -> 'Money':
+        """Доля суммы в процентах, округленная до копейки"""
+        return Money(_round_kopecks(Decimal(self.kopecks) * Decimal(str(rate)) / 100))
+    
+    def split(self, rate) -> tuple:
+        """
+        Делит сумму на долю rate% и остаток.
+        Части в сумме всегда дают исходную сумму - без потерянных копеек.
+        """
+        part = self.percent(rate)
+        return part, self - part
+    
+    def __add__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.kopecks + other.kopecks)
+    
+    def __sub__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.kopecks - other.kopecks)
+    
+    def __neg__(self):
+        return Money(-self.kopecks)
+    
+    def __abs__(self):
+        return Money(abs(self.kopecks))
+    
+    def __bool__(self):
+        return self.kopecks != 0
+    
+    def __eq__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.kopecks == other.kopecks
+    
+    def __lt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.kopecks < other.kopecks
+    
+    def __hash__(self):
+        return hash(self.kopecks)
+    
+    def __float__(self):
+        return self.rubles
+    
+    def __repr__(self):
+        return f"Money({self.kopecks})"
+
+def to_kopecks(rubles) -> int:
+    """Рубли -> копейки для параметров SQL"""
+    return Money.from_rubles(rubles).kopecks
+
+def to_rubles(kopecks) -> float:
+    """Копейки из SQL (в том числе SUM) -> рубли"""
+    return (kopecks or 0) / 100